@@ -0,0 +1,180 @@
+# alocacao_salas.py - Alocação de salas para as aulas da grade
+"""
+Atribui uma sala a cada aula (dia, horário) respeitando a capacidade
+(capacidade >= alunos matriculados) e sem dupla reserva.
+
+A ocupação de cada sala é guardada por dia em uma lista ordenada de
+intervalos de horário real (minutos), consultada com bisect. Assim, aulas de
+segmentos com sinais diferentes (EM × EF II) que se sobrepõem no relógio
+também são detectadas.
+"""
+from bisect import bisect_left, insort
+
+from grade_aulas import normalizar_grade
+from calendario_escolar import CALENDARIO_PADRAO, HORARIO_VAZIO
+
+
+def _valor(objeto, campo, padrao=None):
+    """Lê um campo de objeto ou dict"""
+    if isinstance(objeto, dict):
+        return objeto.get(campo, padrao)
+    return getattr(objeto, campo, padrao)
+
+
+def _inteiro(valor):
+    """Converte alunos matriculados em int (0 se vazio ou inválido)"""
+    try:
+        return int(valor or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _minutos(horario):
+    return horario.hour * 60 + horario.minute
+
+
+class AgendaSala:
+    """Intervalos ocupados de uma sala, por dia, em listas ordenadas"""
+    __slots__ = ('nome', 'capacidade', 'intervalos')
+
+    def __init__(self, nome, capacidade):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.intervalos = {}  # dia -> [(inicio, fim)] ordenado
+
+    def livre(self, dia, inicio, fim):
+        """Indica se a sala está livre no intervalo [inicio, fim)"""
+        ocupados = self.intervalos.get(dia)
+        if not ocupados:
+            return True
+        pos = bisect_left(ocupados, (inicio, fim))
+        # Intervalo anterior não pode terminar depois do início
+        if pos > 0 and ocupados[pos - 1][1] > inicio:
+            return False
+        # Próximo intervalo não pode começar antes do fim
+        if pos < len(ocupados) and ocupados[pos][0] < fim:
+            return False
+        return True
+
+    def reservar(self, dia, inicio, fim):
+        insort(self.intervalos.setdefault(dia, []), (inicio, fim))
+
+    def minutos_ocupados(self):
+        return sum(fim - inicio for ocupados in self.intervalos.values() for inicio, fim in ocupados)
+
+
+class ResultadoAlocacao:
+    """Resultado da alocação: sala de cada aula e indicadores de ocupação"""
+
+    def __init__(self):
+        self.alocacoes = []     # [(aula_original, nome_sala)]
+        self.sem_sala = []      # [(aula_original, motivo)]
+        self.agendas = {}
+        self.alunos_alocados = 0
+        self.assentos_alocados = 0
+        self.minutos_disponiveis = 0
+
+    @property
+    def ocupacao_assentos(self):
+        """% de assentos ocupados nas aulas alocadas"""
+        if not self.assentos_alocados:
+            return 0
+        return self.alunos_alocados / self.assentos_alocados * 100
+
+    @property
+    def ocupacao_horarios(self):
+        """% do tempo disponível das salas efetivamente reservado"""
+        if not self.minutos_disponiveis:
+            return 0
+        ocupados = sum(agenda.minutos_ocupados() for agenda in self.agendas.values())
+        return ocupados / self.minutos_disponiveis * 100
+
+    def sala_da_aula(self):
+        """Mapa id(aula) -> nome da sala"""
+        return {id(aula): sala for aula, sala in self.alocacoes}
+
+    def resumo(self):
+        return {
+            'aulas_alocadas': len(self.alocacoes),
+            'aulas_sem_sala': len(self.sem_sala),
+            'ocupacao_salas': self.ocupacao_assentos,
+            'ocupacao_salas_horario': self.ocupacao_horarios
+        }
+
+
+def alocar_salas(aulas, salas, alunos_por_turma, calendario=None, dias=5):
+    """
+    Aloca salas às aulas da grade
+
+    Args:
+        aulas: Lista de aulas (objetos ou dicts com turma, dia, horario)
+        salas: Lista de salas (objetos ou dicts com nome e capacidade)
+        alunos_por_turma: Dicionário turma -> alunos matriculados
+        calendario: CalendarioEscolar com os horários reais
+        dias: Dias letivos na semana (para o cálculo de ocupação)
+
+    Returns:
+        ResultadoAlocacao
+    """
+    calendario = calendario or CALENDARIO_PADRAO
+    resultado = ResultadoAlocacao()
+
+    # Salas ordenadas por capacidade para escolher a menor que comporta a turma
+    agendas = sorted(
+        (AgendaSala(_valor(sala, 'nome'), _valor(sala, 'capacidade', 0) or 0) for sala in salas),
+        key=lambda agenda: agenda.capacidade
+    )
+    capacidades = [agenda.capacidade for agenda in agendas]
+    resultado.agendas = {agenda.nome: agenda for agenda in agendas}
+
+    # Tempo disponível de cada sala: do primeiro ao último sinal do calendário
+    inicio_dia = min(_minutos(h.intervalos[h.periodos[0]][0]) for h in calendario.segmentos.values())
+    fim_dia = max(_minutos(h.intervalos[h.periodos[-1]][1]) for h in calendario.segmentos.values())
+    resultado.minutos_disponiveis = (fim_dia - inicio_dia) * dias * len(agendas)
+
+    # Turmas maiores primeiro: são as que têm menos salas possíveis
+    alunos_por_turma = {turma: _inteiro(alunos) for turma, alunos in alunos_por_turma.items()}
+    grade = normalizar_grade(aulas)
+    pendentes = sorted(grade, key=lambda aula: -alunos_por_turma.get(aula.turma, 0))
+
+    sala_preferida = {}  # turma -> sala usada na última alocação
+    for aula in pendentes:
+        if not aula.turma or not aula.dia or not aula.horario:
+            resultado.sem_sala.append((aula.original, 'aula incompleta'))
+            continue
+
+        # Período fora do calendário da turma: sem horário real não há como
+        # detectar choques, então a aula não é reservada
+        intervalo = calendario.horario_real_time(aula.turma, aula.horario)
+        if intervalo == HORARIO_VAZIO:
+            resultado.sem_sala.append((aula.original, 'período desconhecido'))
+            continue
+
+        alunos = alunos_por_turma.get(aula.turma, 0)
+        inicio, fim = _minutos(intervalo[0]), _minutos(intervalo[1])
+
+        # Tenta primeiro a sala que a turma já usa, depois a menor que comporta
+        candidatas = agendas[bisect_left(capacidades, alunos):]
+        preferida = resultado.agendas.get(sala_preferida.get(aula.turma))
+        if preferida is not None and preferida.capacidade >= alunos:
+            candidatas = [preferida] + candidatas
+
+        agenda_escolhida = next((a for a in candidatas if a.livre(aula.dia, inicio, fim)), None)
+        if agenda_escolhida is None:
+            motivo = 'todas as salas ocupadas' if candidatas else 'nenhuma sala comporta a turma'
+            resultado.sem_sala.append((aula.original, motivo))
+            continue
+
+        agenda_escolhida.reservar(aula.dia, inicio, fim)
+        sala_preferida[aula.turma] = agenda_escolhida.nome
+        resultado.alocacoes.append((aula.original, agenda_escolhida.nome))
+        resultado.alunos_alocados += alunos
+        resultado.assentos_alocados += agenda_escolhida.capacidade
+
+    return resultado
+
+
+def aplicar_ocupacao_alocacao(resultados, alocacao):
+    """Atualiza os indicadores de ocupação da viabilidade com a alocação real"""
+    resultados.update(alocacao.resumo())
+    return resultados
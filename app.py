@@ -1,17 +1,54 @@
 # app_salas.py - Viabilidade Financeira de Salas de Aula
-from flask import Flask, render_template_string, request, jsonify, session, redirect
-from datetime import datetime
+from flask import Blueprint, Flask, Response, render_template_string, request, jsonify, session, redirect, stream_with_context
 import json
+import math
 import os
-import sqlite3
+import threading
+from html import escape
+from urllib.parse import urlencode
 from typing import Dict, List, Any
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'viabilidade_salas_2024'
+from metricas import METRICAS, instrumentar_app, conectar_medido
+from entrega_http import ASSETS, instrumentar_entrega
+import json_rapido
+from json_rapido import ler_campos, campos_raiz, selecionar_campos, resposta_json
+from tarefas import ExecutorTarefas, criar_tabela_tarefas
+from comparacao import comparar_simulacoes
+from memo_resultados import MemoResultados, arquivo_memo
+from conteudos import VERSAO_CALCULO, criar_tabela_conteudos, hash_simulacao
+from versoes_simulacao import criar_tabelas_versoes
+from busca_simulacoes import FACETAS, criar_indice_busca
+from repositorio import COLUNAS_TOTAIS, ConflitoVersao, SimulacaoNaoEncontrada, criar_repositorio
+
+# Rotas do app (registradas em criar_app)
+rotas = Blueprint('salas', __name__)
 
 # Configuração do banco de dados
 DATABASE = 'database_salas.db'
 
+# Schema criado uma única vez por processo (ver garantir_banco)
+_banco_inicializado = False
+_trava_banco = threading.Lock()
+
+def conectar_db():
+    """Abre conexão com o banco (tempo de banco medido por requisição)
+    
+    As chaves estrangeiras ficam ligadas: excluir uma simulação exclui, pelo
+    próprio SQLite, as turmas, os alunos e as versões dela.
+    """
+    garantir_banco()
+    conn = conectar_medido(DATABASE)
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
+def garantir_banco():
+    """Cria o schema na primeira conexão do processo, se ninguém o fez antes"""
+    if _banco_inicializado:
+        return
+    with _trava_banco:
+        if not _banco_inicializado:
+            init_db()
+
 # Configurações padrão
 HORAS_MENSAL_PADRAO = 80  # 20h semanais × 4 semanas
 DIAS_AULA_MES = 20
@@ -42,6 +79,12 @@ NIVEIS_ENSINO = {
     'pre_vestibular': {'nome': 'Pré-Vestibular', 'series': '--', 'idade': '17+ anos'}
 }
 
+# Nomes de exibição dos códigos de nível e disciplina (índice de busca e facetas)
+ROTULOS_BUSCA = {codigo: info['nome'] for tabela in (NIVEIS_ENSINO, DISCIPLINAS) for codigo, info in tabela.items()}
+
+# Persistência das simulações: SQLite local ou PostgreSQL (SALAS_BANCO_URL), ver repositorio.py
+REPOSITORIO = criar_repositorio(conectar_db, rotulos=ROTULOS_BUSCA)
+
 # Categorias de custos fixos
 CATEGORIAS_CUSTOS = {
     'infraestrutura': ['Aluguel', 'Condomínio', 'Água', 'Energia', 'Internet', 'Limpeza'],
@@ -51,10 +94,65 @@ CATEGORIAS_CUSTOS = {
     'administrativo': ['Secretária', 'Coordenação', 'Contador', 'Seguro']
 }
 
+# Fragmentos HTML que dependem apenas das tabelas constantes: montados uma
+# única vez na importação (compartilhados entre workers com preload_app)
+def _montar_disciplinas_html():
+    """HTML para seleção de disciplinas"""
+    disciplinas_html = ""
+    for codigo, info in DISCIPLINAS.items():
+        disciplinas_html += f'''
+        <div class="col-md-4 mb-3">
+            <div class="form-check">
+                <input class="form-check-input disciplina-check" type="checkbox" 
+                       id="disc_{codigo}" value="{codigo}" data-custo="{info['custo_hora']}">
+                <label class="form-check-label" for="disc_{codigo}">
+                    <span class="disciplina-badge" style="background-color: {info['cor']};">
+                        {info['nome']} (R$ {info['custo_hora']}/h)
+                    </span>
+                </label>
+            </div>
+        </div>
+        '''
+    return disciplinas_html
+
+def _montar_niveis_html():
+    """HTML para níveis de ensino"""
+    niveis_html = ""
+    for codigo, info in NIVEIS_ENSINO.items():
+        niveis_html += f'''
+        <div class="col-md-3 mb-3">
+            <div class="card">
+                <div class="card-body text-center">
+                    <h6>{info['nome']}</h6>
+                    <small class="text-muted">{info['series']}</small>
+                    <div class="mt-2">
+                        <input type="radio" class="btn-check" name="nivel" 
+                               id="nivel_{codigo}" value="{codigo}" autocomplete="off">
+                        <label class="btn btn-outline-primary btn-sm" for="nivel_{codigo}">
+                            Selecionar
+                        </label>
+                    </div>
+                </div>
+            </div>
+        </div>
+        '''
+    return niveis_html
+
+DISCIPLINAS_HTML = _montar_disciplinas_html()
+NIVEIS_HTML = _montar_niveis_html()
+OPCOES_DISCIPLINAS_HTML = ''.join([f'<option value="{cod}" data-custo="{info["custo_hora"]}">{info["nome"]}</option>' for cod, info in DISCIPLINAS.items()])
+OPCOES_NIVEIS_HTML = ''.join([f'<option value="{cod}">{info["nome"]}</option>' for cod, info in NIVEIS_ENSINO.items()])
+
 def init_db():
-    """Inicializa o banco de dados"""
+    """Inicializa o banco de dados
+    
+    Erros de schema não são engolidos: sobem para quem chamou e impedem a
+    partida (gunicorn on_starting, lifespan do ASGI, __main__) ou falham a
+    requisição que abriu a primeira conexão (garantir_banco).
+    """
+    global _banco_inicializado
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = conectar_medido(DATABASE)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -93,6 +191,21 @@ def init_db():
         )
         ''')
         
+        # Paginação das turmas por simulação (relatório e API)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_turmas_simulacao ON turmas (simulacao_id)')
+        
+        # Histórico de versões (colunas de versão em turmas e simulacoes)
+        criar_tabelas_versoes(cursor)
+        
+        # Conteúdo das simulações deduplicado por hash
+        criar_tabela_conteudos(cursor)
+        
+        # Busca textual (FTS5) e índices das facetas do histórico
+        criar_indice_busca(cursor, ROTULOS_BUSCA)
+        
+        # Tarefas em segundo plano (importações, varreduras, reconstruções)
+        criar_tabela_tarefas(cursor)
+        
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS alunos (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -105,16 +218,18 @@ def init_db():
         )
         ''')
         
+        # Exclusão em cascata das turmas sem varrer a tabela de alunos
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alunos_turma ON alunos (turma_id)')
+        
         conn.commit()
         conn.close()
+        REPOSITORIO.criar_schema()
+        _banco_inicializado = True
         print("✅ Banco de dados de salas inicializado!")
         return True
     except Exception as e:
-        print(f"❌ Erro: {e}")
-        return False
-
-# Inicializar banco
-init_db()
+        print(f"❌ Erro ao inicializar o banco de dados: {e}")
+        raise
 
 def get_base_html(title="Viabilidade de Salas", content=""):
     """Retorna o HTML base"""
@@ -127,208 +242,7 @@ def get_base_html(title="Viabilidade de Salas", content=""):
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        :root {{
-            --primary: #4361ee;
-            --secondary: #3a0ca3;
-            --success: #4cc9f0;
-            --warning: #f72585;
-            --info: #7209b7;
-        }}
-        
-        body {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }}
-        
-        .container-main {{
-            background: rgba(255, 255, 255, 0.95);
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0,0,0,0.1);
-            margin-top: 30px;
-            margin-bottom: 30px;
-            padding: 30px;
-        }}
-        
-        .card {{
-            border-radius: 15px;
-            border: none;
-            box-shadow: 0 5px 15px rgba(0,0,0,0.08);
-            transition: transform 0.3s;
-            margin-bottom: 20px;
-        }}
-        
-        .card:hover {{
-            transform: translateY(-5px);
-        }}
-        
-        .card-header {{
-            border-radius: 15px 15px 0 0 !important;
-            font-weight: 600;
-        }}
-        
-        .btn-primary {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            border: none;
-            border-radius: 10px;
-            padding: 10px 25px;
-            font-weight: 600;
-        }}
-        
-        .btn-primary:hover {{
-            background: linear-gradient(135deg, #5a6fd8 0%, #6a4092 100%);
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-        }}
-        
-        .turma-card {{
-            border-left: 5px solid var(--primary);
-            background: #f8f9ff;
-        }}
-        
-        .disciplina-badge {{
-            display: inline-block;
-            padding: 5px 15px;
-            border-radius: 20px;
-            color: white;
-            font-weight: 600;
-            margin: 2px;
-        }}
-        
-        .nivel-badge {{
-            background: var(--info);
-            color: white;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-size: 0.8em;
-        }}
-        
-        .resultado-card {{
-            background: linear-gradient(135deg, #4cc9f0 0%, #4361ee 100%);
-            color: white;
-            border-radius: 15px;
-            padding: 20px;
-            margin: 10px 0;
-        }}
-        
-        .indicador {{
-            text-align: center;
-            padding: 15px 10px;
-            background: white;
-            border-radius: 10px;
-            box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-            min-height: 120px;
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-        }}
-        
-        .indicador .valor {{
-            font-size: 1.5em;
-            font-weight: 700;
-            margin: 10px 0;
-            white-space: nowrap;
-        }}
-        
-        .indicador .label {{
-            font-size: 0.9em;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-        
-        .indicador-horizontal {{
-            background: white;
-            border-radius: 10px;
-            padding: 20px 25px;
-            box-shadow: 0 3px 10px rgba(0,0,0,0.08);
-            transition: transform 0.2s;
-        }}
-        
-        .indicador-horizontal:hover {{
-            transform: translateX(5px);
-            box-shadow: 0 5px 15px rgba(0,0,0,0.15);
-        }}
-        
-        .label-horizontal {{
-            font-size: 0.85em;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            font-weight: 600;
-        }}
-        
-        .valor-horizontal {{
-            font-size: 1.8em;
-            font-weight: 700;
-            white-space: nowrap;
-        }}
-        
-        .table-custom {{
-            background: white;
-            border-radius: 10px;
-            overflow: hidden;
-        }}
-        
-        .table-custom thead {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-        }}
-        
-        .add-btn {{
-            background: #4cc9f0;
-            border: none;
-            border-radius: 50%;
-            width: 50px;
-            height: 50px;
-            color: white;
-            font-size: 1.5em;
-            cursor: pointer;
-            transition: all 0.3s;
-        }}
-        
-        .add-btn:hover {{
-            background: #3ab8df;
-            transform: rotate(90deg);
-        }}
-        
-        .form-control, .form-select {{
-            border-radius: 10px;
-            border: 2px solid #e0e0e0;
-            padding: 10px 15px;
-        }}
-        
-        .form-control:focus, .form-select:focus {{
-            border-color: #667eea;
-            box-shadow: 0 0 0 0.2rem rgba(102, 126, 234, 0.25);
-        }}
-        
-        .aluno-item {{
-            background: #f0f4ff;
-            border-radius: 10px;
-            padding: 15px;
-            margin: 10px 0;
-            border-left: 4px solid #4cc9f0;
-        }}
-        
-        .alert-custom {{
-            border-radius: 10px;
-            border: none;
-            padding: 15px;
-        }}
-        
-        @media (max-width: 768px) {{
-            .container-main {{
-                padding: 15px;
-                margin: 10px;
-            }}
-            
-            .indicador .valor {{
-                font-size: 1.5em;
-            }}
-        }}
-    </style>
+    <link rel="stylesheet" href="{ASSETS.url('css/salas.css')}">
 </head>
 <body>
     <nav class="navbar navbar-expand-lg navbar-dark" style="background: rgba(0,0,0,0.2); backdrop-filter: blur(10px);">
@@ -358,7 +272,7 @@ def get_base_html(title="Viabilidade de Salas", content=""):
 </body>
 </html>'''
 
-@app.route('/')
+@rotas.route('/')
 def index():
     """Página inicial"""
     content = '''
@@ -467,8 +381,8 @@ def index():
     '''
     return get_base_html("Viabilidade de Salas", content)
 
-@app.route('/simulacao')
-@app.route('/simulacao/<int:simulacao_id>')
+@rotas.route('/simulacao')
+@rotas.route('/simulacao/<int:simulacao_id>')
 def simulacao(simulacao_id=None):
     """Página de simulação de viabilidade"""
     modo_edicao = simulacao_id is not None
@@ -476,63 +390,23 @@ def simulacao(simulacao_id=None):
     
     if modo_edicao:
         try:
-            conn = sqlite3.connect(DATABASE)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM simulacoes WHERE id = ?', (simulacao_id,))
-            simulacao = cursor.fetchone()
+            simulacao = REPOSITORIO.carregar(simulacao_id)
             if simulacao:
                 dados_completos = json.loads(simulacao['dados_completos'])
                 dados_edicao = {
                     'id': simulacao_id,
                     'nome': simulacao['nome'],
+                    'versao': simulacao['versao_atual'] or 1,
+                    'salas_disponiveis': dados_completos.get('salas_disponiveis', 5),
+                    'capacidade_sala': dados_completos.get('capacidade_sala', 30),
                     'turmas': dados_completos.get('turmas', []),
                     'custos': dados_completos.get('custos', {}),
                     'alunos': dados_completos.get('alunos', [])
                 }
-            conn.close()
         except Exception as e:
             print(f"Erro ao carregar: {e}")
             return redirect('/historico')
     
-    # HTML para seleção de disciplinas
-    disciplinas_html = ""
-    for codigo, info in DISCIPLINAS.items():
-        disciplinas_html += f'''
-        <div class="col-md-4 mb-3">
-            <div class="form-check">
-                <input class="form-check-input disciplina-check" type="checkbox" 
-                       id="disc_{codigo}" value="{codigo}" data-custo="{info['custo_hora']}">
-                <label class="form-check-label" for="disc_{codigo}">
-                    <span class="disciplina-badge" style="background-color: {info['cor']};">
-                        {info['nome']} (R$ {info['custo_hora']}/h)
-                    </span>
-                </label>
-            </div>
-        </div>
-        '''
-    
-    # HTML para níveis de ensino
-    niveis_html = ""
-    for codigo, info in NIVEIS_ENSINO.items():
-        niveis_html += f'''
-        <div class="col-md-3 mb-3">
-            <div class="card">
-                <div class="card-body text-center">
-                    <h6>{info['nome']}</h6>
-                    <small class="text-muted">{info['series']}</small>
-                    <div class="mt-2">
-                        <input type="radio" class="btn-check" name="nivel" 
-                               id="nivel_{codigo}" value="{codigo}" autocomplete="off">
-                        <label class="btn btn-outline-primary btn-sm" for="nivel_{codigo}">
-                            Selecionar
-                        </label>
-                    </div>
-                </div>
-            </div>
-        </div>
-        '''
-    
     # HTML para custos fixos
     custos_html = ""
     for categoria, itens in CATEGORIAS_CUSTOS.items():
@@ -590,11 +464,18 @@ def simulacao(simulacao_id=None):
                                            value="{dados_edicao.get('nome', 'Minha Escola')}" required>
                                 </div>
                             </div>
-                            <div class="col-md-6">
+                            <div class="col-md-3">
                                 <div class="mb-3">
                                     <label class="form-label">Quantidade de Salas Disponíveis:</label>
                                     <input type="number" class="form-control" id="salas_disponiveis" 
-                                           value="{dados_edicao.get('salas', 5)}" min="1" required>
+                                           value="{dados_edicao.get('salas_disponiveis', 5)}" min="1" required>
+                                </div>
+                            </div>
+                            <div class="col-md-3">
+                                <div class="mb-3">
+                                    <label class="form-label">Capacidade por Sala:</label>
+                                    <input type="number" class="form-control" id="capacidade_sala" 
+                                           value="{dados_edicao.get('capacidade_sala', 30)}" min="1" required>
                                 </div>
                             </div>
                         </div>
@@ -606,7 +487,7 @@ def simulacao(simulacao_id=None):
                                     <i class="fas fa-graduation-cap"></i> Níveis de Ensino
                                 </h5>
                                 <div class="row">
-                                    {niveis_html}
+                                    {NIVEIS_HTML}
                                 </div>
                             </div>
                         </div>
@@ -619,7 +500,7 @@ def simulacao(simulacao_id=None):
                                 </h5>
                                 <p class="text-muted">Selecione as disciplinas que serão oferecidas:</p>
                                 <div class="row">
-                                    {disciplinas_html}
+                                    {DISCIPLINAS_HTML}
                                 </div>
                             </div>
                         </div>
@@ -636,7 +517,7 @@ def simulacao(simulacao_id=None):
                                     </button>
                                 </div>
                                 
-                                <div id="turmas_container" class="row">
+                                <div id="turmas_container" data-simulacao-id="{simulacao_id if modo_edicao else ''}" data-versao="{dados_edicao.get('versao', '')}">
                                     <!-- Turmas serão adicionadas aqui -->
                                 </div>
                             </div>
@@ -741,13 +622,13 @@ def simulacao(simulacao_id=None):
                         <div class="col-md-6">
                             <select class="form-select mb-2 select-disciplina" onchange="atualizarCustoProfessor(this)">
                                 <option value="">Selecione a disciplina</option>
-                                {''.join([f'<option value="{cod}" data-custo="{info["custo_hora"]}">{info["nome"]}</option>' for cod, info in DISCIPLINAS.items()])}
+                                {OPCOES_DISCIPLINAS_HTML}
                             </select>
                         </div>
                         <div class="col-md-6">
                             <select class="form-select mb-2 select-nivel">
                                 <option value="">Nível de ensino</option>
-                                {''.join([f'<option value="{cod}">{info["nome"]}</option>' for cod, info in NIVEIS_ENSINO.items()])}
+                                {OPCOES_NIVEIS_HTML}
                             </select>
                         </div>
                         <div class="col-md-6">
@@ -820,544 +701,130 @@ def simulacao(simulacao_id=None):
         </div>
     </template>
 
-    <script>
-    document.addEventListener('DOMContentLoaded', function() {{
-        // Adiciona uma turma inicial
-        adicionarTurma();
+    <script src="{ASSETS.url('js/simulacao.js')}"></script>
+    '''
+    
+    return get_base_html("Simulação de Viabilidade", content)
+
+@rotas.route('/api/nova_simulacao', methods=['POST'])
+def api_nova_simulacao():
+    """API para criar nova simulação"""
+    try:
+        dados = request.get_json(silent=True)
+        if not dados:
+            return jsonify({'error': 'Sem dados'}), 400
         
-        // Atualiza resumo quando campos são alterados
-        document.querySelectorAll('.form-control, .form-select').forEach(campo => {{
-            campo.addEventListener('input', atualizarResumo);
-        }});
+        print("Processando nova simulação de viabilidade...")
         
-        // Configura eventos para checkboxes de disciplinas
-        document.querySelectorAll('.disciplina-check').forEach(cb => {{
-            cb.addEventListener('change', atualizarResumo);
-        }});
+        # Calcular resultados (ou reaproveitar os de uma entrada idêntica já salva)
+        resultados, hash_conteudo = calcular_resultados_cache(dados)
         
-        atualizarResumo();
-    }});
-    
-    function adicionarTurma() {{
-        const container = document.getElementById('turmas_container');
-        const template = document.getElementById('template-turma').content.cloneNode(true);
-        
-        // Configurar eventos para a nova turma
-        const inputs = template.querySelectorAll('input, select');
-        inputs.forEach(input => {{
-            input.addEventListener('input', function() {{
-                if (this.classList.contains('nome-turma-input')) {{
-                    this.closest('.turma-card').querySelector('.nome-turma').textContent = this.value;
-                }}
-                calcularTurma(this.closest('.turma-card'));
-                atualizarResumo();
-            }});
-        }});
+        # Salvar no banco
+        simulacao_id = salvar_simulacao_banco(dados, resultados, hash_conteudo)
         
-        container.appendChild(template);
-        calcularTurma(container.lastElementChild.querySelector('.turma-card'));
-        atualizarResumo();
-    }}
-    
-    function removerTurma(elemento) {{
-        elemento.closest('.col-md-6').remove();
-        atualizarResumo();
-    }}
-    
-    function adicionarAluno() {{
-        const nome = document.getElementById('nome_aluno').value.trim();
-        const mensalidade = parseFloat(document.getElementById('mensalidade_aluno').value) || 0;
+        return jsonify({
+            **resultados,
+            'id': simulacao_id,
+            'success': True,
+            'message': 'Simulação salva com sucesso!'
+        })
         
-        if (!nome) {{
-            alert('Digite o nome do aluno');
-            return;
-        }}
+    except Exception as e:
+        print(f"Erro na API: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/atualizar_simulacao/<int:simulacao_id>', methods=['PUT'])
+def api_atualizar_simulacao(simulacao_id):
+    """API para atualizar simulação existente"""
+    try:
+        dados = request.get_json(silent=True)
+        if not dados:
+            return jsonify({'error': 'Sem dados'}), 400
+        try:
+            versao_esperada = versao_esperada_requisicao(dados, request.headers.get('If-Match'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        const container = document.getElementById('alunos_lista');
-        const template = document.getElementById('template-aluno').content.cloneNode(true);
+        # Calcular resultados (ou reaproveitar os de uma entrada idêntica já salva)
+        resultados, hash_conteudo = calcular_resultados_cache(dados)
         
-        template.querySelector('.nome-aluno').textContent = nome;
-        template.querySelector('.valor-mensalidade').textContent = mensalidade.toFixed(2);
+        # Atualizar no banco (nova versão, se ninguém alterou a simulação antes)
+        versao = atualizar_simulacao_banco(simulacao_id, dados, resultados, hash_conteudo, versao_esperada)
         
-        container.appendChild(template);
+        resposta = jsonify({
+            **resultados,
+            'id': simulacao_id,
+            'versao': versao,
+            'success': True,
+            'message': 'Simulação atualizada com sucesso!'
+        })
+        resposta.headers['ETag'] = f'"{versao}"'
+        return resposta
+        
+    except SimulacaoNaoEncontrada as e:
+        return jsonify({'error': str(e)}), 404
+    except ConflitoVersao as e:
+        print(f"⚠️ {e}")
+        resposta = jsonify({'error': str(e), 'versao_atual': e.versao_atual,
+                            'versao_esperada': e.versao_esperada})
+        if e.versao_atual is not None:
+            resposta.headers['ETag'] = f'"{e.versao_atual}"'
+        return resposta, 409
+    except Exception as e:
+        print(f"Erro na API atualizar: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def calcular_resultados_salas(dados: Dict) -> Dict:
+    """Calcula resultados para salas de aula"""
+    # Calcular totais das turmas
+    total_alunos = 0
+    total_capacidade = 0
+    receita_turmas = 0
+    custo_turmas = 0
+    total_turmas = len(dados.get('turmas', []))
+    
+    for turma in dados.get('turmas', []):
+        alunos = turma.get('alunos_matriculados', 0)
+        capacidade = turma.get('capacidade', 0)
+        horas_semanais = turma.get('horas_semanais', 0)
+        dias_semana = turma.get('dias_semana', 0)
+        custo_hora = turma.get('custo_hora_professor', 0)
+        mensalidade = turma.get('mensalidade_aluno', 0)
+        material = turma.get('custo_material_mensal', 0)
         
-        // Limpa os campos
-        document.getElementById('nome_aluno').value = '';
-        document.getElementById('mensalidade_aluno').value = '';
+        # Cálculos
+        horas_mensais = horas_semanais * dias_semana * 4
+        custo_professor = custo_hora * horas_mensais
+        custo_total = custo_professor + material
+        receita = alunos * mensalidade
         
-        atualizarResumo();
-    }}
+        total_alunos += alunos
+        total_capacidade += capacidade
+        receita_turmas += receita
+        custo_turmas += custo_total
     
-    function removerAluno(elemento) {{
-        elemento.closest('.aluno-item').remove();
-        atualizarResumo();
-    }}
+    # Calcular custos fixos
+    custos_fixos = 0
+    for categoria, itens in dados.get('custos', {}).items():
+        for item, valor in itens.items():
+            custos_fixos += valor
     
-    function calcularTurma(turmaCard) {{
-        const alunos = parseInt(turmaCard.querySelector('.alunos-matriculados').value) || 0;
-        const capacidade = parseInt(turmaCard.querySelector('.capacidade-turma').value) || 0;
-        const horasSemanais = parseFloat(turmaCard.querySelector('.horas-semanais').value) || 0;
-        const diasSemana = parseInt(turmaCard.querySelector('.dias-semana').value) || 0;
-        const custoHora = parseFloat(turmaCard.querySelector('.custo-hora-professor').value) || 0;
-        const mensalidade = parseFloat(turmaCard.querySelector('.mensalidade-aluno').value) || 0;
-        const custoMaterial = parseFloat(turmaCard.querySelector('.custo-material').value) || 0;
-        
-        // Cálculos
-        const horasMensais = horasSemanais * diasSemana * 4; // 4 semanas no mês
-        const custoProfessorMensal = custoHora * horasMensais;
-        const custoTotal = custoProfessorMensal + custoMaterial;
-        const receitaMensal = alunos * mensalidade;
-        const ocupacao = capacidade > 0 ? (alunos / capacidade) * 100 : 0;
-        
-        // Atualiza display
-        turmaCard.querySelector('.custo-mensal-turma').textContent = 
-            `R$ ${{custoTotal.toLocaleString('pt-BR', {{minimumFractionDigits: 2}})}}`;
-        turmaCard.querySelector('.receita-mensal-turma').textContent = 
-            `R$ ${{receitaMensal.toLocaleString('pt-BR', {{minimumFractionDigits: 2}})}}`;
-        
-        // Atualiza cor da borda baseada na ocupação
-        if (ocupacao >= 80) {{
-            turmaCard.style.borderLeftColor = '#28a745'; // Verde - boa ocupação
-        }} else if (ocupacao >= 50) {{
-            turmaCard.style.borderLeftColor = '#ffc107'; // Amarelo - média ocupação
-        }} else {{
-            turmaCard.style.borderLeftColor = '#dc3545'; // Vermelho - baixa ocupação
-        }}
-        
-        return {{
-            alunos: alunos,
-            capacidade: capacidade,
-            custoTotal: custoTotal,
-            receitaMensal: receitaMensal,
-            ocupacao: ocupacao
-        }};
-    }}
+    # Calcular alunos individuais
+    receita_alunos_individuais = 0
+    total_alunos_individuais = len(dados.get('alunos', []))
+    for aluno in dados.get('alunos', []):
+        receita_alunos_individuais += aluno.get('mensalidade', 0)
     
-    function atualizarCustoProfessor(select) {{
-        const custoHora = select.options[select.selectedIndex].getAttribute('data-custo');
-        if (custoHora) {{
-            const turmaCard = select.closest('.turma-card');
-            turmaCard.querySelector('.custo-hora-professor').value = custoHora;
-            calcularTurma(turmaCard);
-            atualizarResumo();
-        }}
-    }}
+    # Totais gerais
+    total_alunos_geral = total_alunos + total_alunos_individuais
+    receita_total = receita_turmas + receita_alunos_individuais
+    custo_total = custo_turmas + custos_fixos
+    lucro_mensal = receita_total - custo_total
+    margem_lucro = (lucro_mensal / receita_total * 100) if receita_total > 0 else 0
+    ticket_medio = (receita_total / total_alunos_geral) if total_alunos_geral > 0 else 0
+    ocupacao = (total_alunos / total_capacidade * 100) if total_capacidade > 0 else 0
     
-    function atualizarResumo() {{
-        // Coletar dados das turmas
-        let totalAlunos = 0, totalCapacidade = 0, receitaTurmas = 0, custoTurmas = 0;
-        const turmas = [];
-        
-        document.querySelectorAll('.turma-card').forEach(card => {{
-            const dados = calcularTurma(card);
-            turmas.push(dados);
-            
-            totalAlunos += dados.alunos;
-            totalCapacidade += dados.capacidade;
-            receitaTurmas += dados.receitaMensal;
-            custoTurmas += dados.custoTotal;
-        }});
-        
-        // Calcular ocupação total
-        const ocupacaoTotal = totalCapacidade > 0 ? (totalAlunos / totalCapacidade) * 100 : 0;
-        
-        // Custos fixos
-        let custosFixos = 0;
-        document.querySelectorAll('.campo-custo').forEach(campo => {{
-            custosFixos += parseFloat(campo.value) || 0;
-        }});
-        
-        // Alunos individuais (se houver)
-        let receitaAlunosIndividuais = 0;
-        let totalAlunosIndividuais = 0;
-        document.querySelectorAll('.aluno-item').forEach(item => {{
-            const mensalidade = parseFloat(item.querySelector('.valor-mensalidade').textContent) || 0;
-            receitaAlunosIndividuais += mensalidade;
-            totalAlunosIndividuais++;
-        }});
-        
-        // Totais gerais
-        const totalAlunosGeral = totalAlunos + totalAlunosIndividuais;
-        const receitaTotal = receitaTurmas + receitaAlunosIndividuais;
-        const custoTotal = custoTurmas + custosFixos;
-        const lucroMensal = receitaTotal - custoTotal;
-        const margemLucro = receitaTotal > 0 ? (lucroMensal / receitaTotal) * 100 : 0;
-        
-        // Ticket médio
-        const ticketMedio = totalAlunosGeral > 0 ? receitaTotal / totalAlunosGeral : 0;
-        
-        // Atualizar display do resumo
-        document.getElementById('resumo_financeiro').innerHTML = `
-            <div class="d-flex flex-column gap-3">
-                <div class="indicador-horizontal">
-                    <div class="d-flex justify-content-between align-items-center">
-                        <div>
-                            <div class="label-horizontal">ALUNOS</div>
-                            <div class="small text-muted mt-1">Ocupação: ${{ocupacaoTotal.toFixed(1)}}%</div>
-                        </div>
-                        <div class="valor-horizontal" style="color: #4361ee;">${{totalAlunosGeral}}</div>
-                    </div>
-                </div>
-                
-                <div class="indicador-horizontal">
-                    <div class="d-flex justify-content-between align-items-center">
-                        <div>
-                            <div class="label-horizontal">RECEITA/MÊS</div>
-                            <div class="small text-muted mt-1">Ticket: R$ ${{ticketMedio.toFixed(2)}}</div>
-                        </div>
-                        <div class="valor-horizontal" style="color: #28a745;">R$ ${{receitaTotal.toLocaleString('pt-BR', {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}</div>
-                    </div>
-                </div>
-                
-                <div class="indicador-horizontal">
-                    <div class="d-flex justify-content-between align-items-center">
-                        <div>
-                            <div class="label-horizontal">CUSTO/MÊS</div>
-                            <div class="small text-muted mt-1">Fixos: R$ ${{custosFixos.toLocaleString('pt-BR', {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}</div>
-                        </div>
-                        <div class="valor-horizontal" style="color: #dc3545;">R$ ${{custoTotal.toLocaleString('pt-BR', {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}</div>
-                    </div>
-                </div>
-                
-                <div class="indicador-horizontal">
-                    <div class="d-flex justify-content-between align-items-center">
-                        <div>
-                            <div class="label-horizontal">LUCRO/MÊS</div>
-                            <div class="small text-muted mt-1">Margem: ${{margemLucro.toFixed(1)}}%</div>
-                        </div>
-                        <div class="valor-horizontal" style="color: ${{lucroMensal >= 0 ? '#17a2b8' : '#dc3545'}};">R$ ${{lucroMensal.toLocaleString('pt-BR', {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="alert ${{lucroMensal >= 0 ? 'alert-success' : 'alert-danger'}} alert-custom mt-3">
-                <i class="fas ${{lucroMensal >= 0 ? 'fa-check-circle' : 'fa-exclamation-triangle'}}"></i>
-                <strong>${{lucroMensal >= 0 ? 'VIÁVEL' : 'INVIÁVEL'}}</strong> - 
-                ${{lucroMensal >= 0 ? 'O projeto é financeiramente viável.' : 'O projeto precisa de ajustes para ser viável.'}}
-            </div>
-        `;
-    }}
-    
-    async function calcularViabilidade(simulacaoId = null) {{
-        const btn = document.querySelector('button[onclick*="calcularViabilidade"]');
-        const originalText = btn.innerHTML;
-        btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processando...';
-        btn.disabled = true;
-        
-        try {{
-            // Coletar dados do formulário
-            const dados = {{
-                nome: document.getElementById('nome_analise').value,
-                salas_disponiveis: parseInt(document.getElementById('salas_disponiveis').value) || 0
-            }};
-            
-            // Coletar turmas
-            dados.turmas = [];
-            document.querySelectorAll('.turma-card').forEach(card => {{
-                dados.turmas.push({{
-                    nome: card.querySelector('.nome-turma-input').value,
-                    disciplina: card.querySelector('.select-disciplina').value,
-                    nivel: card.querySelector('.select-nivel').value,
-                    capacidade: parseInt(card.querySelector('.capacidade-turma').value) || 0,
-                    alunos_matriculados: parseInt(card.querySelector('.alunos-matriculados').value) || 0,
-                    horas_semanais: parseFloat(card.querySelector('.horas-semanais').value) || 0,
-                    dias_semana: parseInt(card.querySelector('.dias-semana').value) || 0,
-                    custo_hora_professor: parseFloat(card.querySelector('.custo-hora-professor').value) || 0,
-                    mensalidade_aluno: parseFloat(card.querySelector('.mensalidade-aluno').value) || 0,
-                    custo_material_mensal: parseFloat(card.querySelector('.custo-material').value) || 0
-                }});
-            }});
-            
-            // Coletar custos fixos
-            dados.custos = {{}};
-            document.querySelectorAll('.campo-custo').forEach(campo => {{
-                const categoria = campo.getAttribute('data-categoria');
-                const valor = parseFloat(campo.value) || 0;
-                
-                if (!dados.custos[categoria]) {{
-                    dados.custos[categoria] = {{}};
-                }}
-                // Extrai o nome do item do ID
-                const item = campo.id.split('_').slice(2).join(' ').replace(/_/g, ' ');
-                dados.custos[categoria][item] = valor;
-            }});
-            
-            // Coletar alunos individuais
-            dados.alunos = [];
-            document.querySelectorAll('.aluno-item').forEach(item => {{
-                dados.alunos.push({{
-                    nome: item.querySelector('.nome-aluno').textContent,
-                    mensalidade: parseFloat(item.querySelector('.valor-mensalidade').textContent) || 0
-                }});
-            }});
-            
-            // Enviar para API
-            const url = simulacaoId ? `/api/atualizar_simulacao/${{simulacaoId}}` : '/api/nova_simulacao';
-            const method = simulacaoId ? 'PUT' : 'POST';
-            
-            const response = await fetch(url, {{
-                method: method,
-                headers: {{ 'Content-Type': 'application/json' }},
-                body: JSON.stringify(dados)
-            }});
-            
-            if (!response.ok) {{
-                const error = await response.text();
-                throw new Error(error);
-            }}
-            
-            const resultados = await response.json();
-            
-            // Mostrar sucesso e redirecionar
-            alert('✅ Análise salva com sucesso! Redirecionando para relatório...');
-            window.location.href = `/relatorio/${{resultados.id || simulacaoId}}`;
-            
-        }} catch (error) {{
-            alert('❌ Erro: ' + error.message);
-        }} finally {{
-            btn.innerHTML = originalText;
-            btn.disabled = false;
-        }}
-    }}
-    
-    function carregarExemplo() {{
-        if (confirm('Carregar dados de exemplo?')) {{
-            // Limpar turmas existentes
-            document.getElementById('turmas_container').innerHTML = '';
-            
-            // Dados de exemplo
-            const exemplos = [
-                {{
-                    nome: 'Matemática 1º EM',
-                    disciplina: 'matematica',
-                    nivel: 'medio',
-                    capacidade: 30,
-                    alunos: 25,
-                    horas: 5,
-                    dias: 2,
-                    custo_hora: 65,
-                    mensalidade: 280,
-                    material: 150
-                }},
-                {{
-                    nome: 'Português 9º Ano',
-                    disciplina: 'portugues',
-                    nivel: 'fundamental_ii',
-                    capacidade: 30,
-                    alunos: 22,
-                    horas: 4,
-                    dias: 2,
-                    custo_hora: 60,
-                    mensalidade: 250,
-                    material: 120
-                }},
-                {{
-                    nome: 'Inglês Intermediário',
-                    disciplina: 'ingles',
-                    nivel: 'medio',
-                    capacidade: 25,
-                    alunos: 20,
-                    horas: 3,
-                    dias: 2,
-                    custo_hora: 75,
-                    mensalidade: 320,
-                    material: 200
-                }}
-            ];
-            
-            // Adicionar turmas de exemplo
-            exemplos.forEach((ex, index) => {{
-                setTimeout(() => {{
-                    adicionarTurma();
-                    const turmas = document.querySelectorAll('.turma-card');
-                    const ultimaTurma = turmas[turmas.length - 1];
-                    
-                    ultimaTurma.querySelector('.nome-turma-input').value = ex.nome;
-                    ultimaTurma.querySelector('.nome-turma').textContent = ex.nome;
-                    ultimaTurma.querySelector('.select-disciplina').value = ex.disciplina;
-                    ultimaTurma.querySelector('.select-nivel').value = ex.nivel;
-                    ultimaTurma.querySelector('.capacidade-turma').value = ex.capacidade;
-                    ultimaTurma.querySelector('.alunos-matriculados').value = ex.alunos;
-                    ultimaTurma.querySelector('.horas-semanais').value = ex.horas;
-                    ultimaTurma.querySelector('.dias-semana').value = ex.dias;
-                    ultimaTurma.querySelector('.custo-hora-professor').value = ex.custo_hora;
-                    ultimaTurma.querySelector('.mensalidade-aluno').value = ex.mensalidade;
-                    ultimaTurma.querySelector('.custo-material').value = ex.material;
-                    
-                    calcularTurma(ultimaTurma);
-                }}, index * 100);
-            }});
-            
-            // Preencher alguns custos fixos
-            setTimeout(() => {{
-                document.getElementById('nome_analise').value = 'Escola Exemplo';
-                document.getElementById('salas_disponiveis').value = 8;
-                
-                // Selecionar alguns checkboxes
-                ['matematica', 'portugues', 'ingles', 'ciencias'].forEach(id => {{
-                    const cb = document.getElementById('disc_' + id);
-                    if (cb) cb.checked = true;
-                }});
-                
-                // Selecionar nível
-                document.getElementById('nivel_medio').checked = true;
-                
-                // Preencher custos fixos de exemplo
-                const custosExemplo = {{
-                    'custo_infraestrutura_aluguel': 3500,
-                    'custo_infraestrutura_energia': 800,
-                    'custo_manutencao_material_de_limpeza': 300,
-                    'custo_administrativo_secretária': 2200
-                }};
-                
-                Object.entries(custosExemplo).forEach(([id, valor]) => {{
-                    const campo = document.getElementById(id);
-                    if (campo) campo.value = valor;
-                }});
-                
-                atualizarResumo();
-            }}, 400);
-        }}
-    }}
-    
-    function limparFormulario() {{
-        if (confirm('Tem certeza que deseja limpar todos os dados?')) {{
-            // Limpa todas as turmas
-            document.getElementById('turmas_container').innerHTML = '';
-            
-            // Limpa alunos
-            document.getElementById('alunos_lista').innerHTML = '';
-            
-            // Limpa campos básicos
-            document.getElementById('nome_analise').value = 'Minha Escola';
-            document.getElementById('salas_disponiveis').value = 5;
-            
-            // Desmarca checkboxes e radios
-            document.querySelectorAll('.disciplina-check').forEach(cb => cb.checked = false);
-            document.querySelectorAll('[name="nivel"]').forEach(radio => radio.checked = false);
-            
-            // Limpa custos fixos
-            document.querySelectorAll('.campo-custo').forEach(campo => campo.value = 0);
-            
-            // Limpa campos de aluno
-            document.getElementById('nome_aluno').value = '';
-            document.getElementById('mensalidade_aluno').value = '';
-            
-            // Adiciona uma turma vazia
-            setTimeout(() => {{
-                adicionarTurma();
-                atualizarResumo();
-            }}, 100);
-        }}
-    }}
-    </script>
-    '''
-    
-    return get_base_html("Simulação de Viabilidade", content)
-
-@app.route('/api/nova_simulacao', methods=['POST'])
-def api_nova_simulacao():
-    """API para criar nova simulação"""
-    try:
-        dados = request.get_json()
-        if not dados:
-            return jsonify({'error': 'Sem dados'}), 400
-        
-        print("Processando nova simulação de viabilidade...")
-        
-        # Calcular resultados
-        resultados = calcular_resultados_salas(dados)
-        
-        # Salvar no banco
-        simulacao_id = salvar_simulacao_banco(dados, resultados)
-        
-        return jsonify({
-            **resultados,
-            'id': simulacao_id,
-            'success': True,
-            'message': 'Simulação salva com sucesso!'
-        })
-        
-    except Exception as e:
-        print(f"Erro na API: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/atualizar_simulacao/<int:simulacao_id>', methods=['PUT'])
-def api_atualizar_simulacao(simulacao_id):
-    """API para atualizar simulação existente"""
-    try:
-        dados = request.get_json()
-        if not dados:
-            return jsonify({'error': 'Sem dados'}), 400
-        
-        # Calcular resultados
-        resultados = calcular_resultados_salas(dados)
-        
-        # Atualizar no banco
-        atualizar_simulacao_banco(simulacao_id, dados, resultados)
-        
-        return jsonify({
-            **resultados,
-            'id': simulacao_id,
-            'success': True,
-            'message': 'Simulação atualizada com sucesso!'
-        })
-        
-    except Exception as e:
-        print(f"Erro na API atualizar: {e}")
-        return jsonify({'error': str(e)}), 500
-
-def calcular_resultados_salas(dados: Dict) -> Dict:
-    """Calcula resultados para salas de aula"""
-    # Calcular totais das turmas
-    total_alunos = 0
-    total_capacidade = 0
-    receita_turmas = 0
-    custo_turmas = 0
-    total_turmas = len(dados.get('turmas', []))
-    
-    for turma in dados.get('turmas', []):
-        alunos = turma.get('alunos_matriculados', 0)
-        capacidade = turma.get('capacidade', 0)
-        horas_semanais = turma.get('horas_semanais', 0)
-        dias_semana = turma.get('dias_semana', 0)
-        custo_hora = turma.get('custo_hora_professor', 0)
-        mensalidade = turma.get('mensalidade_aluno', 0)
-        material = turma.get('custo_material_mensal', 0)
-        
-        # Cálculos
-        horas_mensais = horas_semanais * dias_semana * 4
-        custo_professor = custo_hora * horas_mensais
-        custo_total = custo_professor + material
-        receita = alunos * mensalidade
-        
-        total_alunos += alunos
-        total_capacidade += capacidade
-        receita_turmas += receita
-        custo_turmas += custo_total
-    
-    # Calcular custos fixos
-    custos_fixos = 0
-    for categoria, itens in dados.get('custos', {}).items():
-        for item, valor in itens.items():
-            custos_fixos += valor
-    
-    # Calcular alunos individuais
-    receita_alunos_individuais = 0
-    total_alunos_individuais = len(dados.get('alunos', []))
-    for aluno in dados.get('alunos', []):
-        receita_alunos_individuais += aluno.get('mensalidade', 0)
-    
-    # Totais gerais
-    total_alunos_geral = total_alunos + total_alunos_individuais
-    receita_total = receita_turmas + receita_alunos_individuais
-    custo_total = custo_turmas + custos_fixos
-    lucro_mensal = receita_total - custo_total
-    margem_lucro = (lucro_mensal / receita_total * 100) if receita_total > 0 else 0
-    ticket_medio = (receita_total / total_alunos_geral) if total_alunos_geral > 0 else 0
-    ocupacao = (total_alunos / total_capacidade * 100) if total_capacidade > 0 else 0
-    
-    return {
+    resultados = {
         'total_turmas': total_turmas,
         'total_alunos': total_alunos_geral,
         'total_professores': total_turmas,  # Assumindo 1 professor por turma
@@ -1370,167 +837,200 @@ def calcular_resultados_salas(dados: Dict) -> Dict:
         'ocupacao_salas': ocupacao,
         'custo_por_aluno': (custo_total / total_alunos_geral) if total_alunos_geral > 0 else 0
     }
+    
+    # Alocação real de salas (quando a grade e as salas são informadas; o
+    # formulário /simulacao envia as duas, montadas a partir das turmas)
+    salas = dados.get('salas', [])
+    aulas = dados.get('aulas', [])
+    if salas and aulas:
+        # Import tardio: só necessário quando a grade é enviada
+        from alocacao_salas import alocar_salas, aplicar_ocupacao_alocacao
+        
+        alunos_por_turma = {turma.get('nome', ''): turma.get('alunos_matriculados', 0)
+                            for turma in dados.get('turmas', [])}
+        alocacao = alocar_salas(aulas, salas, alunos_por_turma)
+        aplicar_ocupacao_alocacao(resultados, alocacao)
+    
+    return resultados
 
-def salvar_simulacao_banco(dados: Dict, resultados: Dict):
-    """Salva simulação no banco de dados"""
+# Resultados memoizados pelo hash da entrada (memória + disco, estatísticas em /metrics).
+# Incrementar conteudos.VERSAO_CALCULO sempre que calcular_resultados_salas mudar:
+# invalida o memo e os resultados guardados nos conteúdos.
+MEMO_RESULTADOS = MemoResultados(arquivo_memo(DATABASE))
+METRICAS.registrar_coletor(MEMO_RESULTADOS.exportar_metricas)
+
+def calcular_resultados_cache(dados: Dict):
+    """Resultados da simulação, reaproveitando os de uma entrada idêntica
+    
+    Procura no cache memoizado e depois nos conteúdos já salvos; só calcula
+    se nenhum dos dois tiver a entrada.
+    
+    Returns:
+        (resultados, hash do conteúdo)
+    """
+    hash_conteudo = hash_simulacao(dados)
+    chave = f'v{VERSAO_CALCULO}:{hash_conteudo}'
+    resultados = MEMO_RESULTADOS.obter(chave)
+    if resultados is None:
+        resultados = REPOSITORIO.resultados_guardados(hash_conteudo)
+        if resultados is None:
+            resultados = calcular_resultados_salas(dados)
+        MEMO_RESULTADOS.guardar(chave, resultados)
+    return resultados, hash_conteudo
+
+def salvar_simulacao_banco(dados: Dict, resultados: Dict, hash_conteudo: str = None):
+    """Salva simulação no banco de dados (o conteúdo vai para `conteudos`, deduplicado)"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO simulacoes (
-            nome, data_criacao, total_turmas, total_alunos, total_professores,
-            investimento_inicial, custo_mensal_total, receita_mensal_total,
-            lucro_mensal, margem_lucro, ticket_medio, dados_completos
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            dados.get('nome', 'Nova Simulação'),
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            resultados['total_turmas'],
-            resultados['total_alunos'],
-            resultados['total_professores'],
-            resultados['investimento_inicial'],
-            resultados['custo_mensal_total'],
-            resultados['receita_mensal_total'],
-            resultados['lucro_mensal'],
-            resultados['margem_lucro'],
-            resultados['ticket_medio'],
-            json.dumps({
-                'entrada': dados,
-                'resultados': resultados,
-                'turmas': dados.get('turmas', []),
-                'custos': dados.get('custos', {}),
-                'alunos': dados.get('alunos', [])
-            })
-        ))
-        
-        simulacao_id = cursor.lastrowid
-        
-        # Salvar turmas
-        for turma in dados.get('turmas', []):
-            cursor.execute('''
-            INSERT INTO turmas (
-                simulacao_id, nome_turma, nivel, disciplina, capacidade,
-                alunos_matriculados, horas_semanais, dias_semana,
-                custo_hora_professor, mensalidade_aluno, custo_material_mensal
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                simulacao_id,
-                turma.get('nome', ''),
-                turma.get('nivel', ''),
-                turma.get('disciplina', ''),
-                turma.get('capacidade', 0),
-                turma.get('alunos_matriculados', 0),
-                turma.get('horas_semanais', 0),
-                turma.get('dias_semana', 0),
-                turma.get('custo_hora_professor', 0),
-                turma.get('mensalidade_aluno', 0),
-                turma.get('custo_material_mensal', 0)
-            ))
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"✅ Simulação #{simulacao_id} salva no banco!")
-        return simulacao_id
-        
+        return REPOSITORIO.salvar(dados, resultados, hash_conteudo)
     except Exception as e:
         print(f"❌ Erro ao salvar no banco: {e}")
         return None
 
-def atualizar_simulacao_banco(simulacao_id: int, dados: Dict, resultados: Dict):
-    """Atualiza simulação existente no banco"""
+def versao_esperada_requisicao(dados: Dict, if_match: str = None):
+    """Versão que o cliente editou: cabeçalho If-Match ("3" ou W/"3") ou campo
+    versao_esperada do corpo, que é retirado de `dados` (não faz parte da entrada)
+    
+    Returns:
+        número da versão, ou None para atualizar sem verificação
+    """
+    valor = dados.pop('versao_esperada', None)
+    if if_match and if_match.strip() != '*':
+        valor = if_match.strip().removeprefix('W/').strip('"')
+    if valor is None:
+        return None
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        UPDATE simulacoes SET
-            nome = ?,
-            total_turmas = ?,
-            total_alunos = ?,
-            total_professores = ?,
-            investimento_inicial = ?,
-            custo_mensal_total = ?,
-            receita_mensal_total = ?,
-            lucro_mensal = ?,
-            margem_lucro = ?,
-            ticket_medio = ?,
-            dados_completos = ?
-        WHERE id = ?
-        ''', (
-            dados.get('nome', 'Simulação Atualizada'),
-            resultados['total_turmas'],
-            resultados['total_alunos'],
-            resultados['total_professores'],
-            resultados['investimento_inicial'],
-            resultados['custo_mensal_total'],
-            resultados['receita_mensal_total'],
-            resultados['lucro_mensal'],
-            resultados['margem_lucro'],
-            resultados['ticket_medio'],
-            json.dumps({
-                'entrada': dados,
-                'resultados': resultados,
-                'turmas': dados.get('turmas', []),
-                'custos': dados.get('custos', {}),
-                'alunos': dados.get('alunos', [])
-            }),
-            simulacao_id
-        ))
-        
-        # Remover turmas antigas
-        cursor.execute('DELETE FROM turmas WHERE simulacao_id = ?', (simulacao_id,))
-        
-        # Salvar novas turmas
-        for turma in dados.get('turmas', []):
-            cursor.execute('''
-            INSERT INTO turmas (
-                simulacao_id, nome_turma, nivel, disciplina, capacidade,
-                alunos_matriculados, horas_semanais, dias_semana,
-                custo_hora_professor, mensalidade_aluno, custo_material_mensal
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                simulacao_id,
-                turma.get('nome', ''),
-                turma.get('nivel', ''),
-                turma.get('disciplina', ''),
-                turma.get('capacidade', 0),
-                turma.get('alunos_matriculados', 0),
-                turma.get('horas_semanais', 0),
-                turma.get('dias_semana', 0),
-                turma.get('custo_hora_professor', 0),
-                turma.get('mensalidade_aluno', 0),
-                turma.get('custo_material_mensal', 0)
-            ))
-        
-        conn.commit()
-        conn.close()
-        
-        print(f"✅ Simulação #{simulacao_id} atualizada!")
-        
-    except Exception as e:
-        print(f"❌ Erro ao atualizar no banco: {e}")
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'Versão esperada inválida: {valor}')
+
+def atualizar_simulacao_banco(simulacao_id: int, dados: Dict, resultados: Dict, hash_conteudo: str = None,
+                              versao_esperada: int = None):
+    """Atualiza simulação existente no banco, gravando uma nova versão
+    
+    Só as turmas que mudaram são escritas (versoes_simulacao); se a entrada
+    não mudou, nenhuma versão é criada e só os resultados são regravados.
+    Tudo roda em uma única transação (BEGIN IMMEDIATE no SQLite, linha travada
+    com FOR UPDATE no PostgreSQL): ou a versão inteira é gravada, ou nada é.
+    
+    versao_esperada: versão que o cliente editou; se a simulação já estiver em
+    outra, nada é gravado e ConflitoVersao é lançada.
+    
+    Returns:
+        número da versão atual
+    """
+    return REPOSITORIO.atualizar(simulacao_id, dados, resultados, hash_conteudo, versao_esperada)
+
+HISTORICO_POR_PAGINA = 20
+
+def ler_margem_busca(args, nome: str):
+    """Filtro de margem (%) da query string: None se ausente, ValueError se não for número"""
+    valor = args.get(nome, '').strip()
+    if not valor:
+        return None
+    try:
+        margem = float(valor)
+    except ValueError:
+        margem = math.nan
+    if not math.isfinite(margem):
+        raise ValueError(f'{nome} deve ser um número')
+    return margem
+
+def ler_filtros_busca(args) -> Dict:
+    """Filtros da busca na query string (?q=&nivel=&disciplina=&margem_min=&margem_max=)"""
+    return {
+        'texto': args.get('q', '').strip(),
+        'nivel': args.get('nivel') or None,
+        'disciplina': args.get('disciplina') or None,
+        'margem_min': ler_margem_busca(args, 'margem_min'),
+        'margem_max': ler_margem_busca(args, 'margem_max')
+    }
+
+def parametros_busca(filtros: Dict, **alterados) -> str:
+    """Query string dos filtros (para os links de facetas e de páginas)"""
+    nomes = {'texto': 'q'}
+    valores = {nomes.get(chave, chave): valor for chave, valor in {**filtros, **alterados}.items()
+               if valor not in (None, '') and not (chave == 'offset' and valor == 0)}
+    return urlencode(valores)
+
+def documento_facetas(contagens: Dict) -> Dict:
+    """Facetas com o nome de exibição, das mais frequentes para as menos"""
+    return {
+        faceta: [{'valor': valor, 'nome': ROTULOS_BUSCA.get(valor, valor), 'simulacoes': total}
+                 for valor, total in sorted(contagens[faceta].items(), key=lambda item: (-item[1], item[0]))]
+        for faceta in FACETAS
+    }
+
+def renderizar_busca_historico(filtros: Dict, busca: Dict) -> str:
+    """Formulário de busca e facetas (com as contagens da busca atual) do histórico"""
+    opcoes = {'nivel': NIVEIS_ENSINO, 'disciplina': DISCIPLINAS}
+    selects = ''
+    for faceta, rotulo in (('nivel', 'Todos os níveis'), ('disciplina', 'Todas as disciplinas')):
+        itens = ''.join(f'<option value="{codigo}"{" selected" if filtros[faceta] == codigo else ""}>{info["nome"]}</option>'
+                        for codigo, info in opcoes[faceta].items())
+        selects += f'''
+                    <div class="col-md-3">
+                        <select class="form-select" name="{faceta}"><option value="">{rotulo}</option>{itens}</select>
+                    </div>'''
+    
+    facetas_html = ''
+    for faceta, itens in documento_facetas(busca['facetas']).items():
+        if not itens:
+            continue
+        links = ''.join(f'''
+                    <a href="/historico?{parametros_busca(filtros, **{faceta: None if filtros[faceta] == item['valor'] else item['valor']})}"
+                       class="badge {'bg-primary' if filtros[faceta] == item['valor'] else 'bg-light text-dark border'} text-decoration-none me-1 mb-1">
+                        {escape(item['nome'])} <span class="opacity-75">{item['simulacoes']}</span>
+                    </a>''' for item in itens)
+        facetas_html += f'''
+                <div class="mt-2"><small class="text-muted me-2">{'Nível' if faceta == 'nivel' else 'Disciplina'}:</small>{links}</div>'''
+    
+    margem_max = '' if filtros['margem_max'] is None else f"{filtros['margem_max']:g}"
+    return f'''
+        <div class="card mb-4">
+            <div class="card-body">
+                <form method="get" action="/historico" class="row g-2">
+                    <div class="col-md-4">
+                        <input type="search" class="form-control" name="q" value="{escape(filtros['texto'])}"
+                               placeholder="Buscar por nome, turma, disciplina ou nível">
+                    </div>{selects}
+                    <div class="col-md-1">
+                        <input type="number" step="any" class="form-control" name="margem_max" value="{margem_max}"
+                               placeholder="Margem <" title="Margem de lucro abaixo de (%)">
+                    </div>
+                    <div class="col-md-1 d-grid">
+                        <button class="btn btn-primary" type="submit"><i class="fas fa-search"></i></button>
+                    </div>
+                </form>{facetas_html}
+            </div>
+        </div>
+    '''
 
-@app.route('/historico')
+def renderizar_paginacao_historico(filtros: Dict, total: int, offset: int) -> str:
+    """Contagem e links de página anterior/próxima do histórico"""
+    anterior = max(offset - HISTORICO_POR_PAGINA, 0)
+    proxima = offset + HISTORICO_POR_PAGINA
+    links = ''
+    if offset > 0:
+        links += f'<a class="btn btn-outline-secondary btn-sm me-2" href="/historico?{parametros_busca(filtros, offset=anterior)}">&laquo; Anteriores</a>'
+    if proxima < total:
+        links += f'<a class="btn btn-outline-secondary btn-sm" href="/historico?{parametros_busca(filtros, offset=proxima)}">Próximas &raquo;</a>'
+    exibidas = f'{offset + 1}–{min(proxima, total)} de {total}' if total else '0'
+    return f'''
+        <div class="d-flex justify-content-between align-items-center mt-3">
+            <small class="text-muted">{exibidas} análises</small>
+            <div>{links}</div>
+        </div>
+    '''
+
+@rotas.route('/historico')
 def historico():
-    """Página com histórico de simulações"""
+    """Página com histórico de simulações (busca, facetas e paginação)"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT id, nome, data_criacao, total_turmas, total_alunos,
-               receita_mensal_total, custo_mensal_total, lucro_mensal,
-               margem_lucro, ticket_medio
-        FROM simulacoes 
-        ORDER BY data_criacao DESC 
-        LIMIT 20
-        ''')
-        
-        simulacoes = cursor.fetchall()
-        conn.close()
+        filtros = ler_filtros_busca(request.args)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        busca = REPOSITORIO.buscar(filtros, HISTORICO_POR_PAGINA, offset)
+        simulacoes = busca['simulacoes']
+        filtrado = any(valor not in (None, '') for valor in filtros.values())
         
         # HTML para tabela
         tabela_html = ""
@@ -1599,6 +1099,14 @@ def historico():
                 </div>
             </div>
             '''
+            tabela_html += renderizar_paginacao_historico(filtros, busca['total'], offset)
+        elif filtrado or offset:
+            tabela_html = '''
+            <div class="alert alert-warning">
+                <i class="fas fa-search"></i> Nenhuma análise atende à busca.
+                <a href="/historico" class="alert-link">Limpar filtros</a>.
+            </div>
+            '''
         else:
             tabela_html = '''
             <div class="alert alert-info">
@@ -1614,6 +1122,8 @@ def historico():
                     <i class="fas fa-history"></i> Histórico de Análises
                 </h3>
                 
+                {renderizar_busca_historico(filtros, busca)}
+                
                 {tabela_html}
                 
                 <div class="mt-4">
@@ -1651,21 +1161,114 @@ def historico():
         
         return get_base_html("Histórico", content)
         
+    except ValueError as e:
+        return get_base_html("Histórico", f'<div class="alert alert-warning">{escape(str(e))}</div>'), 400
     except Exception as e:
         print(f"Erro no histórico: {e}")
         return redirect('/')
 
-@app.route('/relatorio/<int:simulacao_id>')
+def renderizar_card_turma(turma: Dict, indicadores: Dict = None) -> str:
+    """Card de uma turma no relatório (indicadores com rateio: mostra o lucro pleno)"""
+    disciplinas_info = DISCIPLINAS.get(turma.get('disciplina', ''), {'nome': 'Não especificada', 'cor': '#ccc'})
+    niveis_info = NIVEIS_ENSINO.get(turma.get('nivel', ''), {'nome': 'Não especificado'})
+    
+    # Calcular valores para esta turma
+    alunos = turma.get('alunos_matriculados', 0)
+    capacidade = turma.get('capacidade', 0)
+    horas_semanais = turma.get('horas_semanais', 0)
+    dias_semana = turma.get('dias_semana', 0)
+    custo_hora = turma.get('custo_hora_professor', 0)
+    
+    indicadores = indicadores or calcular_indicadores_turma(turma)
+    custo_total = indicadores['custo_total']
+    receita = indicadores['receita']
+    lucro = indicadores['lucro']
+    ocupacao = indicadores['ocupacao']
+    
+    return f'''
+    <div class="col-md-6">
+        <div class="card mb-4" style="border-left: 5px solid {disciplinas_info['cor']};">
+            <div class="card-header d-flex justify-content-between align-items-center">
+                <h6 class="mb-0">
+                    <i class="fas fa-chalkboard"></i> {turma.get('nome', 'Turma sem nome')}
+                </h6>
+                <span class="nivel-badge">{niveis_info['nome']}</span>
+            </div>
+            <div class="card-body">
+                <div class="row">
+                    <div class="col-6">
+                        <small class="text-muted">Disciplina</small>
+                        <p class="mb-1">
+                            <span class="disciplina-badge" style="background-color: {disciplinas_info['cor']};">
+                                {disciplinas_info['nome']}
+                            </span>
+                        </p>
+                    </div>
+                    <div class="col-6">
+                        <small class="text-muted">Ocupação</small>
+                        <p class="mb-1">
+                            <span class="badge { 'bg-success' if ocupacao >= 80 else 'bg-warning' if ocupacao >= 50 else 'bg-danger' }">
+                                {ocupacao:.1f}% ({alunos}/{capacidade})
+                            </span>
+                        </p>
+                    </div>
+                </div>
+                
+                <div class="row mt-2">
+                    <div class="col-6">
+                        <small class="text-muted">Carga horária</small>
+                        <p class="mb-1">{horas_semanais}h/semana × {dias_semana} dias</p>
+                    </div>
+                    <div class="col-6">
+                        <small class="text-muted">Custo/hora professor</small>
+                        <p class="mb-1">R$ {custo_hora:.2f}</p>
+                    </div>
+                </div>
+                
+                <div class="row mt-3 text-center">
+                    <div class="col-4">
+                        <div class="small text-muted">Custo/Mês</div>
+                        <div class="text-danger">R$ {custo_total:,.2f}</div>
+                    </div>
+                    <div class="col-4">
+                        <div class="small text-muted">Receita/Mês</div>
+                        <div class="text-success">R$ {receita:,.2f}</div>
+                    </div>
+                    <div class="col-4">
+                        <div class="small text-muted">Lucro/Mês</div>
+                        <div class="{ 'text-success' if lucro >= 0 else 'text-danger' }">R$ {lucro:,.2f}</div>
+                    </div>
+                </div>
+                {renderizar_rateio_turma(indicadores)}
+            </div>
+        </div>
+    </div>
+    '''
+
+def renderizar_rateio_turma(indicadores: Dict) -> str:
+    """Linha do card com o custo fixo rateado e o lucro pleno (vazia sem rateio)"""
+    if 'lucro_pleno' not in indicadores:
+        return ''
+    lucro_pleno = indicadores['lucro_pleno']
+    return f'''
+                <div class="row mt-2 text-center border-top pt-2">
+                    <div class="col-6">
+                        <div class="small text-muted">Custo fixo rateado</div>
+                        <div>R$ {indicadores['custo_fixo_rateado']:,.2f}</div>
+                    </div>
+                    <div class="col-6">
+                        <div class="small text-muted">Lucro pleno</div>
+                        <div class="{ 'text-success' if lucro_pleno >= 0 else 'text-danger' }">R$ {lucro_pleno:,.2f}</div>
+                    </div>
+                </div>
+    '''
+
+
+@rotas.route('/relatorio/<int:simulacao_id>')
 def relatorio(simulacao_id):
     """Página de relatório detalhado"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM simulacoes WHERE id = ?', (simulacao_id,))
-        simulacao = cursor.fetchone()
-        
+        simulacao = REPOSITORIO.carregar(simulacao_id)
         if not simulacao:
             return redirect('/historico')
         
@@ -1674,89 +1277,14 @@ def relatorio(simulacao_id):
         turmas = dados_completos.get('turmas', [])
         custos = dados_completos.get('custos', {})
         
-        conn.close()
-        
         # HTML para turmas
-        turmas_html = ""
-        for turma in turmas:
-            disciplinas_info = DISCIPLINAS.get(turma.get('disciplina', ''), {'nome': 'Não especificada', 'cor': '#ccc'})
-            niveis_info = NIVEIS_ENSINO.get(turma.get('nivel', ''), {'nome': 'Não especificado'})
-            
-            # Calcular valores para esta turma
-            alunos = turma.get('alunos_matriculados', 0)
-            capacidade = turma.get('capacidade', 0)
-            horas_semanais = turma.get('horas_semanais', 0)
-            dias_semana = turma.get('dias_semana', 0)
-            custo_hora = turma.get('custo_hora_professor', 0)
-            mensalidade = turma.get('mensalidade_aluno', 0)
-            material = turma.get('custo_material_mensal', 0)
-            
-            horas_mensais = horas_semanais * dias_semana * 4
-            custo_professor = custo_hora * horas_mensais
-            custo_total = custo_professor + material
-            receita = alunos * mensalidade
-            lucro = receita - custo_total
-            margem = (lucro / receita * 100) if receita > 0 else 0
-            ocupacao = (alunos / capacidade * 100) if capacidade > 0 else 0
-            
-            turmas_html += f'''
-            <div class="col-md-6">
-                <div class="card mb-4" style="border-left: 5px solid {disciplinas_info['cor']};">
-                    <div class="card-header d-flex justify-content-between align-items-center">
-                        <h6 class="mb-0">
-                            <i class="fas fa-chalkboard"></i> {turma.get('nome', 'Turma sem nome')}
-                        </h6>
-                        <span class="nivel-badge">{niveis_info['nome']}</span>
-                    </div>
-                    <div class="card-body">
-                        <div class="row">
-                            <div class="col-6">
-                                <small class="text-muted">Disciplina</small>
-                                <p class="mb-1">
-                                    <span class="disciplina-badge" style="background-color: {disciplinas_info['cor']};">
-                                        {disciplinas_info['nome']}
-                                    </span>
-                                </p>
-                            </div>
-                            <div class="col-6">
-                                <small class="text-muted">Ocupação</small>
-                                <p class="mb-1">
-                                    <span class="badge { 'bg-success' if ocupacao >= 80 else 'bg-warning' if ocupacao >= 50 else 'bg-danger' }">
-                                        {ocupacao:.1f}% ({alunos}/{capacidade})
-                                    </span>
-                                </p>
-                            </div>
-                        </div>
-                        
-                        <div class="row mt-2">
-                            <div class="col-6">
-                                <small class="text-muted">Carga horária</small>
-                                <p class="mb-1">{horas_semanais}h/semana × {dias_semana} dias</p>
-                            </div>
-                            <div class="col-6">
-                                <small class="text-muted">Custo/hora professor</small>
-                                <p class="mb-1">R$ {custo_hora:.2f}</p>
-                            </div>
-                        </div>
-                        
-                        <div class="row mt-3 text-center">
-                            <div class="col-4">
-                                <div class="small text-muted">Custo/Mês</div>
-                                <div class="text-danger">R$ {custo_total:,.2f}</div>
-                            </div>
-                            <div class="col-4">
-                                <div class="small text-muted">Receita/Mês</div>
-                                <div class="text-success">R$ {receita:,.2f}</div>
-                            </div>
-                            <div class="col-4">
-                                <div class="small text-muted">Lucro/Mês</div>
-                                <div class="{ 'text-success' if lucro >= 0 else 'text-danger' }">R$ {lucro:,.2f}</div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            '''
+        # Só a primeira página vai no HTML, montada como as demais (tabela turmas +
+        # base do rateio); as outras são carregadas sob demanda (lista_virtual.js)
+        turmas_prejuizo = sum(1 for item in indicadores_com_rateio(turmas, custos) if item['lucro_pleno'] < 0)
+        total_turmas, turmas_html = renderizar_pagina_turmas(simulacao_id, 0)
+        script_lista = ''
+        if total_turmas > TURMAS_POR_PAGINA:
+            script_lista = f'<script src="{ASSETS.url("js/lista_virtual.js")}"></script>'
         
         # HTML para custos fixos
         custos_html = ""
@@ -1866,11 +1394,16 @@ def relatorio(simulacao_id):
                         
                         <!-- Turmas -->
                         <h5 class="mt-5 mb-3">
-                            <i class="fas fa-chalkboard"></i> Turmas ({len(turmas)})
+                            <i class="fas fa-chalkboard"></i> Turmas ({total_turmas})
+                            <small class="text-muted ms-2">{turmas_prejuizo} com prejuízo após o rateio dos custos fixos</small>
                         </h5>
-                        <div class="row">
-                            {turmas_html if turmas_html else '<div class="col-12"><p class="text-center text-muted">Nenhuma turma cadastrada.</p></div>'}
+                        <div id="lista_turmas" data-total="{total_turmas}" data-por-pagina="{TURMAS_POR_PAGINA}"
+                             data-url="/relatorio/{simulacao_id}/turmas">
+                            <div class="row pagina-turmas" data-pagina="0">
+                                {turmas_html if turmas_html else '<div class="col-12"><p class="text-center text-muted">Nenhuma turma cadastrada.</p></div>'}
+                            </div>
                         </div>
+                        {script_lista}
                         
                         <!-- Custos Fixos -->
                         <h5 class="mt-5 mb-3">
@@ -1968,7 +1501,397 @@ def relatorio(simulacao_id):
         print(f"Erro no relatório: {e}")
         return redirect('/historico')
 
-@app.route('/exemplo')
+# ============================================
+# API JSON DE LEITURA
+# ============================================
+
+CAMPOS_DADOS_COMPLETOS = {'resultados', 'turmas', 'custos', 'alunos', 'total_custos_fixos'}
+LIMITE_LISTAGEM = 200
+LIMITE_COMPARACAO = 10
+TURMAS_POR_PAGINA = 50
+
+def calcular_indicadores_turma(turma: Dict, rateio: Dict = None) -> Dict:
+    """Custo, receita, lucro, margem e ocupação mensais de uma turma
+    
+    Com o rateio (rateio_custos.ratear_custos_fixos) inclui o custo fixo
+    atribuído à turma e o lucro pleno (depois dos custos fixos).
+    """
+    alunos = turma.get('alunos_matriculados', 0)
+    capacidade = turma.get('capacidade', 0)
+    horas_mensais = turma.get('horas_semanais', 0) * turma.get('dias_semana', 0) * 4
+    custo_professor = turma.get('custo_hora_professor', 0) * horas_mensais
+    custo_total = custo_professor + turma.get('custo_material_mensal', 0)
+    receita = alunos * turma.get('mensalidade_aluno', 0)
+    lucro = receita - custo_total
+    indicadores = {
+        'horas_mensais': horas_mensais,
+        'custo_professor': custo_professor,
+        'custo_total': custo_total,
+        'receita': receita,
+        'lucro': lucro,
+        'margem': (lucro / receita * 100) if receita > 0 else 0,
+        'ocupacao': (alunos / capacidade * 100) if capacidade > 0 else 0
+    }
+    if rateio is not None:
+        lucro_pleno = lucro - rateio['total']
+        indicadores.update({
+            'custo_fixo_rateado': rateio['total'],
+            'rateio': rateio,
+            'custo_pleno': custo_total + rateio['total'],
+            'lucro_pleno': lucro_pleno,
+            'margem_pleno': (lucro_pleno / receita * 100) if receita > 0 else 0
+        })
+    return indicadores
+
+def indicadores_com_rateio(turmas: List[Dict], custos: Dict, direcionador: str = None,
+                           totais: Dict = None) -> List[Dict]:
+    """Indicadores de cada turma com os custos fixos rateados
+    
+    totais: pesos da simulação inteira, quando `turmas` é só uma página
+    """
+    # Import tardio: numpy (opcional) só é carregado quando há relatório
+    from rateio_custos import ratear_custos_fixos
+    
+    rateios = ratear_custos_fixos(turmas, custos, direcionador, totais)
+    return [calcular_indicadores_turma(turma, rateio) for turma, rateio in zip(turmas, rateios)]
+
+def buscar_base_rateio(simulacao_id: int):
+    """Pesos totais das turmas (agregados no banco) e custos fixos de uma simulação
+    
+    Permite ratear uma página de turmas sem carregar todas.
+    
+    Returns:
+        (totais por direcionador, custos) ou None se a simulação não existe
+    """
+    return REPOSITORIO.base_rateio(simulacao_id)
+
+def precisa_dados_completos(campos) -> bool:
+    """dados_completos só é lido se algum campo pedido precisar dele"""
+    raiz = campos_raiz(campos)
+    return raiz is None or bool(raiz & CAMPOS_DADOS_COMPLETOS)
+
+def documento_simulacao(linha, campos=None, relatorio=False, direcionador=None) -> Dict:
+    """Monta o JSON de leitura de uma simulação a partir da linha do banco
+    
+    Com relatorio=True inclui os indicadores de cada turma (com o rateio dos
+    custos fixos) e o total de custos fixos.
+    """
+    documento = {
+        'id': linha['id'],
+        'nome': linha['nome'],
+        'data_criacao': linha['data_criacao'],
+        'totais': {coluna: linha[coluna] for coluna in COLUNAS_TOTAIS}
+    }
+    if 'dados_completos' in linha.keys():
+        dados_completos = json_rapido.loads(linha['dados_completos'])
+        turmas = dados_completos.get('turmas', [])
+        custos = dados_completos.get('custos', {})
+        if relatorio:
+            indicadores = indicadores_com_rateio(turmas, custos, direcionador)
+            turmas = [{**turma, 'indicadores': item} for turma, item in zip(turmas, indicadores)]
+            documento['total_custos_fixos'] = sum(
+                valor for itens in custos.values() for valor in itens.values() if valor > 0
+            )
+        documento['resultados'] = dados_completos.get('resultados', {})
+        documento['turmas'] = turmas
+        documento['custos'] = custos
+        documento['alunos'] = dados_completos.get('alunos', [])
+    return selecionar_campos(documento, campos)
+
+def buscar_simulacao(simulacao_id: int, campos):
+    return REPOSITORIO.carregar(simulacao_id, precisa_dados_completos(campos))
+
+def buscar_turmas_pagina(simulacao_id: int, offset: int, limite: int):
+    """Página de turmas direto da tabela turmas (sem carregar o JSON completo)
+    
+    Returns:
+        (total de turmas da simulação, lista de turmas no formato de entrada)
+    """
+    return REPOSITORIO.pagina_turmas(simulacao_id, offset, limite)
+
+def renderizar_pagina_turmas(simulacao_id: int, pagina: int):
+    """Cards de uma página de turmas do relatório (a página 0 e as da lista virtual)
+    
+    Returns:
+        (total de turmas da simulação, HTML dos cards); (0, '') se a simulação não existe
+    """
+    base = buscar_base_rateio(simulacao_id)
+    if base is None:
+        return 0, ''
+    
+    totais, custos = base
+    total, turmas = buscar_turmas_pagina(simulacao_id, pagina * TURMAS_POR_PAGINA, TURMAS_POR_PAGINA)
+    indicadores = indicadores_com_rateio(turmas, custos, totais=totais)
+    return total, ''.join(renderizar_card_turma(turma, item) for turma, item in zip(turmas, indicadores))
+
+def ler_paginacao():
+    """offset/limite da query string (limite padrão: uma página de turmas)"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limite = min(max(request.args.get('limite', TURMAS_POR_PAGINA, type=int), 1), LIMITE_LISTAGEM)
+    return offset, limite
+
+@rotas.route('/api/simulacoes')
+def api_listar_simulacoes():
+    """API: simulações mais recentes (?limite=20&campos=id,nome,totais.lucro_mensal)"""
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        limite = min(max(request.args.get('limite', 20, type=int), 1), LIMITE_LISTAGEM)
+        
+        simulacoes = REPOSITORIO.listar(limite, precisa_dados_completos(campos))
+        
+        return resposta_json({'simulacoes': [documento_simulacao(linha, campos) for linha in simulacoes]})
+        
+    except Exception as e:
+        print(f"Erro na API de simulações: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/buscar')
+def api_buscar_simulacoes():
+    """API: busca textual e por facetas (?q=fisica&nivel=medio&disciplina=fisica&margem_max=10&offset=0&limite=20)"""
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limite = min(max(request.args.get('limite', 20, type=int), 1), LIMITE_LISTAGEM)
+        
+        try:
+            filtros = ler_filtros_busca(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        busca = REPOSITORIO.buscar(filtros, limite, offset)
+        
+        return resposta_json({
+            'total': busca['total'],
+            'offset': offset,
+            'limite': limite,
+            'simulacoes': [documento_simulacao(linha, campos) for linha in busca['simulacoes']],
+            'facetas': documento_facetas(busca['facetas'])
+        })
+        
+    except Exception as e:
+        print(f"Erro na busca de simulações: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/simulacao/<int:simulacao_id>')
+def api_simulacao(simulacao_id):
+    """API: dados de uma simulação (?campos=totais para pular turmas/custos)"""
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        simulacao = buscar_simulacao(simulacao_id, campos)
+        if not simulacao:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        
+        return resposta_json(documento_simulacao(simulacao, campos))
+        
+    except Exception as e:
+        print(f"Erro na API de simulação: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/simulacao/<int:simulacao_id>/versoes')
+def api_versoes_simulacao(simulacao_id):
+    """API: histórico de versões da simulação (mais recente primeiro)"""
+    try:
+        historico = REPOSITORIO.listar_versoes(simulacao_id)
+        if historico is None:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        
+        versao_atual, versoes = historico
+        return resposta_json({'versao_atual': versao_atual, 'versoes': versoes})
+        
+    except Exception as e:
+        print(f"Erro na API de versões: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/simulacao/<int:simulacao_id>/versoes/<int:numero>')
+def api_versao_simulacao(simulacao_id, numero):
+    """API: dados de uma versão anterior da simulação (mesmo formato de /api/simulacao/<id>)"""
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        versao = REPOSITORIO.carregar_versao(simulacao_id, numero)
+        if versao is None:
+            return jsonify({'error': 'Versão não encontrada'}), 404
+        
+        dados_completos = versao['dados_completos']
+        documento = {
+            'id': simulacao_id,
+            'nome': versao['nome'],
+            'versao': numero,
+            'data_criacao': versao['criada_em'],
+            'resultados': dados_completos.get('resultados', {}),
+            'turmas': dados_completos.get('turmas', []),
+            'custos': dados_completos.get('custos', {}),
+            'alunos': dados_completos.get('alunos', [])
+        }
+        return resposta_json(selecionar_campos(documento, campos))
+        
+    except Exception as e:
+        print(f"Erro na API de versão: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/simulacao/<int:simulacao_id>/turmas')
+def api_turmas_simulacao(simulacao_id):
+    """API: turmas paginadas (?offset=0&limite=50), com os indicadores de cada uma
+    
+    ?direcionador=horas|alunos|sala rateia todos os custos fixos pelo mesmo direcionador.
+    """
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        offset, limite = ler_paginacao()
+        base = buscar_base_rateio(simulacao_id)
+        if base is None:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        
+        totais, custos = base
+        total, turmas = buscar_turmas_pagina(simulacao_id, offset, limite)
+        indicadores = indicadores_com_rateio(turmas, custos, request.args.get('direcionador'), totais)
+        turmas = [{**turma, 'indicadores': item} for turma, item in zip(turmas, indicadores)]
+        
+        return resposta_json({
+            'total': total,
+            'offset': offset,
+            'limite': limite,
+            'turmas': selecionar_campos(turmas, campos)
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro na API de turmas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/relatorio/<int:simulacao_id>')
+def api_relatorio(simulacao_id):
+    """API: relatório da simulação, com os indicadores calculados de cada turma
+    
+    ?direcionador=horas|alunos|sala rateia todos os custos fixos pelo mesmo direcionador.
+    """
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        simulacao = buscar_simulacao(simulacao_id, campos)
+        if not simulacao:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        
+        return resposta_json(documento_simulacao(simulacao, campos, relatorio=True,
+                                                 direcionador=request.args.get('direcionador')))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro na API de relatório: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/comparar')
+def api_comparar():
+    """API: compara simulações com a primeira (?ids=3,5,8): turmas e variação dos resultados"""
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        try:
+            ids = [int(parte) for parte in request.args.get('ids', '').split(',') if parte.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids deve ser uma lista de números separados por vírgula'}), 400
+        if not 2 <= len(ids) <= LIMITE_COMPARACAO:
+            return jsonify({'error': f'Informe de 2 a {LIMITE_COMPARACAO} simulações'}), 400
+        
+        linhas = REPOSITORIO.carregar_varias(ids)
+        
+        faltando = [simulacao_id for simulacao_id in ids if simulacao_id not in linhas]
+        if faltando:
+            return jsonify({'error': f'Simulação não encontrada: {faltando[0]}'}), 404
+        
+        simulacoes = []
+        for simulacao_id in ids:
+            dados_completos = json_rapido.loads(linhas[simulacao_id]['dados_completos'])
+            simulacoes.append({
+                'id': simulacao_id,
+                'nome': linhas[simulacao_id]['nome'],
+                'turmas': dados_completos.get('turmas', []),
+                'resultados': dados_completos.get('resultados', {})
+            })
+        
+        return resposta_json(selecionar_campos(comparar_simulacoes(simulacoes), campos))
+        
+    except Exception as e:
+        print(f"Erro na comparação de simulações: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def projetar_dados(dados: Dict, opcoes: Dict, investimento_inicial: float = 0) -> Dict:
+    """Projeção de caixa mês a mês das turmas/custos de uma simulação
+    
+    opcoes: acr_inicial e as premissas de projecao_caixa.ParametrosProjecao;
+    sem investimento_inicial, usa o investimento da simulação.
+    """
+    # Import tardio: numpy (opcional) só é carregado quando alguém projeta
+    from projecao_caixa import ParametrosProjecao, projetar_fluxo_caixa
+    
+    if opcoes is not None and not isinstance(opcoes, dict):
+        raise ValueError('As premissas da projeção devem ser um objeto JSON')
+    opcoes = dict(opcoes or {})
+    opcoes.setdefault('investimento_inicial', investimento_inicial)
+    custos_fixos = sum(
+        valor for itens in dados.get('custos', {}).values() for valor in itens.values() if valor > 0
+    )
+    receita_alunos = sum(aluno.get('mensalidade', 0) for aluno in dados.get('alunos', []))
+    try:
+        acr_inicial = float(opcoes.get('acr_inicial') or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f'acr_inicial inválido: {opcoes.get("acr_inicial")}')
+    projecao = projetar_fluxo_caixa(
+        dados.get('turmas', []), custos_fixos, acr_inicial,
+        ParametrosProjecao.de_dict(opcoes), outras_receitas=receita_alunos
+    )
+    return projecao.para_dict()
+
+@rotas.route('/api/projecao', methods=['POST'])
+def api_projecao():
+    """API: projeção de caixa de dados ainda não salvos ({turmas, custos, parametros})"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'O corpo deve ser um objeto JSON'}), 400
+        campos = ler_campos(request.args.get('campos'))
+        projecao = projetar_dados(data, data.get('parametros'))
+        return resposta_json(selecionar_campos(projecao, campos))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro na projeção de caixa: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/simulacao/<int:simulacao_id>/projecao', methods=['GET', 'POST'])
+def api_projecao_simulacao(simulacao_id):
+    """API: projeção de caixa de uma simulação salva (premissas no corpo JSON do POST)
+    
+    ?campos=acr,payback_mes,vpl,tir_anual evita enviar o resultado de cada turma.
+    """
+    try:
+        campos = ler_campos(request.args.get('campos'))
+        simulacao = buscar_simulacao(simulacao_id, None)
+        if not simulacao:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        
+        opcoes = request.get_json(silent=True) if request.method == 'POST' else None
+        dados = json_rapido.loads(simulacao['dados_completos'])
+        projecao = projetar_dados(dados, opcoes, simulacao['investimento_inicial'] or 0)
+        return resposta_json(selecionar_campos(projecao, campos))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Erro na projeção de caixa: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/relatorio/<int:simulacao_id>/turmas')
+def relatorio_turmas(simulacao_id):
+    """Fragmento HTML com uma página de cards de turma (?pagina=N), para a lista virtual"""
+    try:
+        pagina = max(request.args.get('pagina', 0, type=int), 0)
+        return renderizar_pagina_turmas(simulacao_id, pagina)[1]
+        
+    except Exception as e:
+        print(f"Erro ao carregar turmas do relatório: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/exemplo')
 def exemplo():
     """Página com exemplo de uso"""
     content = '''
@@ -2103,28 +2026,223 @@ def exemplo():
     
     return get_base_html("Exemplo Prático", content)
 
-@app.route('/api/excluir_simulacao/<int:simulacao_id>', methods=['DELETE'])
+@rotas.route('/api/excluir_simulacao/<int:simulacao_id>', methods=['DELETE'])
 def api_excluir_simulacao(simulacao_id):
-    """API para excluir simulação"""
+    """API para excluir simulação (turmas, alunos e versões saem em cascata)"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
+        excluidas = REPOSITORIO.excluir([simulacao_id])
+        if not excluidas:
+            return jsonify({'error': 'Simulação não encontrada'}), 404
+        return jsonify({'success': True, 'message': 'Análise excluída com sucesso!'})
         
-        # Primeiro excluir turmas relacionadas
-        cursor.execute('DELETE FROM turmas WHERE simulacao_id = ?', (simulacao_id,))
+    except Exception as e:
+        print(f"Erro ao excluir simulação: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Máximo de simulações por requisição de exclusão em lote
+LIMITE_EXCLUSAO_LOTE = 10000
+
+def id_simulacao_json(valor):
+    """Id de simulação vindo de um corpo JSON: inteiro (2 ou 2.0), nunca bool,
+    fração ou texto. Retorna None se o valor não for um id válido."""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return None
+
+@rotas.route('/api/excluir_simulacoes', methods=['POST'])
+def api_excluir_simulacoes():
+    """API para excluir várias simulações de uma vez, em uma única transação
+    
+    Corpo: {"ids": [1, 2, 3]}
+    """
+    try:
+        dados = request.get_json(silent=True) or {}
+        ids = dados.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'Informe a lista de ids'}), 400
+        if len(ids) > LIMITE_EXCLUSAO_LOTE:
+            return jsonify({'error': f'No máximo {LIMITE_EXCLUSAO_LOTE} simulações por requisição'}), 400
+        ids = [id_simulacao_json(simulacao_id) for simulacao_id in ids]
+        if None in ids:
+            return jsonify({'error': 'Ids inválidos: use números inteiros'}), 400
+        
+        excluidas = REPOSITORIO.excluir(ids)
+        encontradas = set(excluidas)
+        print(f"🗑️ {len(excluidas)} simulações excluídas em lote")
+        return jsonify({
+            'success': True,
+            'excluidas': excluidas,
+            'nao_encontradas': sorted({simulacao_id for simulacao_id in ids if simulacao_id not in encontradas})
+        })
         
-        # Depois excluir a simulação
-        cursor.execute('DELETE FROM simulacoes WHERE id = ?', (simulacao_id,))
+    except Exception as e:
+        print(f"Erro ao excluir simulações: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# ============================================
+# TAREFAS EM SEGUNDO PLANO
+# ============================================
+
+EXECUTOR_TAREFAS = ExecutorTarefas(REPOSITORIO.conexao, REPOSITORIO.marcador)
+
+# Variação padrão da análise de sensibilidade (fator aplicado ao campo da turma)
+FATORES_SENSIBILIDADE = [0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2]
+CAMPOS_SENSIBILIDADE = ('mensalidade_aluno', 'alunos_matriculados', 'custo_hora_professor',
+                        'custo_material_mensal')
+
+@EXECUTOR_TAREFAS.tarefa('calcular_simulacao')
+def tarefa_calcular_simulacao(parametros, progresso):
+    """Calcula e salva (ou atualiza) uma simulação grande"""
+    dados = parametros['dados']
+    simulacao_id = parametros.get('simulacao_id')
+    
+    progresso(0.1, f"Calculando {len(dados.get('turmas', []))} turmas", forcar=True)
+    resultados, hash_conteudo = calcular_resultados_cache(dados)
+    
+    progresso(0.6, 'Salvando no banco', parcial=resultados)
+    versao = None
+    if simulacao_id:
+        versao = atualizar_simulacao_banco(simulacao_id, dados, resultados, hash_conteudo,
+                                           versao_esperada_requisicao(parametros))
+    else:
+        simulacao_id = salvar_simulacao_banco(dados, resultados, hash_conteudo)
+    
+    return {**resultados, 'id': simulacao_id, 'versao': versao, 'success': True}
+
+@EXECUTOR_TAREFAS.tarefa('sensibilidade')
+def tarefa_sensibilidade(parametros, progresso):
+    """Varre um campo das turmas por vários fatores e calcula o resultado de cada cenário"""
+    dados = parametros['dados']
+    campo = parametros.get('campo', 'mensalidade_aluno')
+    fatores = parametros.get('fatores') or FATORES_SENSIBILIDADE
+    if campo not in CAMPOS_SENSIBILIDADE:
+        raise ValueError(f'Campo de sensibilidade inválido: {campo}')
+    
+    pontos = []
+    for i, fator in enumerate(fatores):
+        cenario = {
+            **dados,
+            'turmas': [{**turma, campo: (turma.get(campo, 0) or 0) * fator} for turma in dados.get('turmas', [])]
+        }
+        resultados = calcular_resultados_salas(cenario)
+        pontos.append({
+            'fator': fator,
+            'receita_mensal_total': resultados['receita_mensal_total'],
+            'custo_mensal_total': resultados['custo_mensal_total'],
+            'lucro_mensal': resultados['lucro_mensal'],
+            'margem_lucro': resultados['margem_lucro']
+        })
+        progresso((i + 1) / len(fatores), f'Cenário {i + 1} de {len(fatores)}', parcial={'pontos': pontos})
+    
+    return {'campo': campo, 'pontos': pontos}
+
+@EXECUTOR_TAREFAS.tarefa('reconstruir_relatorios')
+def tarefa_reconstruir_relatorios(parametros, progresso):
+    """Recalcula e regrava os resultados das simulações salvas (todas ou as informadas)"""
+    ids = parametros.get('ids')
+    if ids:
+        simulacoes = list(REPOSITORIO.carregar_varias(ids).values())
+    else:
+        simulacoes = REPOSITORIO.listar(completos=True)
+    simulacoes.sort(key=lambda linha: linha['id'])
+    
+    reconstruidas, ignoradas = [], []
+    for i, linha in enumerate(simulacoes):
+        simulacao_id, versao = linha['id'], linha['versao_atual']
+        dados = {**json_rapido.loads(linha['dados_completos']).get('entrada', {}), 'nome': linha['nome']}
+        resultados = calcular_resultados_salas(dados)
+        try:
+            # Se a simulação foi editada (ou excluída) nesse meio-tempo, a versão nova prevalece
+            atualizar_simulacao_banco(simulacao_id, dados, resultados, versao_esperada=versao or 1)
+            reconstruidas.append(simulacao_id)
+        except (ConflitoVersao, SimulacaoNaoEncontrada) as e:
+            print(f"⚠️ Reconstrução ignorada: {e}")
+            ignoradas.append(simulacao_id)
+        progresso((i + 1) / len(simulacoes), f'Simulação {i + 1} de {len(simulacoes)}')
+    
+    return {'reconstruidas': reconstruidas, 'ignoradas': ignoradas}
+
+@EXECUTOR_TAREFAS.tarefa('importar_simulacoes')
+def tarefa_importar_simulacoes(parametros, progresso):
+    """Calcula e salva uma lista de simulações"""
+    simulacoes = parametros.get('simulacoes', [])
+    ids = []
+    for i, dados in enumerate(simulacoes):
+        ids.append(salvar_simulacao_banco(dados, *calcular_resultados_cache(dados)))
+        progresso((i + 1) / len(simulacoes), f'Importadas {i + 1} de {len(simulacoes)}', parcial={'ids': ids})
+    
+    return {'ids': ids}
+
+@rotas.route('/api/tarefas', methods=['POST'])
+def api_criar_tarefa():
+    """API para enfileirar uma tarefa longa ({tipo, parametros})"""
+    try:
+        dados = request.get_json(silent=True)
+        if not dados or not dados.get('tipo'):
+            return jsonify({'error': 'Informe o tipo da tarefa'}), 400
+        if dados['tipo'] not in EXECUTOR_TAREFAS.tipos:
+            return jsonify({'error': f"Tipo de tarefa desconhecido: {dados['tipo']}"}), 400
         
-        conn.commit()
-        conn.close()
+        tarefa_id = EXECUTOR_TAREFAS.enviar(dados['tipo'], dados.get('parametros') or {})
+        return jsonify({
+            'id': tarefa_id,
+            'status_url': f'/api/tarefas/{tarefa_id}',
+            'eventos_url': f'/api/tarefas/{tarefa_id}/eventos'
+        }), 202
         
-        return jsonify({'success': True, 'message': 'Análise excluída com sucesso!'})
+    except Exception as e:
+        print(f"Erro ao criar tarefa: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@rotas.route('/api/tarefas/<tarefa_id>')
+def api_tarefa(tarefa_id):
+    """API: estado atual da tarefa"""
+    try:
+        tarefa = EXECUTOR_TAREFAS.obter(tarefa_id)
+        if tarefa is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+        return resposta_json(tarefa)
         
     except Exception as e:
-        print(f"Erro ao excluir simulação: {e}")
+        print(f"Erro ao consultar tarefa: {e}")
         return jsonify({'error': str(e)}), 500
 
+@rotas.route('/api/tarefas/<tarefa_id>/eventos')
+def api_tarefa_eventos(tarefa_id):
+    """SSE com progresso e resultados parciais da tarefa
+
+    Aqui (WSGI) devolve só o estado atual e um `retry`: o navegador reconecta
+    sozinho e nenhuma thread do gunicorn fica presa durante a tarefa. O stream
+    contínuo é servido pelo app ASGI (app_asgi.py).
+    """
+    ultimo_id = request.headers.get('Last-Event-ID')
+    return Response(
+        stream_with_context(EXECUTOR_TAREFAS.eventos(tarefa_id, ultimo_id, continuo=False)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def criar_app():
+    """Cria e configura o app Flask (app factory).
+
+    Não toca no banco: o schema é criado uma única vez por init_db(), chamado
+    pelo hook on_starting do gunicorn (gunicorn.conf.py) ou pelo __main__, ou
+    então na primeira conexão do processo (garantir_banco).
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'viabilidade_salas_2024')
+    instrumentar_app(app)
+    instrumentar_entrega(app)
+    app.register_blueprint(rotas)
+    return app
+
+# Instância usada pelo gunicorn (app:app), app_asgi.py e benchmark_api.py
+app = criar_app()
+
 if __name__ == '__main__':
     # Configuração segura para execução
     import os
@@ -2139,6 +2257,8 @@ if __name__ == '__main__':
     print("📊 Iniciando servidor...")
     print("=" * 70)
     
+    init_db()
+    
     # Configurações seguras
     app.run(
         host='localhost',
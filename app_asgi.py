@@ -0,0 +1,207 @@
+# app_asgi.py - Modo de execução ASGI para a API de simulações
+"""
+Entrada ASGI (sem dependência de framework) para o app de salas.
+
+Cada requisição é atendida de forma async: o trabalho de cálculo e de banco
+(sqlite3 é bloqueante) roda em um executor de threads com tamanho limitado,
+em vez de uma thread por conexão. Dentro do executor quem responde é o
+próprio app Flask (WSGI) — as mesmas views das APIs JSON e das páginas, com
+as métricas, a compressão e o ETag de sempre. Só o progresso das tarefas em
+segundo plano (/api/tarefas/<id>/eventos) é servido direto do loop async,
+como um stream SSE contínuo que não prende nenhuma thread.
+
+Uso:
+    uvicorn app_asgi:app --port 5000
+"""
+import asyncio
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import json_rapido
+from app import app as app_flask, init_db
+from app import EXECUTOR_TAREFAS
+from metricas import METRICAS
+from tarefas import estado_eventos
+
+# Quantidade máxima de threads fazendo cálculo/banco ao mesmo tempo
+MAX_THREADS_DB = int(os.environ.get('SALAS_MAX_THREADS_DB', 8))
+
+EXECUTOR_DB = ThreadPoolExecutor(max_workers=MAX_THREADS_DB, thread_name_prefix='salas-db')
+
+ROTA_EVENTOS_TAREFA = re.compile(r'^/api/tarefas/([0-9a-f]+)/eventos$')
+ROTA_EVENTOS_METRICAS = '/api/tarefas/<tarefa_id>/eventos'
+
+# Intervalo entre leituras do estado da tarefa no stream SSE
+INTERVALO_EVENTOS = 0.25
+
+
+async def executar_bloqueante(funcao, *args):
+    """Executa trabalho bloqueante no executor limitado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR_DB, funcao, *args)
+
+
+async def ler_corpo(receive):
+    """Lê o corpo completo da requisição ASGI"""
+    partes = []
+    while True:
+        mensagem = await receive()
+        partes.append(mensagem.get('body', b''))
+        if not mensagem.get('more_body'):
+            break
+    return b''.join(partes)
+
+
+async def responder(send, status, corpo, content_type=b'application/json', headers=None):
+    """Envia uma resposta completa"""
+    if isinstance(corpo, (dict, list)):
+        corpo = json_rapido.dumps(corpo)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(corpo)).encode())] + (headers or [])
+    })
+    await send({'type': 'http.response.body', 'body': corpo})
+
+
+# ============================================
+# STREAM SSE DAS TAREFAS
+# ============================================
+
+async def api_tarefa_eventos(tarefa_id, send, ultimo_id=None):
+    """Stream SSE da tarefa: entre as leituras não ocupa nenhuma thread
+
+    Se algo falhar depois do início da resposta, o stream termina com um
+    evento `erro` (os headers já foram enviados, não há outra resposta).
+    """
+    inicio = time.perf_counter()
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')]
+    })
+    estado = estado_eventos(ultimo_id)
+    enviados = 0
+    try:
+        while True:
+            texto, terminou = await executar_bloqueante(EXECUTOR_TAREFAS.proximo_evento, tarefa_id, estado)
+            if texto:
+                corpo = texto.encode('utf-8')
+                enviados += len(corpo)
+                await send({'type': 'http.response.body', 'body': corpo, 'more_body': not terminou})
+            if terminou:
+                if not texto:
+                    await send({'type': 'http.response.body', 'body': b''})
+                return
+            await asyncio.sleep(INTERVALO_EVENTOS)
+    except Exception as e:
+        print(f"Erro no stream da tarefa {tarefa_id}: {e}")
+        evento = f'event: erro\ndata: {json_rapido.dumps({"error": str(e)}).decode("utf-8")}\n\n'
+        await send({'type': 'http.response.body', 'body': evento.encode('utf-8')})
+    finally:
+        METRICAS.registrar(ROTA_EVENTOS_METRICAS, 'GET', 200, time.perf_counter() - inicio, 0.0, 0.0, 0.0, enviados)
+
+
+# ============================================
+# REPASSE PARA O APP FLASK (WSGI)
+# ============================================
+
+def _chamar_wsgi(scope, corpo):
+    """Executa o app Flask para um escopo ASGI e retorna (status, headers, corpo)"""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(corpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(corpo)),
+    }
+    for nome, valor in scope.get('headers', []):
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nome == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = valor
+        elif nome != 'CONTENT_LENGTH':
+            chave = f'HTTP_{nome}'
+            environ[chave] = f'{environ[chave]},{valor}' if chave in environ else valor
+
+    resposta = {}
+
+    def start_response(status, headers, exc_info=None):
+        resposta['status'] = int(status.split(' ', 1)[0])
+        resposta['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    resultado = app_flask(environ, start_response)
+    try:
+        conteudo = b''.join(resultado)
+    finally:
+        if hasattr(resultado, 'close'):
+            resultado.close()
+    return resposta['status'], resposta['headers'], conteudo
+
+
+async def repassar_wsgi(scope, corpo, send):
+    try:
+        status, headers, conteudo = await executar_bloqueante(_chamar_wsgi, scope, corpo)
+    except Exception as e:
+        # Erros das views já viram respostas no Flask; aqui só falhas do próprio repasse
+        print(f"Erro na API ASGI: {e}")
+        await responder(send, 500, {'error': str(e)})
+        return
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': conteudo})
+
+
+# ============================================
+# APLICAÇÃO ASGI
+# ============================================
+
+async def app(scope, receive, send):
+    """Aplicação ASGI"""
+    if scope['type'] == 'lifespan':
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                try:
+                    await executar_bloqueante(init_db)
+                except Exception as e:
+                    # Sem schema o servidor não sobe
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                EXECUTOR_DB.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    corpo = await ler_corpo(receive)
+
+    rota = ROTA_EVENTOS_TAREFA.match(scope['path'])
+    if scope['method'] == 'GET' and rota:
+        ultimo_id = dict(scope.get('headers', [])).get(b'last-event-id', b'').decode('latin-1')
+        await api_tarefa_eventos(rota.group(1), send, ultimo_id)
+        return
+
+    await repassar_wsgi(scope, corpo, send)
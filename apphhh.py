@@ -3,9 +3,12 @@ import json
 import os
 from datetime import datetime
 from models import calcular_viabilidade, Turma, Disciplina, NivelEnsino
+from metricas import instrumentar_app
+from projecao_caixa import ParametrosProjecao, projetar_fluxo_caixa
 
 app = Flask(__name__)
 app.secret_key = 'viabilidade_escola_secret_key_2026'
+instrumentar_app(app)
 
 # Dados das disciplinas
 DISCIPLINAS = [
@@ -141,6 +144,25 @@ def calcular():
     
     return jsonify({'success': True, 'resultados': resultados})
 
+@app.route('/projetar_viabilidade', methods=['POST'])
+def projetar():
+    """Projeta o fluxo de caixa mês a mês e a evolução do ACR"""
+    data = request.get_json() or {}
+    
+    try:
+        parametros = ParametrosProjecao.de_dict(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    projecao = projetar_fluxo_caixa(
+        session['turmas'],
+        session['custos_fixos'],
+        session['acr_inicial'],
+        parametros
+    )
+    
+    return jsonify({'success': True, 'projecao': projecao.para_dict()})
+
 @app.route('/carregar_exemplo', methods=['POST'])
 def carregar_exemplo():
     """Carrega dados de exemplo"""
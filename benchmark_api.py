@@ -0,0 +1,590 @@
+# benchmark_api.py - Benchmark de carga da API de simulações
+"""
+Dispara requisições contra /api/nova_simulacao, /api/atualizar_simulacao/<id>,
+/historico e /relatorio/<id> com simulações sintéticas de tamanho
+configurável, e reporta latência p50/p95/p99 e throughput por endpoint.
+
+Uso:
+    python benchmark_api.py                       # sobe um servidor local temporário
+    python benchmark_api.py --url http://localhost:5000
+    python benchmark_api.py --turmas 200 --requisicoes 100 --concorrencia 8
+    python benchmark_api.py --salvar-baseline      # grava benchmark_baseline.json
+    python benchmark_api.py --comparar             # falha se p95 piorar além da tolerância
+    python benchmark_api.py --modo ambos           # WSGI (threaded) × ASGI (uvicorn) lado a lado
+    python benchmark_api.py --inicializacao        # partida a frio: import de app.py e 1ª requisição
+    python benchmark_api.py --entrega              # bytes na rede e TTFB por codificação (identity/gzip/br)
+    python benchmark_api.py --conflitos --concorrencia 16   # edições concorrentes com If-Match (409 + consistência)
+    python benchmark_api.py --busca --requisicoes 500       # busca textual e por facetas sobre N simulações salvas
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ARQUIVO_BASELINE = 'benchmark_baseline.json'
+TOLERANCIA_PADRAO = 0.25  # 25% de piora no p95
+
+DISCIPLINAS_SINTETICAS = ['matematica', 'portugues', 'ciencias', 'historia', 'geografia',
+                          'ingles', 'fisica', 'quimica', 'biologia']
+NIVEIS_SINTETICOS = ['fundamental_i', 'fundamental_ii', 'medio', 'pre_vestibular']
+
+
+def gerar_simulacao(total_turmas, semente=0):
+    """Gera uma simulação sintética com o número de turmas pedido"""
+    aleatorio = random.Random(semente)
+    turmas = []
+    for i in range(total_turmas):
+        capacidade = aleatorio.randint(15, 40)
+        turmas.append({
+            'nome': f'Turma {i + 1}',
+            'disciplina': aleatorio.choice(DISCIPLINAS_SINTETICAS),
+            'nivel': aleatorio.choice(NIVEIS_SINTETICOS),
+            'capacidade': capacidade,
+            'alunos_matriculados': aleatorio.randint(5, capacidade),
+            'horas_semanais': aleatorio.choice([2, 3, 4, 5]),
+            'dias_semana': aleatorio.choice([1, 2, 3]),
+            'custo_hora_professor': aleatorio.randint(50, 80),
+            'mensalidade_aluno': aleatorio.randint(200, 450),
+            'custo_material_mensal': aleatorio.randint(50, 250)
+        })
+    return {
+        'nome': f'Benchmark {total_turmas} turmas',
+        'salas_disponiveis': max(1, total_turmas // 4),
+        'turmas': turmas,
+        'custos': {'infraestrutura': {'Aluguel': 3500, 'Energia': 800},
+                   'administrativo': {'Secretária': 2200}},
+        'alunos': []
+    }
+
+
+def requisitar(url, metodo='GET', dados=None, headers=None):
+    """Executa uma requisição e retorna (segundos, status, corpo)"""
+    corpo = json.dumps(dados).encode('utf-8') if dados is not None else None
+    cabecalhos = dict(headers or {})
+    if corpo:
+        cabecalhos['Content-Type'] = 'application/json'
+    req = urllib.request.Request(url, data=corpo, method=metodo, headers=cabecalhos)
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resposta:
+            conteudo = resposta.read()
+            status = resposta.status
+    except urllib.error.HTTPError as e:
+        conteudo = e.read()
+        status = e.code
+    return time.perf_counter() - inicio, status, conteudo
+
+
+def requisitar_bruto(url, headers=None):
+    """GET sem descompressão: retorna (ttfb, total, status, headers, bytes na rede)"""
+    partes = urllib.parse.urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port, timeout=30)
+    caminho = partes.path + (f'?{partes.query}' if partes.query else '')
+    try:
+        inicio = time.perf_counter()
+        conexao.request('GET', caminho, headers=headers or {})
+        resposta = conexao.getresponse()
+        ttfb = time.perf_counter() - inicio
+        conteudo = resposta.read()
+        return ttfb, time.perf_counter() - inicio, resposta.status, dict(resposta.getheaders()), len(conteudo)
+    finally:
+        conexao.close()
+
+
+def percentil(valores, p):
+    """Percentil por interpolação linear (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    posicao = (len(valores) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicao - inferior)
+
+
+def medir(nome, funcao, requisicoes, concorrencia):
+    """Executa `funcao(i)` N vezes com a concorrência pedida e resume as latências"""
+    latencias = []
+    erros = 0
+    trava = threading.Lock()
+
+    def executar(i):
+        nonlocal erros
+        duracao, status, _ = funcao(i)
+        with trava:
+            latencias.append(duracao)
+            if status >= 400:
+                erros += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(executar, range(requisicoes)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'endpoint': nome,
+        'requisicoes': requisicoes,
+        'erros': erros,
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+        'throughput_rps': requisicoes / total if total > 0 else 0
+    }
+
+
+def preparar_banco_temporario():
+    """Aponta app.py para um banco (e um cache de resultados) temporário e retorna o módulo"""
+    import app as app_salas
+    from memo_resultados import NOME_ARQUIVO_MEMO
+
+    pasta = tempfile.mkdtemp(prefix='bench_salas_')
+    app_salas.DATABASE = os.path.join(pasta, 'database_salas.db')
+    app_salas.MEMO_RESULTADOS.arquivo = os.path.join(pasta, NOME_ARQUIVO_MEMO)
+    app_salas.init_db()
+    return app_salas
+
+
+def iniciar_servidor_local():
+    """Sobe app.py (WSGI, threaded) em uma thread e retorna (url, parar)"""
+    from werkzeug.serving import make_server
+
+    app_salas = preparar_banco_temporario()
+    servidor = make_server('127.0.0.1', 0, app_salas.app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{servidor.server_port}', servidor.shutdown
+
+
+def iniciar_servidor_asgi():
+    """Sobe app_asgi.py com uvicorn em uma thread e retorna (url, parar)"""
+    import socket
+    import uvicorn
+
+    preparar_banco_temporario()
+    import app_asgi
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        porta = sock.getsockname()[1]
+
+    servidor = uvicorn.Server(uvicorn.Config(app_asgi.app, host='127.0.0.1', port=porta,
+                                             log_level='warning', lifespan='off'))
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    def parar():
+        servidor.should_exit = True
+        thread.join()
+
+    return f'http://127.0.0.1:{porta}', parar
+
+
+def executar_benchmark(url, total_turmas, requisicoes, concorrencia):
+    """Roda o cenário completo e retorna a lista de resultados por endpoint"""
+    simulacao = gerar_simulacao(total_turmas)
+    resultados = []
+
+    # Aquecimento e simulação base para atualizar/relatório
+    _, status, corpo = requisitar(f'{url}/api/nova_simulacao', 'POST', simulacao)
+    if status != 200:
+        raise RuntimeError(f'Falha ao criar simulação base: {status} {corpo[:200]!r}')
+    simulacao_id = json.loads(corpo)['id']
+
+    resultados.append(medir(
+        'POST /api/nova_simulacao',
+        lambda i: requisitar(f'{url}/api/nova_simulacao', 'POST', simulacao),
+        requisicoes, concorrencia))
+    resultados.append(medir(
+        'PUT /api/atualizar_simulacao/<id>',
+        lambda i: requisitar(f'{url}/api/atualizar_simulacao/{simulacao_id}', 'PUT', simulacao),
+        requisicoes, concorrencia))
+    resultados.append(medir(
+        'GET /historico',
+        lambda i: requisitar(f'{url}/historico'),
+        requisicoes, concorrencia))
+    resultados.append(medir(
+        'GET /relatorio/<id>',
+        lambda i: requisitar(f'{url}/relatorio/{simulacao_id}'),
+        requisicoes, concorrencia))
+    return resultados
+
+
+def estressar_atualizacoes(url, total_turmas, requisicoes, concorrencia):
+    """Vários editores alterando a mesma simulação ao mesmo tempo
+    
+    Cada editor envia a versão que conhece em If-Match; em 409 adota a versão
+    atual da resposta e tenta de novo. No fim confere que cada atualização
+    aceita virou exatamente uma versão e que a versão atual tem as turmas da
+    última gravação aceita (nada intercalado nem gravado pela metade).
+    """
+    simulacao = gerar_simulacao(total_turmas)
+    _, status, corpo = requisitar(f'{url}/api/nova_simulacao', 'POST', simulacao)
+    if status != 200:
+        raise RuntimeError(f'Falha ao criar simulação base: {status} {corpo[:200]!r}')
+    simulacao_id = json.loads(corpo)['id']
+
+    trava = threading.Lock()
+    aceitas = {}  # versão -> turmas enviadas
+    latencias, conflitos, erros = [], 0, 0
+
+    def editar(i):
+        nonlocal conflitos, erros
+        turmas = [dict(turma) for turma in simulacao['turmas']]
+        turmas[i % len(turmas)]['mensalidade_aluno'] = 1000 + i  # conteúdo único por edição
+        versao = 1
+        while True:
+            duracao, status, corpo = requisitar(f'{url}/api/atualizar_simulacao/{simulacao_id}', 'PUT',
+                                                dict(simulacao, turmas=turmas), {'If-Match': f'"{versao}"'})
+            with trava:
+                latencias.append(duracao)
+                if status == 200:
+                    aceitas[json.loads(corpo)['versao']] = turmas
+                    return
+                if status != 409:
+                    erros += 1
+                    return
+                conflitos += 1
+            versao = json.loads(corpo)['versao_atual']
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(editar, range(requisicoes)))
+    total = time.perf_counter() - inicio
+
+    _, _, corpo = requisitar(f'{url}/api/simulacao/{simulacao_id}/versoes')
+    historico = json.loads(corpo)
+    versao_final = historico['versao_atual']
+    _, _, corpo = requisitar(f'{url}/api/simulacao/{simulacao_id}/versoes/{versao_final}?campos=turmas')
+    turmas_finais = json.loads(corpo)['turmas']
+
+    problemas = []
+    if sorted(aceitas) != list(range(2, versao_final + 1)):
+        problemas.append(f'versões aceitas {sorted(aceitas)} não formam a sequência 2..{versao_final}')
+    if len(historico['versoes']) != versao_final:
+        problemas.append(f"{len(historico['versoes'])} versões registradas para a versão atual {versao_final}")
+    if aceitas and turmas_finais != aceitas.get(versao_final):
+        problemas.append('turmas da versão atual diferem da última atualização aceita')
+
+    latencias.sort()
+    return {
+        'endpoint': 'PUT /api/atualizar_simulacao/<id> [If-Match]',
+        'requisicoes': len(latencias),
+        'aceitas': len(aceitas),
+        'conflitos': conflitos,
+        'erros': erros,
+        'versao_final': versao_final,
+        'problemas': problemas,
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+        'throughput_rps': len(latencias) / total if total > 0 else 0
+    }
+
+
+def imprimir_conflitos(resultado):
+    imprimir_resultados([resultado])
+    print(f"\n{resultado['aceitas']} edições aceitas, {resultado['conflitos']} respostas 409, "
+          f"versão final {resultado['versao_final']}")
+    for problema in resultado['problemas']:
+        print(f'❌ {problema}')
+    if not resultado['problemas'] and not resultado['erros']:
+        print('✅ Histórico consistente')
+    print()
+
+
+CONSULTAS_BUSCA = {
+    'texto': 'q=centro',
+    'texto + facetas': 'q=ensino+medio+fisica&margem_max=10',
+    'nivel + disciplina + margem': 'nivel=medio&disciplina=fisica&margem_max=10',
+    'disciplina': 'disciplina=quimica',
+    'sem filtros': ''
+}
+
+
+def medir_busca(url, total_turmas, requisicoes, concorrencia):
+    """Salva `requisicoes` simulações variadas e mede /api/buscar e /historico com filtros"""
+    def salvar(i):
+        simulacao = gerar_simulacao(total_turmas, semente=i)
+        simulacao['nome'] = f"Unidade {i} {'Centro' if i % 3 == 0 else 'Bairro'}"
+        return requisitar(f'{url}/api/nova_simulacao', 'POST', simulacao)
+
+    resultados = [medir('POST /api/nova_simulacao [variadas]', salvar, requisicoes, concorrencia)]
+    for nome, consulta in CONSULTAS_BUSCA.items():
+        resultados.append(medir(
+            f'GET /api/buscar [{nome}]',
+            lambda i, consulta=consulta: requisitar(f'{url}/api/buscar?{consulta}&campos=id,nome,totais.margem_lucro'),
+            requisicoes, concorrencia))
+    resultados.append(medir(
+        'GET /historico [nivel + disciplina]',
+        lambda i: requisitar(f"{url}/historico?{CONSULTAS_BUSCA['nivel + disciplina + margem']}"),
+        requisicoes, concorrencia))
+    return resultados
+
+
+# Executado em um processo novo: mede o import de app.py e a primeira requisição
+# (que cria o schema do banco sob demanda)
+SCRIPT_INICIALIZACAO = '''
+import json, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+resposta = app.app.test_client().get('/historico')
+fim = time.perf_counter()
+print(json.dumps({'import': importado - inicio, 'primeira': fim - inicio, 'status': resposta.status_code}))
+'''
+
+
+def medir_inicializacao(repeticoes):
+    """Mede a partida a frio de app.py em processos novos, com banco vazio"""
+    pasta_app = os.path.dirname(os.path.abspath(__file__))
+    ambiente = dict(os.environ, PYTHONPATH=pasta_app)
+    tempos = {'import': [], 'primeira': [], 'processo': []}
+    erros = 0
+
+    for _ in range(repeticoes):
+        pasta = tempfile.mkdtemp(prefix='bench_inicio_')
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, '-c', SCRIPT_INICIALIZACAO], cwd=pasta, env=ambiente,
+                               capture_output=True, text=True)
+        tempos['processo'].append(time.perf_counter() - inicio)
+        if saida.returncode != 0:
+            erros += 1
+            continue
+        medida = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos['import'].append(medida['import'])
+        tempos['primeira'].append(medida['primeira'])
+        if medida['status'] != 200:
+            erros += 1
+
+    nomes = {'import': 'inicializacao: import app',
+             'primeira': 'inicializacao: ate 1a requisicao',
+             'processo': 'inicializacao: processo completo'}
+    resultados = []
+    for chave, valores in tempos.items():
+        valores.sort()
+        resultados.append({
+            'endpoint': nomes[chave],
+            'requisicoes': repeticoes,
+            'erros': erros,
+            'p50_ms': percentil(valores, 50) * 1000,
+            'p95_ms': percentil(valores, 95) * 1000,
+            'p99_ms': percentil(valores, 99) * 1000,
+            'throughput_rps': len(valores) / sum(valores) if valores else 0
+        })
+    return resultados
+
+
+def imprimir_importtime(limite=15):
+    """Mostra os módulos mais caros no import de app.py (python -X importtime)"""
+    pasta_app = os.path.dirname(os.path.abspath(__file__))
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                           cwd=tempfile.mkdtemp(prefix='bench_inicio_'),
+                           env=dict(os.environ, PYTHONPATH=pasta_app),
+                           capture_output=True, text=True)
+    modulos = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        modulos.append((int(acumulado), int(proprio), nome.strip()))
+
+    print(f"{'Módulo (-X importtime)':<44}{'próprio ms':>12}{'acumulado ms':>14}")
+    for acumulado, proprio, nome in sorted(modulos, reverse=True)[:limite]:
+        print(f"{nome:<44}{proprio / 1000:>12.2f}{acumulado / 1000:>14.2f}")
+    print()
+
+
+CODIFICACOES_ENTREGA = {'identity': 'identity', 'gzip': 'gzip', 'br': 'br, gzip'}
+
+
+def medir_entrega(url, total_turmas, requisicoes):
+    """Bytes na rede e TTFB das páginas e assets, por Accept-Encoding e com 304"""
+    _, status, corpo = requisitar(f'{url}/api/nova_simulacao', 'POST', gerar_simulacao(total_turmas))
+    if status != 200:
+        raise RuntimeError(f'Falha ao criar simulação base: {status} {corpo[:200]!r}')
+    simulacao_id = json.loads(corpo)['id']
+
+    # URLs versionadas dos assets, como aparecem no HTML
+    with urllib.request.urlopen(f'{url}/simulacao') as resposta:
+        html = resposta.read().decode('utf-8')
+    assets = [trecho.split('"', 1)[0] for trecho in html.split('="/assets/')[1:]]
+
+    caminhos = ['/simulacao', '/historico', f'/relatorio/{simulacao_id}'] + [f'/assets/{a}' for a in assets]
+    resultados = []
+    for caminho in caminhos:
+        nome = caminho.split('?', 1)[0].replace(f'/{simulacao_id}', '/<id>')
+        for rotulo, accept in CODIFICACOES_ENTREGA.items():
+            headers = {'Accept-Encoding': accept}
+            _, _, _, cabecalhos, _ = requisitar_bruto(f'{url}{caminho}', headers)
+            cenarios = [(rotulo, headers)]
+            if cabecalhos.get('ETag'):
+                cenarios.append((f'{rotulo} 304', dict(headers, **{'If-None-Match': cabecalhos['ETag']})))
+
+            for cenario, headers_cenario in cenarios:
+                ttfbs, bytes_rede, erros = [], 0, 0
+                for _ in range(requisicoes):
+                    ttfb, _, status, cabecalhos_cenario, tamanho = requisitar_bruto(f'{url}{caminho}', headers_cenario)
+                    ttfbs.append(ttfb)
+                    bytes_rede = tamanho
+                    if status >= 400:
+                        erros += 1
+                ttfbs.sort()
+                resultados.append({
+                    'endpoint': f'GET {nome} [{cenario}]',
+                    'requisicoes': requisicoes,
+                    'erros': erros,
+                    'bytes': bytes_rede,
+                    'codificacao': cabecalhos_cenario.get('Content-Encoding', 'identity'),
+                    'p50_ms': percentil(ttfbs, 50) * 1000,
+                    'p95_ms': percentil(ttfbs, 95) * 1000,
+                    'p99_ms': percentil(ttfbs, 99) * 1000,
+                    'throughput_rps': len(ttfbs) / sum(ttfbs) if ttfbs else 0
+                })
+    return resultados
+
+
+def imprimir_entrega(resultados):
+    print(f"{'Recurso [Accept-Encoding]':<52}{'bytes':>10}{'enviado':>10}{'TTFB p50':>10}{'TTFB p95':>10}")
+    for r in resultados:
+        print(f"{r['endpoint']:<52}{r['bytes']:>10}{r['codificacao']:>10}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+    print()
+
+
+def imprimir_resultados(resultados):
+    print(f"{'Endpoint':<44}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'erros':>8}")
+    for r in resultados:
+        print(f"{r['endpoint']:<44}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['throughput_rps']:>10.1f}{r['erros']:>8}")
+
+
+def comparar_baseline(resultados, baseline, tolerancia):
+    """Retorna a lista de regressões de p95 acima da tolerância"""
+    anteriores = {r['endpoint']: r for r in baseline.get('resultados', [])}
+    regressoes = []
+    for r in resultados:
+        anterior = anteriores.get(r['endpoint'])
+        if anterior and anterior['p95_ms'] > 0 and r['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{r['endpoint']}: p95 {anterior['p95_ms']:.2f} ms -> {r['p95_ms']:.2f} ms")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da API de simulações')
+    parser.add_argument('--url', help='URL de um servidor já em execução (padrão: servidor local temporário)')
+    parser.add_argument('--turmas', type=int, default=50, help='Turmas por simulação sintética')
+    parser.add_argument('--requisicoes', type=int, default=50, help='Requisições por endpoint')
+    parser.add_argument('--concorrencia', type=int, default=4, help='Clientes simultâneos')
+    parser.add_argument('--baseline', default=ARQUIVO_BASELINE, help='Arquivo de baseline')
+    parser.add_argument('--salvar-baseline', action='store_true', help='Grava os resultados como baseline')
+    parser.add_argument('--comparar', action='store_true', help='Compara com o baseline e falha se houver regressão')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO, help='Piora aceitável do p95 (0.25 = 25%%)')
+    parser.add_argument('--modo', choices=['wsgi', 'asgi', 'ambos'], default='wsgi',
+                        help='Servidor local: WSGI threaded, ASGI (uvicorn) ou os dois lado a lado')
+    parser.add_argument('--inicializacao', action='store_true',
+                        help='Mede a partida a frio (import de app.py e 1ª requisição) em vez da carga; '
+                             '--requisicoes define o número de processos')
+    parser.add_argument('--entrega', action='store_true',
+                        help='Mede bytes na rede e TTFB (identity/gzip/br e 304) em vez da carga')
+    parser.add_argument('--busca', action='store_true',
+                        help='Salva --requisicoes simulações variadas e mede a busca textual e por facetas')
+    parser.add_argument('--conflitos', action='store_true',
+                        help='Edições concorrentes da mesma simulação com If-Match; falha se o histórico '
+                             'ficar inconsistente')
+    args = parser.parse_args()
+
+    if args.conflitos:
+        if args.url:
+            resultado = estressar_atualizacoes(args.url, args.turmas, args.requisicoes, args.concorrencia)
+        else:
+            url, parar = (iniciar_servidor_asgi if args.modo == 'asgi' else iniciar_servidor_local)()
+            try:
+                resultado = estressar_atualizacoes(url, args.turmas, args.requisicoes, args.concorrencia)
+            finally:
+                parar()
+        imprimir_conflitos(resultado)
+        return 1 if resultado['problemas'] or resultado['erros'] else 0
+
+    if args.inicializacao:
+        imprimir_importtime()
+        resultados = medir_inicializacao(args.requisicoes)
+    elif args.entrega:
+        if args.url:
+            resultados = medir_entrega(args.url, args.turmas, args.requisicoes)
+        else:
+            url, parar = iniciar_servidor_local()
+            try:
+                resultados = medir_entrega(url, args.turmas, args.requisicoes)
+            finally:
+                parar()
+    elif args.busca:
+        if args.url:
+            resultados = medir_busca(args.url, args.turmas, args.requisicoes, args.concorrencia)
+        else:
+            url, parar = iniciar_servidor_local()
+            try:
+                resultados = medir_busca(url, args.turmas, args.requisicoes, args.concorrencia)
+            finally:
+                parar()
+    elif args.url:
+        resultados = executar_benchmark(args.url, args.turmas, args.requisicoes, args.concorrencia)
+    else:
+        modos = ['wsgi', 'asgi'] if args.modo == 'ambos' else [args.modo]
+        iniciar = {'wsgi': iniciar_servidor_local, 'asgi': iniciar_servidor_asgi}
+        resultados = []
+        for modo in modos:
+            url, parar = iniciar[modo]()
+            try:
+                resultados_modo = executar_benchmark(url, args.turmas, args.requisicoes, args.concorrencia)
+            finally:
+                parar()
+            if len(modos) > 1:
+                for r in resultados_modo:
+                    r['endpoint'] = f"[{modo}] {r['endpoint']}"
+            resultados.extend(resultados_modo)
+
+    if args.entrega:
+        imprimir_entrega(resultados)
+    else:
+        imprimir_resultados(resultados)
+
+    relatorio = {
+        'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'parametros': {'turmas': args.turmas, 'requisicoes': args.requisicoes,
+                       'concorrencia': args.concorrencia, 'modo': args.modo,
+                       'inicializacao': args.inicializacao, 'entrega': args.entrega},
+        'resultados': resultados
+    }
+
+    if args.comparar:
+        if not os.path.exists(args.baseline):
+            print(f'❌ Baseline {args.baseline} não encontrado')
+            return 1
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar_baseline(resultados, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print('❌ Regressões detectadas:')
+            for item in regressoes:
+                print(f'   {item}')
+            return 1
+        print('✅ Sem regressões em relação ao baseline')
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        print(f'✅ Baseline salvo em {args.baseline}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
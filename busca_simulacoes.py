@@ -0,0 +1,216 @@
+# busca_simulacoes.py - Busca textual e por facetas nas simulações salvas
+"""
+Busca nas simulações salvas.
+
+- texto: índice FTS5 `busca_simulacoes` (uma linha por simulação, rowid = id
+  da simulação) com o nome da simulação, os nomes das turmas e as
+  disciplinas e níveis — o código e o nome de exibição, para que "fisica" e
+  "Física" encontrem o mesmo. Caixa e acentos são ignorados, cada termo casa
+  por prefixo e todos precisam aparecer.
+- facetas: `facetas_simulacao` guarda, por simulação, cada nível e cada
+  disciplina distintos das turmas vigentes, com chave (faceta, valor,
+  simulacao_id): as contagens de todas as facetas saem de uma varredura
+  dessa chave, sem DISTINCT sobre as turmas. Filtrar por um nível ou por uma
+  disciplina usa a mesma chave; pedir os dois juntos exige uma mesma turma
+  com os dois (índice parcial de turmas em nivel, disciplina).
+- faixa de margem: coluna indexada simulacoes.margem_lucro.
+
+O repositório regrava o índice e as facetas da simulação na mesma transação
+que a salva ou atualiza. Na exclusão, as facetas saem pela chave estrangeira
+e o índice textual por um gatilho (vale também para as exclusões em lote).
+Simulações ainda fora do índice — bancos anteriores à busca — são indexadas
+ao criar o schema.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+SQL_CRIAR_INDICE = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS busca_simulacoes USING fts5(
+    nome, turmas, disciplinas, niveis,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+'''
+
+SQL_CRIAR_FACETAS = '''
+CREATE TABLE IF NOT EXISTS facetas_simulacao (
+    faceta TEXT,
+    valor TEXT,
+    simulacao_id INTEGER REFERENCES simulacoes (id) ON DELETE CASCADE,
+    PRIMARY KEY (faceta, valor, simulacao_id)
+)
+'''
+
+SQL_CRIAR_GATILHO = '''
+CREATE TRIGGER IF NOT EXISTS busca_simulacoes_exclusao AFTER DELETE ON simulacoes
+BEGIN
+    DELETE FROM busca_simulacoes WHERE rowid = old.id;
+END
+'''
+
+# Colunas de turmas usadas como facetas
+FACETAS = ('nivel', 'disciplina')
+
+# Índices dos filtros, das contagens e da ordenação (sintaxe comum ao SQLite e ao PostgreSQL)
+SQL_INDICES_BUSCA = (
+    'CREATE INDEX IF NOT EXISTS idx_facetas_simulacao ON facetas_simulacao (simulacao_id, faceta, valor)',
+    'CREATE INDEX IF NOT EXISTS idx_turmas_nivel ON turmas (nivel, disciplina, simulacao_id) '
+    'WHERE versao_ate IS NULL',
+    'CREATE INDEX IF NOT EXISTS idx_simulacoes_margem ON simulacoes (margem_lucro)',
+    'CREATE INDEX IF NOT EXISTS idx_simulacoes_data ON simulacoes (data_criacao)'
+)
+
+
+def termos_busca(texto):
+    """Palavras do texto buscado (o '_' dos códigos também separa)"""
+    return re.findall(r'[^\W_]+', (texto or '').lower())
+
+
+def sem_acentos(texto):
+    return ''.join(letra for letra in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(letra))
+
+
+def consulta_fts(texto):
+    """Consulta FTS5: todos os termos, cada um por prefixo ('' se não há termos)"""
+    return ' '.join(f'"{termo}"*' for termo in termos_busca(texto))
+
+
+def documento_busca(nome, turmas, rotulos):
+    """(nome, turmas, disciplinas, niveis): o texto indexado de uma simulação
+
+    rotulos: {código: nome de exibição} dos níveis e disciplinas
+    """
+    def codigos_e_nomes(campo):
+        codigos = sorted({turma.get(campo) for turma in turmas if turma.get(campo)})
+        return ' '.join(f"{codigo} {rotulos.get(codigo, '')}".strip() for codigo in codigos)
+
+    return (nome or '',
+            ' '.join(str(turma.get('nome') or '') for turma in turmas),
+            codigos_e_nomes('disciplina'),
+            codigos_e_nomes('nivel'))
+
+
+def facetas_turmas(turmas):
+    """[(faceta, valor)] distintos das turmas"""
+    return sorted({(faceta, turma[faceta]) for turma in turmas for faceta in FACETAS if turma.get(faceta)})
+
+
+def indexar_simulacao(cursor, simulacao_id, nome, turmas, rotulos):
+    """Regrava a linha da simulação no índice textual e as suas facetas (SQLite)"""
+    cursor.execute('DELETE FROM busca_simulacoes WHERE rowid = ?', (simulacao_id,))
+    cursor.execute('INSERT INTO busca_simulacoes (rowid, nome, turmas, disciplinas, niveis) VALUES (?, ?, ?, ?, ?)',
+                   (simulacao_id, *documento_busca(nome, turmas, rotulos)))
+    cursor.execute('DELETE FROM facetas_simulacao WHERE simulacao_id = ?', (simulacao_id,))
+    cursor.executemany('INSERT INTO facetas_simulacao (faceta, valor, simulacao_id) VALUES (?, ?, ?)',
+                       [(faceta, valor, simulacao_id) for faceta, valor in facetas_turmas(turmas)])
+
+
+def simulacoes_sem_indice(cursor, consulta_pendentes):
+    """{id: (nome, turmas)} das simulações que `consulta_pendentes` aponta
+
+    consulta_pendentes: SELECT que devolve os ids ainda fora do índice
+    """
+    cursor.execute(f'''
+    SELECT simulacoes.id, simulacoes.nome, turmas.nome_turma, turmas.nivel, turmas.disciplina
+    FROM simulacoes
+    LEFT JOIN turmas ON turmas.simulacao_id = simulacoes.id AND turmas.versao_ate IS NULL
+    WHERE simulacoes.id IN ({consulta_pendentes})
+    ORDER BY simulacoes.id, turmas.posicao, turmas.id
+    ''')
+    pendentes = defaultdict(lambda: [None, []])
+    for simulacao_id, nome, nome_turma, nivel, disciplina in cursor.fetchall():
+        pendentes[simulacao_id][0] = nome
+        if nome_turma is not None or nivel is not None or disciplina is not None:
+            pendentes[simulacao_id][1].append({'nome': nome_turma, 'nivel': nivel, 'disciplina': disciplina})
+    return pendentes
+
+
+def criar_indice_busca(cursor, rotulos):
+    """Cria o índice textual, as facetas, o gatilho de exclusão e os índices (SQLite)"""
+    cursor.execute(SQL_CRIAR_INDICE)
+    cursor.execute(SQL_CRIAR_FACETAS)
+    cursor.execute(SQL_CRIAR_GATILHO)
+    for comando in SQL_INDICES_BUSCA:
+        cursor.execute(comando)
+
+    pendentes = simulacoes_sem_indice(
+        cursor, 'SELECT id FROM simulacoes WHERE id NOT IN (SELECT rowid FROM busca_simulacoes)')
+    for simulacao_id, (nome, turmas) in pendentes.items():
+        indexar_simulacao(cursor, simulacao_id, nome, turmas, rotulos)
+    if pendentes:
+        print(f"🔎 {len(pendentes)} simulações indexadas para a busca")
+
+
+def montar_busca(filtros, condicao_texto, colunas, marcador='?'):
+    """SQL da busca: {'total', 'pagina', 'facetas', 'facetas_varredura'} -> (sql, parâmetros)
+
+    filtros: texto, nivel, disciplina, margem_min (inclusive), margem_max (exclusive)
+    condicao_texto: (cláusula sobre simulacoes.id, parâmetro) da busca textual
+    do backend, ou None se não há termos
+    A página recebe ainda LIMIT e OFFSET nos dois últimos parâmetros.
+    """
+    condicoes, parametros = [], []
+    if condicao_texto:
+        condicoes.append(condicao_texto[0])
+        parametros.append(condicao_texto[1])
+
+    turma = [(campo, filtros[campo]) for campo in FACETAS if filtros.get(campo)]
+    if len(turma) > 1:
+        condicoes.append(f'''simulacoes.id IN (
+            SELECT simulacao_id FROM turmas
+            WHERE versao_ate IS NULL AND {' AND '.join(f'{campo} = {marcador}' for campo, _ in turma)}
+        )''')
+        parametros.extend(valor for _, valor in turma)
+    elif turma:
+        condicoes.append(f'''simulacoes.id IN (
+            SELECT simulacao_id FROM facetas_simulacao WHERE faceta = {marcador} AND valor = {marcador}
+        )''')
+        parametros.extend(turma[0])
+
+    if filtros.get('margem_min') is not None:
+        condicoes.append(f'simulacoes.margem_lucro >= {marcador}')
+        parametros.append(filtros['margem_min'])
+    if filtros.get('margem_max') is not None:
+        condicoes.append(f'simulacoes.margem_lucro < {marcador}')
+        parametros.append(filtros['margem_max'])
+
+    onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+    encontradas = f'IN (SELECT simulacoes.id FROM simulacoes {onde})'
+    contagem = 'SELECT faceta, valor, COUNT(*) FROM facetas_simulacao {} GROUP BY faceta, valor'
+    return {
+        'total': (f'SELECT COUNT(*) FROM simulacoes {onde}', parametros),
+        'pagina': (f'''
+        SELECT {colunas} FROM simulacoes {onde}
+        ORDER BY data_criacao DESC, id DESC
+        LIMIT {marcador} OFFSET {marcador}
+        ''', parametros),
+        # Poucas encontradas: busca as facetas de cada uma pelo índice de simulacao_id;
+        # muitas: varre a chave (faceta, valor, simulacao_id) inteira (o '+' desliga o índice)
+        'facetas': (contagem.format(f'WHERE simulacao_id {encontradas}' if condicoes else ''), parametros),
+        'facetas_varredura': (contagem.format(f'WHERE +simulacao_id {encontradas}' if condicoes else ''), parametros)
+    }
+
+
+def executar_busca(cursor, consultas, limite, offset=0):
+    """Roda as consultas de montar_busca (cursor do sqlite3 ou do psycopg)
+
+    Returns:
+        {'total', 'simulacoes': [linhas como dicts], 'facetas': {faceta: {valor: simulações}}}
+    """
+    sql, parametros = consultas['total']
+    cursor.execute(sql, parametros)
+    total = cursor.fetchone()[0]
+
+    sql, parametros = consultas['pagina']
+    cursor.execute(sql, [*parametros, limite, offset])
+    nomes = [coluna[0] for coluna in cursor.description]
+    simulacoes = [dict(zip(nomes, linha)) for linha in cursor.fetchall()]
+
+    facetas = {faceta: {} for faceta in FACETAS}
+    if total:
+        cursor.execute('SELECT COUNT(*) FROM simulacoes')
+        sql, parametros = consultas['facetas_varredura' if total * 4 > cursor.fetchone()[0] else 'facetas']
+        cursor.execute(sql, parametros)
+        for faceta, valor, simulacoes_valor in cursor.fetchall():
+            facetas.setdefault(faceta, {})[valor] = simulacoes_valor
+    return {'total': total, 'simulacoes': simulacoes, 'facetas': facetas}
@@ -0,0 +1,134 @@
+# calendario_escolar.py - Horários (sinais) por segmento e classificação de turmas
+"""
+Monta uma única vez as tabelas período → horário real de cada segmento e
+memoriza a classificação turma → segmento.
+
+Cada escola pode ter seus próprios horários: basta criar um CalendarioEscolar
+com outro dicionário de segmentos (ou carregar de um arquivo JSON).
+"""
+import json
+from datetime import time
+from functools import lru_cache
+
+# Horários padrão: lista de (início, fim) na ordem dos períodos
+HORARIOS_PADRAO = {
+    # Ensino Médio: 7 períodos com intervalo APÓS o 3º período
+    "EM": [
+        ("07:00", "07:50"),
+        ("07:50", "08:40"),
+        ("08:40", "09:30"),
+        ("09:50", "10:40"),
+        ("10:40", "11:30"),
+        ("11:30", "12:20"),
+        ("12:20", "13:10"),
+    ],
+    # EF II: 5 períodos com intervalo APÓS o 2º período
+    "EF_II": [
+        ("07:50", "08:40"),
+        ("08:40", "09:30"),
+        ("09:50", "10:40"),
+        ("10:40", "11:30"),
+        ("11:30", "12:20"),
+    ],
+}
+
+SEGMENTO_PADRAO = "EF_II"
+HORARIO_VAZIO = (time(0, 0), time(0, 0))
+
+
+@lru_cache(maxsize=None)
+def classificar_segmento_turma(turma_nome):
+    """Determina o segmento da turma baseado no nome (memorizado)"""
+    if not turma_nome:
+        return "EF_II"
+
+    turma_nome_lower = turma_nome.lower()
+
+    # Verificar se é EM
+    if 'em' in turma_nome_lower:
+        return "EM"
+    # Verificar se é EF II
+    elif any(x in turma_nome_lower for x in ['6', '7', '8', '9', 'ano', 'ef']):
+        return "EF_II"
+    elif turma_nome_lower[0].isdigit():
+        return "EF_II"
+    else:
+        return "EM"
+
+
+def _converter_hora(texto):
+    """Converte 'HH:MM' em objeto time"""
+    hora, minuto = texto.split(':')
+    return time(int(hora), int(minuto))
+
+
+class HorarioSegmento:
+    """Tabelas pré-calculadas dos períodos de um segmento"""
+    __slots__ = ('segmento', 'periodos', 'texto', 'intervalos', 'periodo_por_texto')
+
+    def __init__(self, segmento, horarios):
+        self.segmento = segmento
+        self.periodos = list(range(1, len(horarios) + 1))
+        self.texto = {}
+        self.intervalos = {}
+        self.periodo_por_texto = {}
+
+        for periodo, (inicio, fim) in zip(self.periodos, horarios):
+            texto = f"{inicio} - {fim}"
+            self.texto[periodo] = texto
+            self.intervalos[periodo] = (_converter_hora(inicio), _converter_hora(fim))
+            self.periodo_por_texto[texto] = periodo
+
+
+class CalendarioEscolar:
+    """Horários de sinal de uma escola, por segmento"""
+
+    def __init__(self, horarios_segmentos=None, classificar_segmento=classificar_segmento_turma):
+        if horarios_segmentos is None:
+            horarios_segmentos = HORARIOS_PADRAO
+        self.segmentos = {
+            segmento: HorarioSegmento(segmento, horarios)
+            for segmento, horarios in horarios_segmentos.items()
+        }
+        self.classificar_segmento = classificar_segmento
+
+    @classmethod
+    def de_arquivo(cls, caminho):
+        """Carrega horários de um JSON no formato {"EM": [["07:00", "07:50"], ...]}"""
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        return cls({segmento: [tuple(h) for h in horarios] for segmento, horarios in dados.items()})
+
+    def segmento_turma(self, turma_nome):
+        """Segmento da turma (classificação memorizada)"""
+        return self.classificar_segmento(turma_nome)
+
+    def horario_segmento(self, segmento):
+        """Tabelas do segmento, caindo no segmento padrão se não configurado"""
+        horario = self.segmentos.get(segmento)
+        if horario is None:
+            horario = self.segmentos.get(SEGMENTO_PADRAO) or next(iter(self.segmentos.values()))
+        return horario
+
+    def horario_turma(self, turma_nome):
+        """Tabelas de horários aplicáveis à turma"""
+        return self.horario_segmento(self.segmento_turma(turma_nome))
+
+    def periodos(self, turma_nome):
+        """Períodos disponíveis para a turma"""
+        return self.horario_turma(turma_nome).periodos
+
+    def horario_real(self, turma_nome, periodo):
+        """Horário real formatado ('07:00 - 07:50')"""
+        return self.horario_turma(turma_nome).texto.get(periodo, f"Período {periodo}")
+
+    def horario_real_time(self, turma_nome, periodo):
+        """Horário real como objetos time (inicio, fim)"""
+        return self.horario_turma(turma_nome).intervalos.get(periodo, HORARIO_VAZIO)
+
+    def periodo_por_horario_real(self, turma_nome, horario_real):
+        """Número do período correspondente ao horário real (0 se não existir)"""
+        return self.horario_turma(turma_nome).periodo_por_texto.get(horario_real, 0)
+
+
+CALENDARIO_PADRAO = CalendarioEscolar()
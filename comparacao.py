@@ -0,0 +1,132 @@
+# comparacao.py - Diferenças entre simulações
+"""
+Comparação de simulações: turmas incluídas, removidas e alteradas (campo a
+campo) e a variação de cada indicador dos resultados.
+
+As turmas são pareadas pelo nome (repetições do mesmo nome são pareadas na
+ordem em que aparecem). Cada turma tem uma impressão digital (hash do
+conteúdo); só os pares com impressões diferentes são comparados campo a
+campo, e as turmas sem par com o mesmo conteúdo são tratadas como
+renomeadas. Tudo em tempo linear no número de turmas.
+"""
+from collections import defaultdict
+
+from conteudos import CAMPOS_FORA_DO_HASH, hash_turma
+
+
+def conteudo_turma(turma):
+    return {campo: valor for campo, valor in turma.items() if campo not in CAMPOS_FORA_DO_HASH}
+
+
+def impressao_turma(turma):
+    """Hash do conteúdo da turma (o de conteudos.hash_turma, sem o nome e o id)"""
+    return hash_turma(turma, excluir=CAMPOS_FORA_DO_HASH)
+
+
+def _chaves(turmas):
+    """(nome, ocorrência) de cada turma, para parear nomes repetidos pela ordem"""
+    vistos = defaultdict(int)
+    chaves = []
+    for turma in turmas:
+        nome = turma.get('nome', '')
+        chaves.append((nome, vistos[nome]))
+        vistos[nome] += 1
+    return chaves
+
+
+def _campos_alterados(antes, depois):
+    alterados = {}
+    for campo in conteudo_turma(antes).keys() | conteudo_turma(depois).keys():
+        valor_antes, valor_depois = antes.get(campo), depois.get(campo)
+        if valor_antes != valor_depois:
+            alterado = {'antes': valor_antes, 'depois': valor_depois}
+            if isinstance(valor_antes, (int, float)) and isinstance(valor_depois, (int, float)):
+                alterado['delta'] = valor_depois - valor_antes
+            alterados[campo] = alterado
+    return alterados
+
+
+def comparar_turmas(base, outra):
+    """Diferença entre duas listas de turmas
+
+    Returns:
+        dict com incluidas, removidas, renomeadas, alteradas e o número de iguais
+    """
+    indice_base = dict(zip(_chaves(base), base))
+    indice_outra = dict(zip(_chaves(outra), outra))
+    impressoes_base = {chave: impressao_turma(turma) for chave, turma in indice_base.items()}
+    impressoes_outra = {chave: impressao_turma(turma) for chave, turma in indice_outra.items()}
+
+    alteradas, iguais = [], 0
+    for chave in indice_base.keys() & indice_outra.keys():
+        if impressoes_base[chave] == impressoes_outra[chave]:
+            iguais += 1
+            continue
+        alteradas.append({
+            'nome': chave[0],
+            'campos': _campos_alterados(indice_base[chave], indice_outra[chave])
+        })
+
+    # Sem par pelo nome: mesmo conteúdo dos dois lados = turma renomeada
+    sem_par_base = defaultdict(list)
+    for chave in indice_base.keys() - indice_outra.keys():
+        sem_par_base[impressoes_base[chave]].append(chave)
+    removidas_chaves = set(indice_base.keys() - indice_outra.keys())
+
+    incluidas, renomeadas = [], []
+    for chave in sorted(indice_outra.keys() - indice_base.keys(), key=lambda c: (str(c[0]), c[1])):
+        candidatas = sem_par_base.get(impressoes_outra[chave])
+        if candidatas:
+            chave_base = candidatas.pop()
+            removidas_chaves.discard(chave_base)
+            renomeadas.append({'de': chave_base[0], 'para': chave[0]})
+        else:
+            incluidas.append(indice_outra[chave])
+
+    removidas = [indice_base[chave] for chave in sorted(removidas_chaves, key=lambda c: (str(c[0]), c[1]))]
+    alteradas.sort(key=lambda item: str(item['nome']))
+    return {
+        'incluidas': incluidas,
+        'removidas': removidas,
+        'renomeadas': renomeadas,
+        'alteradas': alteradas,
+        'iguais': iguais
+    }
+
+
+def comparar_resultados(base, outra):
+    """Variação de cada indicador numérico dos resultados"""
+    deltas = {}
+    for indicador in sorted(base.keys() | outra.keys()):
+        valor_base, valor_outra = base.get(indicador), outra.get(indicador)
+        numericos = all(isinstance(valor, (int, float)) and not isinstance(valor, bool)
+                        for valor in (valor_base, valor_outra))
+        if not numericos:
+            continue
+        deltas[indicador] = {
+            'base': valor_base,
+            'valor': valor_outra,
+            'delta': valor_outra - valor_base,
+            'delta_percentual': ((valor_outra - valor_base) / abs(valor_base) * 100) if valor_base else None
+        }
+    return deltas
+
+
+def comparar_simulacoes(simulacoes):
+    """Compara cada simulação com a primeira (a base)
+
+    simulacoes: lista de dicts com id, nome, turmas e resultados
+    """
+    base = simulacoes[0]
+    comparacoes = []
+    for outra in simulacoes[1:]:
+        comparacoes.append({
+            'id': outra['id'],
+            'nome': outra['nome'],
+            'resultados': comparar_resultados(base.get('resultados', {}), outra.get('resultados', {})),
+            'turmas': comparar_turmas(base.get('turmas', []), outra.get('turmas', []))
+        })
+    return {
+        'base': {'id': base['id'], 'nome': base['nome']},
+        'comparacoes': comparacoes
+    }
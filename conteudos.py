@@ -0,0 +1,117 @@
+# conteudos.py - Armazenamento das simulações por hash de conteúdo
+"""
+Deduplicação dos dados completos das simulações.
+
+O hash de uma simulação é calculado sobre a entrada canônica (chaves
+ordenadas), sem o nome: cada turma tem o seu hash e o da simulação combina
+os hashes das turmas, na ordem, com o restante da entrada (custos, alunos,
+salas...). Simulações com o mesmo conteúdo — cópias, o exemplo carregado
+várias vezes — apontam para a mesma linha da tabela `conteudos`, que guarda
+o JSON completo (entrada, turmas, custos, alunos e resultados) uma única vez.
+
+Como os resultados só dependem da entrada, a mesma linha serve de cache: um
+recálculo de uma entrada já salva devolve os resultados guardados — desde
+que calculados pela versão atual do cálculo (VERSAO_CALCULO, gravada junto).
+
+Linhas antigas de `simulacoes`, com o JSON na própria coluna
+`dados_completos`, continuam válidas; SQL_DADOS_COMPLETOS lê de onde houver.
+"""
+import hashlib
+from datetime import datetime
+
+import json_rapido
+from json_rapido import canonico
+
+SQL_CRIAR_TABELA = '''
+CREATE TABLE IF NOT EXISTS conteudos (
+    hash TEXT PRIMARY KEY,
+    dados TEXT,
+    criado_em TEXT
+)
+'''
+
+# Expressão do SELECT que devolve o JSON completo de uma linha de simulacoes
+SQL_DADOS_COMPLETOS = ('COALESCE(simulacoes.dados_completos, '
+                       '(SELECT dados FROM conteudos WHERE conteudos.hash = simulacoes.hash_conteudo))')
+
+CAMPOS_FORA_DO_HASH = ('nome', 'id')
+
+# Versão de app.calcular_resultados_salas: incrementar sempre que o cálculo
+# mudar. Resultados guardados (e memoizados) de outra versão são recalculados.
+# Conteúdos gravados antes deste campo contam como versão 1.
+VERSAO_CALCULO = 2
+
+
+def criar_tabela_conteudos(cursor):
+    """Cria a tabela de conteúdos e a coluna hash_conteudo em bancos antigos"""
+    cursor.execute(SQL_CRIAR_TABELA)
+    cursor.execute('PRAGMA table_info(simulacoes)')
+    if 'hash_conteudo' not in {linha[1] for linha in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE simulacoes ADD COLUMN hash_conteudo TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_simulacoes_hash ON simulacoes (hash_conteudo)')
+
+
+def _hash(conteudo):
+    return hashlib.blake2b(conteudo, digest_size=20).hexdigest()
+
+
+def hash_turma(turma, excluir=()):
+    """Hash da turma sem os campos em `excluir` (independe da ordem das chaves)"""
+    if excluir:
+        turma = {campo: valor for campo, valor in turma.items() if campo not in excluir}
+    return _hash(canonico(turma))
+
+
+def hash_simulacao(dados):
+    """Hash da entrada da simulação (independe do nome e da ordem das chaves)"""
+    resto = {chave: valor for chave, valor in dados.items()
+             if chave not in CAMPOS_FORA_DO_HASH and chave != 'turmas'}
+    resto['turmas'] = [hash_turma(turma) for turma in dados.get('turmas', [])]
+    return _hash(canonico(resto))
+
+
+def montar_conteudo(dados, resultados):
+    """JSON completo guardado em `conteudos` (a entrada sem o nome, que é da simulação)"""
+    return {
+        'entrada': {chave: valor for chave, valor in dados.items() if chave not in CAMPOS_FORA_DO_HASH},
+        'resultados': resultados,
+        'versao_calculo': VERSAO_CALCULO,
+        'turmas': dados.get('turmas', []),
+        'custos': dados.get('custos', {}),
+        'alunos': dados.get('alunos', [])
+    }
+
+
+def guardar_conteudo(cursor, hash_conteudo, dados_completos):
+    """Grava o conteúdo se ainda não existe (ou regrava, se os resultados ou a versão do cálculo mudaram)"""
+    guardados = resultados_guardados(cursor, hash_conteudo, dados_completos.get('versao_calculo', 1))
+    if guardados is not None and guardados == dados_completos.get('resultados', {}):
+        return
+
+    cursor.execute('''
+    INSERT INTO conteudos (hash, dados, criado_em) VALUES (?, ?, ?)
+    ON CONFLICT (hash) DO UPDATE SET dados = excluded.dados
+    ''', (hash_conteudo, json_rapido.dumps(dados_completos).decode('utf-8'),
+          datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def liberar_conteudo(cursor, hash_conteudo):
+    """Apaga o conteúdo se nenhuma simulação aponta mais para ele"""
+    if hash_conteudo is None:
+        return
+    cursor.execute('''
+    DELETE FROM conteudos
+    WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM simulacoes WHERE hash_conteudo = ?)
+    ''', (hash_conteudo, hash_conteudo))
+
+
+def resultados_guardados(cursor, hash_conteudo, versao_calculo=None):
+    """Resultados já calculados para esta entrada pela versão do cálculo pedida (None se não há)"""
+    cursor.execute('''
+    SELECT json_extract(dados, '$.resultados') FROM conteudos
+    WHERE hash = ? AND COALESCE(json_extract(dados, '$.versao_calculo'), 1) = ?
+    ''', (hash_conteudo, VERSAO_CALCULO if versao_calculo is None else versao_calculo))
+    linha = cursor.fetchone()
+    if linha is None or linha[0] is None:
+        return None
+    return json_rapido.loads(linha[0])
@@ -0,0 +1,41 @@
+// perf_simulacao.js - Teste de desempenho do resumo da página /simulacao
+// ============================================
+// TESTE DE DESEMPENHO NO NAVEGADOR
+// ============================================
+// Só para desenvolvimento: não é publicado em /static (entrega_http.ASSETS_PUBLICADOS).
+// Uso: abra /simulacao, cole este arquivo no console e chame perfSimulacao(200).
+// Cria N turmas, edita cards aleatórios e compara o recálculo incremental com
+// a recontagem completa; as medidas 'resumo' também aparecem no painel Performance.
+
+function perfSimulacao(totalTurmas = 200, edicoes = 50) {
+    const container = document.getElementById('turmas_container');
+    while (container.querySelectorAll('.turma-card').length < totalTurmas) {
+        adicionarTurma();
+    }
+    atualizarResumo();
+
+    const cards = Array.from(container.querySelectorAll('.turma-card'));
+    const medir = (funcao) => {
+        const tempos = [];
+        for (let i = 0; i < edicoes; i++) {
+            const card = cards[Math.floor(Math.random() * cards.length)];
+            card.querySelector('.alunos-matriculados').value = 5 + (i % 30);
+            const inicio = performance.now();
+            funcao(card);
+            tempos.push(performance.now() - inicio);
+        }
+        tempos.sort((a, b) => a - b);
+        return {
+            p50_ms: tempos[Math.floor(tempos.length * 0.5)].toFixed(3),
+            p95_ms: tempos[Math.min(tempos.length - 1, Math.floor(tempos.length * 0.95))].toFixed(3)
+        };
+    };
+
+    const resultado = {
+        turmas: cards.length,
+        incremental: medir(card => { estadoResumo.pendentes.add(card); aplicarPendentes(); }),
+        completo: medir(() => atualizarResumo())
+    };
+    console.table({incremental: resultado.incremental, completo: resultado.completo});
+    return resultado;
+}
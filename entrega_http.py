@@ -0,0 +1,178 @@
+# entrega_http.py - Compressão, ETag/304 e assets estáticos versionados
+"""
+Camada de entrega HTTP para os apps Flask:
+
+- compressão gzip/brotli das respostas conforme o Accept-Encoding
+  (brotli é opcional: usado apenas se o pacote `brotli` estiver instalado)
+- ETag forte nas páginas e APIs JSON (GET), com resposta 304 para If-None-Match
+- CSS/JS estáticos (pasta static/) servidos em /assets com a versão
+  (hash do conteúdo) na URL, cache longo e variantes já comprimidas
+
+Os assets são lidos e comprimidos uma única vez no import do módulo.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import abort, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PASTA_ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSETS_PUBLICADOS = {
+    'css/salas.css': 'text/css; charset=utf-8',
+    'js/simulacao.js': 'application/javascript; charset=utf-8',
+    'js/lista_virtual.js': 'application/javascript; charset=utf-8',
+}
+
+TIPOS_COMPRIMIVEIS = ('text/html', 'text/css', 'text/plain', 'application/javascript',
+                      'application/json')
+TIPOS_COM_ETAG = ('text/html', 'application/json')
+TAMANHO_MINIMO_COMPRESSAO = 512  # bytes; abaixo disso o cabeçalho gzip não compensa
+NIVEL_GZIP = 6
+NIVEL_BROTLI = 5
+NIVEL_GZIP_ASSETS = 9
+NIVEL_BROTLI_ASSETS = 11
+
+CACHE_ASSET_VERSIONADO = 'public, max-age=31536000, immutable'
+CACHE_ASSET_SEM_VERSAO = 'public, max-age=300'
+CACHE_PAGINA = 'no-cache'  # o navegador sempre revalida, e recebe 304 se nada mudou
+
+
+def codificacoes_suportadas():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def escolher_codificacao(accept_encoding):
+    """Escolhe 'br', 'gzip' ou None a partir do header Accept-Encoding"""
+    aceitas = {}
+    for item in (accept_encoding or '').split(','):
+        nome, _, parametros = item.strip().partition(';')
+        peso = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                peso = float(parametros[2:])
+            except ValueError:
+                peso = 0.0
+        if nome:
+            aceitas[nome.lower()] = peso
+
+    for codificacao in codificacoes_suportadas():
+        peso = aceitas.get(codificacao, aceitas.get('*', 0.0))
+        if peso > 0:
+            return codificacao
+    return None
+
+
+def comprimir(conteudo, codificacao, assets=False):
+    if codificacao == 'br':
+        return brotli.compress(conteudo, quality=NIVEL_BROTLI_ASSETS if assets else NIVEL_BROTLI)
+    return gzip.compress(conteudo, compresslevel=NIVEL_GZIP_ASSETS if assets else NIVEL_GZIP, mtime=0)
+
+
+# ============================================
+# ASSETS ESTÁTICOS
+# ============================================
+
+class Asset:
+    """Conteúdo de um asset com as variantes comprimidas e o ETag"""
+    __slots__ = ('nome', 'tipo', 'conteudo', 'versao', 'variantes')
+
+    def __init__(self, nome, tipo, conteudo):
+        self.nome = nome
+        self.tipo = tipo
+        self.conteudo = conteudo
+        self.versao = hashlib.sha256(conteudo).hexdigest()[:12]
+        self.variantes = {None: conteudo}
+        for codificacao in codificacoes_suportadas():
+            self.variantes[codificacao] = comprimir(conteudo, codificacao, assets=True)
+
+    def etag(self, codificacao):
+        return f'{self.versao}-{codificacao}' if codificacao else self.versao
+
+
+class RegistroAssets:
+    """Assets carregados da pasta static/, endereçados por nome relativo"""
+
+    def __init__(self, pasta, publicados):
+        self.assets = {}
+        for nome, tipo in publicados.items():
+            with open(os.path.join(pasta, nome), 'rb') as arquivo:
+                self.assets[nome] = Asset(nome, tipo, arquivo.read())
+
+    def url(self, nome):
+        """URL versionada (muda quando o conteúdo muda)"""
+        return f'/assets/{nome}?v={self.assets[nome].versao}'
+
+    def responder(self, app, nome):
+        asset = self.assets.get(nome)
+        if asset is None:
+            abort(404)
+
+        codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+        response = app.response_class(asset.variantes[codificacao], mimetype=asset.tipo)
+        response.set_etag(asset.etag(codificacao))
+        response.headers['Vary'] = 'Accept-Encoding'
+        if codificacao:
+            response.headers['Content-Encoding'] = codificacao
+        versionado = request.args.get('v') == asset.versao
+        response.headers['Cache-Control'] = CACHE_ASSET_VERSIONADO if versionado else CACHE_ASSET_SEM_VERSAO
+        return response.make_conditional(request)
+
+
+ASSETS = RegistroAssets(PASTA_ASSETS, ASSETS_PUBLICADOS)
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+def _comprimivel(response):
+    return (not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in TIPOS_COMPRIMIVEIS)
+
+
+def instrumentar_entrega(app):
+    """Registra /assets, ETag/304 e compressão das respostas no app Flask
+
+    Deve ser chamado depois de instrumentar_app(): os after_request rodam na
+    ordem inversa do registro, e assim /metrics mede os bytes já comprimidos.
+    """
+
+    @app.route('/assets/<path:nome>')
+    def assets(nome):
+        """CSS/JS estáticos versionados"""
+        return ASSETS.responder(app, nome)
+
+    @app.after_request
+    def entregar_resposta(response):
+        if response.status_code != 200 or not _comprimivel(response):
+            return response
+
+        conteudo = response.get_data()
+        codificacao = None
+        if len(conteudo) >= TAMANHO_MINIMO_COMPRESSAO:
+            codificacao = escolher_codificacao(request.headers.get('Accept-Encoding'))
+        response.headers.add('Vary', 'Accept-Encoding')
+
+        # ETag forte por representação: o corpo comprimido é outro conteúdo
+        if request.method in ('GET', 'HEAD') and response.mimetype in TIPOS_COM_ETAG:
+            versao = hashlib.sha256(conteudo).hexdigest()[:20]
+            response.set_etag(f'{versao}-{codificacao}' if codificacao else versao)
+            response.headers.setdefault('Cache-Control', CACHE_PAGINA)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        if codificacao:
+            response.set_data(comprimir(conteudo, codificacao))
+            response.headers['Content-Encoding'] = codificacao
+        return response
+
+    return app
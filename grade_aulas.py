@@ -0,0 +1,145 @@
+# grade_aulas.py - Representação compacta e tipada das aulas da grade
+"""
+Normaliza a grade horária uma única vez em objetos AulaGrade (com __slots__)
+e ids inteiros internados para turma, professor e disciplina.
+
+As verificações de conflito e a renderização trabalham sobre esta estrutura,
+sem repetir a cadeia isinstance/hasattr dos acessores obter_*_aula para cada
+aula em cada passada.
+"""
+
+CAMPOS_AULA = ('turma', 'disciplina', 'professor', 'dia', 'horario', 'segmento')
+
+
+class TabelaIds:
+    """Interna nomes (turma, professor, disciplina) em ids inteiros"""
+    __slots__ = ('ids', 'nomes')
+
+    def __init__(self):
+        self.ids = {}
+        self.nomes = []
+
+    def obter_id(self, nome):
+        """Retorna o id do nome, criando um novo se ainda não existir"""
+        if nome is None:
+            return -1
+        id_nome = self.ids.get(nome)
+        if id_nome is None:
+            id_nome = len(self.nomes)
+            self.ids[nome] = id_nome
+            self.nomes.append(nome)
+        return id_nome
+
+    def obter_nome(self, id_nome):
+        """Retorna o nome correspondente ao id"""
+        if id_nome < 0:
+            return None
+        return self.nomes[id_nome]
+
+    def __len__(self):
+        return len(self.nomes)
+
+
+class AulaGrade:
+    """Aula normalizada: campos diretos + ids internados + aula original"""
+    __slots__ = CAMPOS_AULA + ('turma_id', 'disciplina_id', 'professor_id', 'original')
+
+    def __init__(self, turma, disciplina, professor, dia, horario, segmento=None,
+                 turma_id=-1, disciplina_id=-1, professor_id=-1, original=None):
+        self.turma = turma
+        self.disciplina = disciplina
+        self.professor = professor
+        self.dia = dia
+        self.horario = horario
+        self.segmento = segmento
+        self.turma_id = turma_id
+        self.disciplina_id = disciplina_id
+        self.professor_id = professor_id
+        self.original = original
+
+    def completa(self):
+        """Indica se a aula tem turma, dia, horário e disciplina"""
+        return bool(self.turma and self.dia and self.horario and self.disciplina)
+
+    def para_dict(self):
+        """Converte de volta para o formato dict usado pelo restante do sistema"""
+        return {campo: getattr(self, campo) for campo in CAMPOS_AULA}
+
+    def __repr__(self):
+        return (f"AulaGrade({self.turma!r}, {self.disciplina!r}, {self.professor!r}, "
+                f"{self.dia!r}, {self.horario!r})")
+
+
+def extrair_campos_aula(aula):
+    """Lê os campos de uma aula (objeto ou dict) de uma só vez"""
+    if isinstance(aula, dict):
+        return tuple(aula.get(campo) for campo in CAMPOS_AULA)
+    return tuple(getattr(aula, campo, None) for campo in CAMPOS_AULA)
+
+
+class GradeNormalizada:
+    """Grade horária normalizada com tabelas de ids compartilhadas"""
+
+    def __init__(self):
+        self.aulas = []
+        self.turmas = TabelaIds()
+        self.professores = TabelaIds()
+        self.disciplinas = TabelaIds()
+        self._aulas_por_professor = None
+
+    def adicionar(self, aula):
+        """Normaliza e adiciona uma aula, retornando o AulaGrade criado"""
+        if isinstance(aula, AulaGrade):
+            aula = aula.original if aula.original is not None else aula.para_dict()
+        turma, disciplina, professor, dia, horario, segmento = extrair_campos_aula(aula)
+        aula_grade = AulaGrade(
+            turma, disciplina, professor, dia, horario, segmento,
+            turma_id=self.turmas.obter_id(turma),
+            disciplina_id=self.disciplinas.obter_id(disciplina),
+            professor_id=self.professores.obter_id(professor),
+            original=aula
+        )
+        self.aulas.append(aula_grade)
+        self._aulas_por_professor = None
+        return aula_grade
+
+    def originais(self, aulas_grade=None):
+        """Retorna as aulas no formato original (objeto/dict)"""
+        if aulas_grade is None:
+            aulas_grade = self.aulas
+        return [a.original for a in aulas_grade]
+
+    def aulas_por_professor(self):
+        """Quantidade de aulas de cada professor, indexada pelo id (contada uma vez por grade)"""
+        if self._aulas_por_professor is None:
+            contagem = [0] * len(self.professores)
+            for aula in self.aulas:
+                if aula.professor_id >= 0:
+                    contagem[aula.professor_id] += 1
+            self._aulas_por_professor = contagem
+        return self._aulas_por_professor
+
+    def por_turma(self):
+        """Agrupa as aulas por turma em uma única passada"""
+        grupos = {}
+        for aula in self.aulas:
+            if aula.turma:
+                grupos.setdefault(aula.turma, []).append(aula)
+        return grupos
+
+    def __iter__(self):
+        return iter(self.aulas)
+
+    def __len__(self):
+        return len(self.aulas)
+
+
+def normalizar_grade(aulas):
+    """Normaliza a lista de aulas uma única vez (idempotente)"""
+    if isinstance(aulas, GradeNormalizada):
+        return aulas
+
+    grade = GradeNormalizada()
+    for aula in aulas or []:
+        grade.adicionar(aula)
+    return grade
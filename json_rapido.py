@@ -0,0 +1,112 @@
+# json_rapido.py - Serialização JSON rápida e seleção de campos
+"""
+Serialização JSON para as APIs de leitura. Usa orjson quando instalado
+(opcional) e cai para o json da biblioteca padrão caso contrário. As duas
+saídas são UTF-8, sem espaços e com as chaves não-string convertidas, mas
+não são idênticas:
+
+- datetime: orjson gera ISO 8601 com 'T' (2024-03-01T08:00:00); o json
+  padrão usa default=str (2024-03-01 08:00:00)
+- NaN e infinito: orjson gera null; o json padrão gera NaN/Infinity (JSON
+  inválido para navegadores)
+
+Os dados das simulações vêm de JSON, então na prática só NaN/Infinity
+enviados pelo cliente mudam a saída — e, com ela, o hash de canonico().
+Os hashes guardados (conteudos.py, memo_resultados.py) só valem entre
+processos que usam a mesma biblioteca.
+
+A seleção de campos aceita caminhos com ponto, aplicados a cada item quando
+o valor é uma lista:
+
+    ?campos=id,nome,resultados.lucro_mensal,turmas.nome
+"""
+import json
+import time
+
+from flask import current_app
+
+from metricas import acumular_tempo
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    """Serializa para bytes UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def canonico(obj):
+    """Serialização canônica (chaves ordenadas) para calcular hashes de conteúdo"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def loads(conteudo):
+    if orjson is not None:
+        return orjson.loads(conteudo)
+    return json.loads(conteudo)
+
+
+def resposta_json(dados, status=200):
+    """Response JSON serializada com o serializador rápido (tempo medido em /metrics)"""
+    inicio = time.perf_counter()
+    corpo = dumps(dados)
+    acumular_tempo('metricas_json_dump', time.perf_counter() - inicio)
+    return current_app.response_class(corpo, status=status, mimetype='application/json')
+
+
+# ============================================
+# SELEÇÃO DE CAMPOS
+# ============================================
+
+def ler_campos(texto):
+    """Converte 'a,b.c' em [('a',), ('b', 'c')]; None se nada foi pedido"""
+    if not texto:
+        return None
+    campos = [tuple(parte for parte in campo.strip().split('.') if parte) for campo in texto.split(',')]
+    return [campo for campo in campos if campo] or None
+
+
+def campos_raiz(campos):
+    """Chaves de primeiro nível pedidas (None = todas)"""
+    if campos is None:
+        return None
+    return {campo[0] for campo in campos}
+
+
+def _arvore(campos):
+    """[('a',), ('b', 'c')] -> {'a': None, 'b': {'c': None}} (None = valor inteiro)"""
+    arvore = {}
+    for campo in campos:
+        no = arvore
+        for i, parte in enumerate(campo):
+            if i == len(campo) - 1:
+                no[parte] = None
+            elif no.get(parte, {}) is None:
+                break  # um prefixo já pediu o valor inteiro
+            else:
+                no = no.setdefault(parte, {})
+    return arvore
+
+
+def _selecionar(valor, arvore):
+    if arvore is None:
+        return valor
+    if isinstance(valor, list):
+        return [_selecionar(item, arvore) for item in valor]
+    if isinstance(valor, dict):
+        return {chave: _selecionar(valor[chave], sub) for chave, sub in arvore.items() if chave in valor}
+    return valor
+
+
+def selecionar_campos(dados, campos):
+    """Mantém apenas os campos pedidos (resultado de ler_campos)"""
+    if campos is None:
+        return dados
+    return _selecionar(dados, _arvore(campos))
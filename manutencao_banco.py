@@ -0,0 +1,145 @@
+# manutencao_banco.py - Exclusão em lote, limpeza de órfãos e compactação do banco
+"""
+Manutenção do banco de simulações.
+
+As exclusões dependem das chaves estrangeiras (PRAGMA foreign_keys, ligado
+em toda conexão por conectar_db): apagar a simulação apaga, pelo próprio
+SQLite, as turmas de todas as versões, os alunos dessas turmas e o registro
+das versões. Aqui só se escolhe o conjunto de simulações e se liberam os
+conteúdos (conteudos.py) que deixaram de ser usados — tudo com comandos
+sobre conjuntos, sem laço por simulação.
+
+Uso:
+    python manutencao_banco.py                  # remove órfãos, verifica as FKs e compacta (VACUUM)
+    python manutencao_banco.py --sem-vacuum     # só remove órfãos e verifica as FKs
+    python manutencao_banco.py --banco outro.db
+"""
+import argparse
+import os
+import sys
+
+
+def excluir_simulacoes(cursor, ids):
+    """Exclui as simulações (e, em cascata, turmas, alunos e versões)
+
+    Os conteúdos deduplicados que só essas simulações usavam também são
+    apagados. Deve rodar dentro de uma transação.
+
+    Returns:
+        ids efetivamente excluídos
+    """
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS ids_exclusao (id INTEGER PRIMARY KEY)')
+    cursor.execute('DELETE FROM temp.ids_exclusao')
+    cursor.executemany('INSERT OR IGNORE INTO temp.ids_exclusao (id) VALUES (?)', ((int(i),) for i in ids))
+
+    cursor.execute('SELECT id FROM simulacoes WHERE id IN (SELECT id FROM temp.ids_exclusao) ORDER BY id')
+    excluidos = [linha[0] for linha in cursor.fetchall()]
+
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS hashes_exclusao (hash TEXT PRIMARY KEY)')
+    cursor.execute('DELETE FROM temp.hashes_exclusao')
+    cursor.execute('''
+    INSERT OR IGNORE INTO temp.hashes_exclusao (hash)
+    SELECT hash_conteudo FROM simulacoes
+    WHERE id IN (SELECT id FROM temp.ids_exclusao) AND hash_conteudo IS NOT NULL
+    ''')
+
+    cursor.execute('DELETE FROM simulacoes WHERE id IN (SELECT id FROM temp.ids_exclusao)')
+    cursor.execute('''
+    DELETE FROM conteudos
+    WHERE hash IN (SELECT hash FROM temp.hashes_exclusao)
+      AND NOT EXISTS (SELECT 1 FROM simulacoes WHERE simulacoes.hash_conteudo = conteudos.hash)
+    ''')
+    return excluidos
+
+
+def limpar_orfaos(cursor):
+    """Remove linhas que apontam para registros que não existem mais
+
+    (deixadas por exclusões feitas antes de as chaves estrangeiras serem ligadas)
+
+    Returns:
+        {tabela: linhas removidas}
+    """
+    comandos = {
+        'turmas': 'DELETE FROM turmas WHERE simulacao_id NOT IN (SELECT id FROM simulacoes)',
+        'alunos': 'DELETE FROM alunos WHERE turma_id IS NOT NULL AND turma_id NOT IN (SELECT id FROM turmas)',
+        'versoes_simulacao': 'DELETE FROM versoes_simulacao WHERE simulacao_id NOT IN (SELECT id FROM simulacoes)',
+        'busca_simulacoes': 'DELETE FROM busca_simulacoes WHERE rowid NOT IN (SELECT id FROM simulacoes)',
+        'facetas_simulacao': 'DELETE FROM facetas_simulacao WHERE simulacao_id NOT IN (SELECT id FROM simulacoes)',
+        'conteudos': '''DELETE FROM conteudos WHERE NOT EXISTS
+                        (SELECT 1 FROM simulacoes WHERE simulacoes.hash_conteudo = conteudos.hash)'''
+    }
+    removidas = {}
+    for tabela, comando in comandos.items():
+        cursor.execute(comando)
+        removidas[tabela] = cursor.rowcount
+    return removidas
+
+
+def _tamanho(conn):
+    paginas = conn.execute('PRAGMA page_count').fetchone()[0]
+    tamanho_pagina = conn.execute('PRAGMA page_size').fetchone()[0]
+    livres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return {'bytes': paginas * tamanho_pagina, 'paginas_livres': livres}
+
+
+def compactar_banco(conn):
+    """VACUUM (devolve ao disco as páginas livres) e atualiza as estatísticas do planejador
+
+    Junta antes os segmentos do índice de busca (FTS5 'optimize'). Precisa de
+    uma conexão fora de transação; trava o banco enquanto roda.
+
+    Returns:
+        {'antes': {...}, 'depois': {...}} com bytes e páginas livres
+    """
+    conn.isolation_level = None
+    antes = _tamanho(conn)
+    conn.execute("INSERT INTO busca_simulacoes (busca_simulacoes) VALUES ('optimize')")
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA optimize')
+    return {'antes': antes, 'depois': _tamanho(conn)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manutenção do banco de simulações')
+    parser.add_argument('--banco', help='Arquivo do banco (padrão: o de app.py)')
+    parser.add_argument('--sem-vacuum', action='store_true', help='Não compacta o arquivo')
+    args = parser.parse_args()
+
+    import app as app_salas
+    from app import conectar_db
+    from repositorio import transacao_imediata
+
+    if args.banco:
+        if not os.path.exists(args.banco):
+            print(f'❌ Banco {args.banco} não encontrado')
+            return 1
+        app_salas.DATABASE = args.banco
+    app_salas.init_db()
+
+    conn = conectar_db()
+    with transacao_imediata(conn) as cursor:
+        removidas = limpar_orfaos(cursor)
+    for tabela, quantidade in removidas.items():
+        print(f'🧹 {tabela}: {quantidade} linhas órfãs removidas')
+
+    violacoes = conn.execute('PRAGMA foreign_key_check').fetchall()
+    if violacoes:
+        print(f'❌ {len(violacoes)} violações de chave estrangeira:')
+        for tabela, linha, referencia, _ in violacoes[:20]:
+            print(f'   {tabela} #{linha} -> {referencia}')
+    else:
+        print('✅ Chaves estrangeiras consistentes')
+
+    if not args.sem_vacuum:
+        tamanhos = compactar_banco(conn)
+        antes, depois = tamanhos['antes'], tamanhos['depois']
+        print(f"📦 {antes['bytes'] / 1024:.0f} KB ({antes['paginas_livres']} páginas livres) -> "
+              f"{depois['bytes'] / 1024:.0f} KB")
+    conn.close()
+    return 1 if violacoes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
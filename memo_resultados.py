@@ -0,0 +1,233 @@
+# memo_resultados.py - Memoização dos resultados calculados (memória + disco)
+"""
+Cache dos resultados de cálculo, endereçado pelo hash canônico da entrada.
+
+Duas camadas:
+
+- memória: LRU por processo, limitada em número de itens e em bytes
+- disco: arquivo SQLite compartilhado entre os workers, limitado em bytes;
+  ao passar do limite, as entradas usadas há mais tempo são removidas
+
+Uma consulta olha a memória, depois o disco (e promove o acerto para a
+memória). Os valores são guardados serializados, então quem recebe um
+resultado pode alterá-lo sem afetar o cache. Acertos, faltas e evicções
+de cada camada são exportados em /metrics.
+
+Configuração por variáveis de ambiente:
+    SALAS_MEMO_ITENS      itens na memória (padrão 512)
+    SALAS_MEMO_MB         megabytes na memória (padrão 32)
+    SALAS_MEMO_DISCO_MB   megabytes no disco (padrão 256)
+    SALAS_MEMO_ARQUIVO    arquivo do cache em disco (padrão: cache_resultados.db
+                          na pasta do banco; '' desativa o disco)
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+import json_rapido
+
+MEMO_ITENS = int(os.environ.get('SALAS_MEMO_ITENS', 512))
+MEMO_BYTES = int(os.environ.get('SALAS_MEMO_MB', 32)) * 1024 * 1024
+MEMO_DISCO_BYTES = int(os.environ.get('SALAS_MEMO_DISCO_MB', 256)) * 1024 * 1024
+ARQUIVO_MEMO = os.environ.get('SALAS_MEMO_ARQUIVO')
+NOME_ARQUIVO_MEMO = 'cache_resultados.db'
+
+SQL_CRIAR_TABELA = '''
+CREATE TABLE IF NOT EXISTS memo (
+    chave TEXT PRIMARY KEY,
+    valor BLOB,
+    tamanho INTEGER,
+    usado_em REAL
+)
+'''
+
+
+def arquivo_memo(banco):
+    """Arquivo do cache em disco: o de SALAS_MEMO_ARQUIVO ou, sem ela, um na pasta do banco"""
+    if ARQUIVO_MEMO is not None:
+        return ARQUIVO_MEMO
+    return os.path.join(os.path.dirname(banco), NOME_ARQUIVO_MEMO)
+
+
+class MemoResultados:
+    """Cache LRU em memória com segunda camada em disco"""
+
+    def __init__(self, arquivo=NOME_ARQUIVO_MEMO, max_itens=MEMO_ITENS, max_bytes=MEMO_BYTES,
+                 max_bytes_disco=MEMO_DISCO_BYTES):
+        self.arquivo = arquivo
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.max_bytes_disco = max_bytes_disco
+        self.itens = OrderedDict()  # chave -> bytes serializados
+        self.bytes = 0
+        self.trava = threading.Lock()
+        self.disco_pronto = False
+        self.contadores = dict.fromkeys(
+            ('acertos_memoria', 'acertos_disco', 'faltas', 'evicoes_memoria', 'evicoes_disco', 'erros_disco'), 0
+        )
+
+    def _contar(self, campo, quantidade=1):
+        with self.trava:
+            self.contadores[campo] += quantidade
+
+    # ----- memória -----
+
+    def _guardar_memoria(self, chave, valor):
+        with self.trava:
+            anterior = self.itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= len(anterior)
+            if len(valor) > self.max_bytes:
+                return
+            self.itens[chave] = valor
+            self.bytes += len(valor)
+            while len(self.itens) > self.max_itens or self.bytes > self.max_bytes:
+                _, removido = self.itens.popitem(last=False)
+                self.bytes -= len(removido)
+                self.contadores['evicoes_memoria'] += 1
+
+    def _obter_memoria(self, chave):
+        with self.trava:
+            valor = self.itens.get(chave)
+            if valor is not None:
+                self.itens.move_to_end(chave)
+            return valor
+
+    # ----- disco -----
+
+    def _conectar_disco(self):
+        conn = sqlite3.connect(self.arquivo, timeout=5)
+        if not self.disco_pronto:
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(SQL_CRIAR_TABELA)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_memo_usado ON memo (usado_em)')
+                conn.commit()
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self.disco_pronto = True
+        return conn
+
+    def _erro_disco(self, operacao, erro):
+        self._contar('erros_disco')
+        print(f"⚠️ Cache em disco indisponível ({operacao}): {erro}")
+
+    def _obter_disco(self, chave):
+        if not self.arquivo:
+            return None
+        try:
+            with closing(self._conectar_disco()) as conn:
+                linha = conn.execute('SELECT valor FROM memo WHERE chave = ?', (chave,)).fetchone()
+                if linha is not None:
+                    conn.execute('UPDATE memo SET usado_em = ? WHERE chave = ?', (time.time(), chave))
+                    conn.commit()
+            return linha[0] if linha is not None else None
+        except sqlite3.Error as e:
+            self._erro_disco('leitura', e)
+            return None
+
+    def _guardar_disco(self, chave, valor):
+        if not self.arquivo or len(valor) > self.max_bytes_disco:
+            return
+        try:
+            with closing(self._conectar_disco()) as conn:
+                conn.execute('INSERT OR REPLACE INTO memo (chave, valor, tamanho, usado_em) VALUES (?, ?, ?, ?)',
+                             (chave, valor, len(valor), time.time()))
+                total = conn.execute('SELECT COALESCE(SUM(tamanho), 0) FROM memo').fetchone()[0]
+                removidas = []
+                if total > self.max_bytes_disco:
+                    # Remove as menos usadas até voltar ao limite
+                    excesso = total - self.max_bytes_disco
+                    for chave_antiga, tamanho in conn.execute('SELECT chave, tamanho FROM memo ORDER BY usado_em'):
+                        if excesso <= 0:
+                            break
+                        removidas.append((chave_antiga,))
+                        excesso -= tamanho
+                    conn.executemany('DELETE FROM memo WHERE chave = ?', removidas)
+                conn.commit()
+            self._contar('evicoes_disco', len(removidas))
+        except sqlite3.Error as e:
+            self._erro_disco('gravação', e)
+
+    # ----- interface -----
+
+    def obter(self, chave):
+        """Valor guardado (uma cópia nova a cada chamada) ou None"""
+        valor = self._obter_memoria(chave)
+        if valor is not None:
+            self._contar('acertos_memoria')
+            return json_rapido.loads(valor)
+
+        valor = self._obter_disco(chave)
+        if valor is not None:
+            self._contar('acertos_disco')
+            self._guardar_memoria(chave, valor)
+            return json_rapido.loads(valor)
+
+        self._contar('faltas')
+        return None
+
+    def guardar(self, chave, valor):
+        serializado = json_rapido.dumps(valor)
+        self._guardar_memoria(chave, serializado)
+        self._guardar_disco(chave, serializado)
+
+    def obter_ou_calcular(self, chave, calcular):
+        valor = self.obter(chave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(chave, valor)
+        return valor
+
+    def limpar(self):
+        with self.trava:
+            self.itens.clear()
+            self.bytes = 0
+        if self.arquivo:
+            try:
+                with closing(self._conectar_disco()) as conn:
+                    conn.execute('DELETE FROM memo')
+                    conn.commit()
+            except sqlite3.Error as e:
+                self._erro_disco('limpeza', e)
+
+    def estatisticas(self):
+        with self.trava:
+            contadores = dict(self.contadores)
+            itens, tamanho = len(self.itens), self.bytes
+        consultas = contadores['acertos_memoria'] + contadores['acertos_disco'] + contadores['faltas']
+        acertos = contadores['acertos_memoria'] + contadores['acertos_disco']
+        return {
+            **contadores,
+            'consultas': consultas,
+            'taxa_acerto': acertos / consultas if consultas else 0.0,
+            'itens_memoria': itens,
+            'bytes_memoria': tamanho
+        }
+
+    def exportar_metricas(self):
+        """Linhas no formato do Prometheus (para o /metrics)"""
+        stats = self.estatisticas()
+        linhas = ['# HELP salas_memo_consultas_total Consultas ao cache de resultados por camada e desfecho',
+                  '# TYPE salas_memo_consultas_total counter']
+        for camada, desfecho, campo in (('memoria', 'acerto', 'acertos_memoria'), ('disco', 'acerto', 'acertos_disco'),
+                                        ('nenhuma', 'falta', 'faltas')):
+            linhas.append(f'salas_memo_consultas_total{{camada="{camada}",desfecho="{desfecho}"}} {stats[campo]}')
+        linhas += ['# HELP salas_memo_evicoes_total Entradas removidas do cache por falta de espaço',
+                   '# TYPE salas_memo_evicoes_total counter',
+                   f'salas_memo_evicoes_total{{camada="memoria"}} {stats["evicoes_memoria"]}',
+                   f'salas_memo_evicoes_total{{camada="disco"}} {stats["evicoes_disco"]}',
+                   '# HELP salas_memo_taxa_acerto Fração das consultas atendidas pelo cache',
+                   '# TYPE salas_memo_taxa_acerto gauge',
+                   f'salas_memo_taxa_acerto {stats["taxa_acerto"]}',
+                   '# HELP salas_memo_itens Itens no cache em memória',
+                   '# TYPE salas_memo_itens gauge',
+                   f'salas_memo_itens {stats["itens_memoria"]}',
+                   '# HELP salas_memo_bytes Bytes no cache em memória',
+                   '# TYPE salas_memo_bytes gauge',
+                   f'salas_memo_bytes {stats["bytes_memoria"]}']
+        return linhas
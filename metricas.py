@@ -0,0 +1,332 @@
+# metricas.py - Instrumentação de desempenho por requisição (Flask)
+"""
+Middleware de métricas para os apps Flask:
+
+- histograma de latência por rota
+- tempo gasto no banco (sqlite3) por requisição
+- tempo de parse e de serialização de JSON
+- tamanho da resposta renderizada
+
+Tudo é exposto em /metrics no formato texto do Prometheus. Enviando o header
+X-Perfil: 1 a requisição é amostrada por um profiler de amostragem simples;
+os perfis mais recentes ficam em /metrics/perfis.
+
+/metrics, /metrics/perfis e o X-Perfil ficam desligados (404 / header
+ignorado) até SALAS_METRICAS_TOKEN ser definida; daí exigem o header
+Authorization: Bearer <token>. A coleta das métricas em si roda sempre.
+"""
+import hmac
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HEADER_PERFIL = 'X-Perfil'
+TOKEN_METRICAS = os.environ.get('SALAS_METRICAS_TOKEN', '')
+INTERVALO_AMOSTRAGEM = 0.005  # 5 ms
+PERFIS_GUARDADOS = 20
+
+
+class Histograma:
+    """Histograma cumulativo com rótulos, no estilo Prometheus"""
+
+    def __init__(self, nome, descricao, buckets):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = buckets
+        self.series = {}  # rotulos -> [contagens por bucket, soma, total]
+
+    def observar(self, rotulos, valor):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * len(self.buckets), 0.0, 0]
+        contagens = serie[0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                contagens[i] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        for rotulos, (contagens, soma, total) in sorted(self.series.items()):
+            base = ','.join(f'{chave}="{valor}"' for chave, valor in rotulos)
+            separador = ',' if base else ''
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f'{self.nome}_bucket{{{base}{separador}le="{limite}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{base}{separador}le="+Inf"}} {total}')
+            linhas.append(f'{self.nome}_sum{{{base}}} {soma}')
+            linhas.append(f'{self.nome}_count{{{base}}} {total}')
+        return linhas
+
+
+class RegistroMetricas:
+    """Métricas acumuladas do processo"""
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.latencia = Histograma('http_request_duration_seconds',
+                                   'Latência das requisições por rota', BUCKETS_SEGUNDOS)
+        self.tempo_db = Histograma('http_request_db_seconds',
+                                   'Tempo gasto no banco por requisição', BUCKETS_SEGUNDOS)
+        self.tempo_json_parse = Histograma('http_request_json_parse_seconds',
+                                           'Tempo de parse do JSON da requisição', BUCKETS_SEGUNDOS)
+        self.tempo_json_dump = Histograma('http_response_json_serialize_seconds',
+                                          'Tempo de serialização do JSON da resposta', BUCKETS_SEGUNDOS)
+        self.tamanho_resposta = Histograma('http_response_size_bytes',
+                                           'Tamanho da resposta renderizada', BUCKETS_BYTES)
+        self.requisicoes = Counter()  # (rota, metodo, status) -> total
+        self.perfis = deque(maxlen=PERFIS_GUARDADOS)
+        self.coletores = []  # funções que devolvem linhas extras para o /metrics
+
+    def registrar(self, rota, metodo, status, duracao, db, json_parse, json_dump, tamanho):
+        rotulos = (('metodo', metodo), ('rota', rota))
+        with self.trava:
+            self.latencia.observar(rotulos, duracao)
+            self.tempo_db.observar(rotulos, db)
+            if json_parse:
+                self.tempo_json_parse.observar(rotulos, json_parse)
+            if json_dump:
+                self.tempo_json_dump.observar(rotulos, json_dump)
+            self.tamanho_resposta.observar(rotulos, tamanho)
+            self.requisicoes[(rota, metodo, status)] += 1
+
+    def registrar_coletor(self, coletor):
+        """Inclui no /metrics as linhas devolvidas por `coletor()` (caches, filas...)"""
+        self.coletores.append(coletor)
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus"""
+        with self.trava:
+            linhas = ['# HELP http_requests_total Total de requisições por rota e status',
+                      '# TYPE http_requests_total counter']
+            for (rota, metodo, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f'http_requests_total{{metodo="{metodo}",rota="{rota}",status="{status}"}} {total}')
+            for histograma in (self.latencia, self.tempo_db, self.tempo_json_parse,
+                               self.tempo_json_dump, self.tamanho_resposta):
+                linhas.extend(histograma.exportar())
+        for coletor in self.coletores:
+            linhas.extend(coletor())
+        return '\n'.join(linhas) + '\n'
+
+
+METRICAS = RegistroMetricas()
+
+
+def acumular_tempo(campo, duracao):
+    """Soma um tempo ao contador da requisição atual (se houver)"""
+    if has_request_context():
+        setattr(g, campo, getattr(g, campo, 0.0) + duracao)
+
+
+# ============================================
+# BANCO DE DADOS
+# ============================================
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que soma o tempo de execução/fetch ao tempo de banco da requisição"""
+
+    def execute(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            acumular_tempo('metricas_db', time.perf_counter() - inicio)
+
+    def executemany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            acumular_tempo('metricas_db', time.perf_counter() - inicio)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            acumular_tempo('metricas_db', time.perf_counter() - inicio)
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            acumular_tempo('metricas_db', time.perf_counter() - inicio)
+
+
+class ConexaoMedida(sqlite3.Connection):
+    """Conexão sqlite3 cujos cursores e commits são cronometrados"""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, *args, **kwargs):
+        return self.cursor().execute(*args, **kwargs)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            acumular_tempo('metricas_db', time.perf_counter() - inicio)
+
+
+def conectar_medido(database, **kwargs):
+    """sqlite3.connect com medição de tempo de banco por requisição"""
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(database, factory=ConexaoMedida, **kwargs)
+    acumular_tempo('metricas_db', time.perf_counter() - inicio)
+    return conn
+
+
+# ============================================
+# JSON
+# ============================================
+
+class JSONProviderMedido(DefaultJSONProvider):
+    """Provider JSON do Flask que cronometra parse e serialização"""
+
+    def loads(self, s, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().loads(s, **kwargs)
+        finally:
+            acumular_tempo('metricas_json_parse', time.perf_counter() - inicio)
+
+    def dumps(self, obj, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            acumular_tempo('metricas_json_dump', time.perf_counter() - inicio)
+
+
+# ============================================
+# PROFILER DE AMOSTRAGEM
+# ============================================
+
+class AmostradorPerfil:
+    """Amostra periodicamente a pilha da thread da requisição"""
+
+    def __init__(self, thread_id, intervalo=INTERVALO_AMOSTRAGEM):
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.amostras = Counter()
+        self.parar = threading.Event()
+        self.thread = threading.Thread(target=self._executar, daemon=True)
+
+    def _executar(self):
+        while not self.parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None and len(pilha) < 30:
+                codigo = frame.f_code
+                pilha.append(f'{codigo.co_name} ({codigo.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})')
+                frame = frame.f_back
+            if pilha:
+                self.amostras[';'.join(reversed(pilha))] += 1
+
+    def iniciar(self):
+        self.thread.start()
+        return self
+
+    def finalizar(self):
+        self.parar.set()
+        self.thread.join()
+        return self.amostras
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+def acesso_metricas_liberado():
+    """True se há token configurado e a requisição traz Authorization: Bearer <token>"""
+    if not TOKEN_METRICAS:
+        return False
+    tipo, _, token = request.headers.get('Authorization', '').partition(' ')
+    return tipo.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), TOKEN_METRICAS.encode())
+
+
+def instrumentar_app(app):
+    """Registra o middleware de métricas e as rotas /metrics no app Flask"""
+    app.json = JSONProviderMedido(app)
+
+    @app.before_request
+    def iniciar_metricas():
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_db = 0.0
+        g.metricas_json_parse = 0.0
+        g.metricas_json_dump = 0.0
+        g.metricas_perfil = None
+        if request.headers.get(HEADER_PERFIL) == '1' and acesso_metricas_liberado():
+            g.metricas_perfil = AmostradorPerfil(threading.get_ident()).iniciar()
+
+    @app.after_request
+    def registrar_metricas(response):
+        inicio = getattr(g, 'metricas_inicio', None)
+        if inicio is None or request.path.startswith('/metrics'):
+            return response
+
+        duracao = time.perf_counter() - inicio
+        rota = request.url_rule.rule if request.url_rule is not None else 'nao_encontrada'
+        tamanho = response.calculate_content_length() or 0
+
+        amostrador = g.metricas_perfil
+        if amostrador is not None:
+            g.metricas_perfil = None
+            amostras = amostrador.finalizar()
+            METRICAS.perfis.append({
+                'rota': rota,
+                'metodo': request.method,
+                'duracao': duracao,
+                'intervalo': amostrador.intervalo,
+                'pilhas': dict(amostras.most_common(50))
+            })
+            response.headers['X-Perfil-Amostras'] = str(sum(amostras.values()))
+
+        METRICAS.registrar(rota, request.method, response.status_code, duracao,
+                           g.metricas_db, g.metricas_json_parse, g.metricas_json_dump, tamanho)
+        response.headers['Server-Timing'] = (
+            f'total;dur={duracao * 1000:.2f}, db;dur={g.metricas_db * 1000:.2f}'
+        )
+        return response
+
+    @app.teardown_request
+    def finalizar_perfil(exc):
+        # Garante que o amostrador pare mesmo se a requisição falhar
+        amostrador = getattr(g, 'metricas_perfil', None)
+        if amostrador is not None:
+            amostrador.finalizar()
+
+    @app.route('/metrics')
+    def metrics():
+        """Métricas no formato texto do Prometheus"""
+        if not acesso_metricas_liberado():
+            return _negar_metricas()
+        return METRICAS.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    @app.route('/metrics/perfis')
+    def metrics_perfis():
+        """Perfis das requisições amostradas com o header X-Perfil: 1"""
+        if not acesso_metricas_liberado():
+            return _negar_metricas()
+        return jsonify(list(METRICAS.perfis))
+
+    return app
+
+
+def _negar_metricas():
+    # Sem token configurado as rotas nem existem; com token, pede autenticação
+    if not TOKEN_METRICAS:
+        return jsonify({'error': 'Não encontrado'}), 404
+    return jsonify({'error': 'Não autorizado'}), 401, {'WWW-Authenticate': 'Bearer'}
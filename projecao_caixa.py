@@ -0,0 +1,328 @@
+# projecao_caixa.py - Projeção de fluxo de caixa mês a mês (12 a 60 meses)
+"""
+Projeção de fluxo de caixa das turmas com evolução do ACR.
+
+Para cada mês e cada turma (matriz tempo × turma):
+
+    alunos(m, k)    = min(capacidade_k, alunos_k × curva_matriculas[nivel_k][mês do calendário])
+    receita(m, k)   = alunos(m, k) × mensalidade_k × reajuste(m)
+    custo(m, k)     = custo_professor_k × inflacao_professor(m) + material_k × inflacao_custos(m)
+
+O reajuste da mensalidade é anual (no mês de reajuste); as inflações de custo
+são compostas mês a mês. Os custos fixos são corrigidos pela inflação de
+custos. Com numpy instalado (opcional) a matriz é calculada vetorizada; sem
+ele, por um laço equivalente em Python puro.
+
+As turmas podem vir no formato do app web (horas_semanais × dias_semana × 4
+semanas) ou no formato de models.Turma (horas_semana × 4,33 semanas).
+"""
+from models import Turma
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MESES_MINIMO = 12
+MESES_MAXIMO = 60
+
+# Multiplicador das matrículas por mês do calendário (jan..dez): entrada no
+# início do ano, evasão ao longo do semestre e saída no fim do ano
+CURVA_MATRICULAS_PADRAO = [0.90, 1.00, 1.00, 1.00, 0.98, 0.97, 0.95, 0.97, 0.97, 0.96, 0.95, 0.92]
+
+
+def _numero(turma, *campos, padrao=0):
+    for campo in campos:
+        valor = turma.get(campo)
+        if valor is not None:
+            return float(valor or 0)
+    return padrao
+
+
+def custo_professor_mensal(turma):
+    """Custo mensal do professor no formato do app web ou de models.Turma"""
+    if 'horas_semanais' in turma:
+        horas_mensais = _numero(turma, 'horas_semanais') * _numero(turma, 'dias_semana') * 4
+        return horas_mensais * _numero(turma, 'custo_hora_professor')
+    return Turma(
+        id=turma.get('id'), disciplina_id=None, nivel_id=None, capacidade=0, alunos_matriculados=0,
+        horas_semana=_numero(turma, 'horas_semana'), dias_semana=0,
+        custo_hora_professor=_numero(turma, 'custo_hora_professor'), mensalidade_aluno=0,
+        custo_material_mes=0
+    ).calcular_custo_professor_mes()
+
+
+def total_custos_fixos(custos):
+    """Soma os custos fixos mensais (número, dict simples ou dict por categoria)"""
+    if isinstance(custos, dict):
+        return sum(total_custos_fixos(valor) for valor in custos.values())
+    return float(custos or 0)
+
+
+class ParametrosProjecao:
+    """Premissas da projeção"""
+
+    def __init__(self, meses=12, mes_inicial=1, curva_matriculas=None, reajuste_mensalidade_anual=0.0,
+                 mes_reajuste=1, inflacao_professor_anual=0.0, inflacao_custos_anual=0.0,
+                 taxa_desconto_anual=0.0, investimento_inicial=0.0):
+        if not MESES_MINIMO <= meses <= MESES_MAXIMO:
+            raise ValueError(f'meses deve estar entre {MESES_MINIMO} e {MESES_MAXIMO}')
+        if not 1 <= mes_inicial <= 12 or not 1 <= mes_reajuste <= 12:
+            raise ValueError('mes_inicial e mes_reajuste devem estar entre 1 e 12')
+
+        # curva_matriculas: lista de 12 fatores, ou {nivel: lista} com 'padrao' opcional
+        curvas = dict(curva_matriculas) if isinstance(curva_matriculas, dict) else {'padrao': curva_matriculas}
+        curvas.setdefault('padrao', None)
+        self.curvas = {}
+        for nivel, curva in curvas.items():
+            if curva is None:
+                curva = CURVA_MATRICULAS_PADRAO
+            if not isinstance(curva, (list, tuple)) or len(curva) != 12:
+                raise ValueError(f'curva de matrículas de {nivel} deve ser uma lista de 12 fatores')
+            try:
+                self.curvas[nivel] = [float(fator) for fator in curva]
+            except (TypeError, ValueError):
+                raise ValueError(f'curva de matrículas de {nivel} deve ter apenas números')
+
+        self.meses = meses
+        self.mes_inicial = mes_inicial
+        self.reajuste_mensalidade_anual = reajuste_mensalidade_anual
+        self.mes_reajuste = mes_reajuste
+        self.inflacao_professor_anual = inflacao_professor_anual
+        self.inflacao_custos_anual = inflacao_custos_anual
+        self.taxa_desconto_anual = taxa_desconto_anual
+        self.investimento_inicial = investimento_inicial
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria a partir de um dict (JSON da requisição), ignorando chaves desconhecidas"""
+        dados = dados or {}
+        if not isinstance(dados, dict):
+            raise ValueError('As premissas da projeção devem ser um objeto JSON')
+        inteiros = ('meses', 'mes_inicial', 'mes_reajuste')
+        reais = ('reajuste_mensalidade_anual', 'inflacao_professor_anual', 'inflacao_custos_anual',
+                 'taxa_desconto_anual', 'investimento_inicial')
+        kwargs = {}
+        for campo in inteiros + reais:
+            if dados.get(campo) is None:
+                continue
+            try:
+                kwargs[campo] = (int if campo in inteiros else float)(dados[campo])
+            except (TypeError, ValueError):
+                raise ValueError(f'{campo} inválido: {dados[campo]}')
+        if dados.get('curva_matriculas') is not None:
+            kwargs['curva_matriculas'] = dados['curva_matriculas']
+        return cls(**kwargs)
+
+    def curva(self, nivel):
+        return self.curvas.get(nivel, self.curvas['padrao'])
+
+    def meses_calendario(self):
+        """Mês do calendário (0..11) de cada mês projetado"""
+        return [(self.mes_inicial - 1 + m) % 12 for m in range(self.meses)]
+
+    def fatores_reajuste(self):
+        """Fator acumulado de reajuste da mensalidade em cada mês (degrau anual)"""
+        fatores, fator = [], 1.0
+        for m, mes in enumerate(self.meses_calendario()):
+            if m > 0 and mes == self.mes_reajuste - 1:
+                fator *= 1 + self.reajuste_mensalidade_anual
+            fatores.append(fator)
+        return fatores
+
+    def fatores_inflacao(self, taxa_anual):
+        """Fator de inflação composta mês a mês (mês 1 = preços de hoje)"""
+        mensal = (1 + taxa_anual) ** (1 / 12)
+        return [mensal ** m for m in range(self.meses)]
+
+
+class ProjecaoCaixa:
+    """Resultado da projeção: curvas mensais, ACR, payback, VPL e TIR"""
+
+    def __init__(self, parametros, acr_inicial, receita, custo_professores, custo_material,
+                 custos_fixos, resultado_por_turma):
+        self.parametros = parametros
+        self.acr_inicial = acr_inicial
+        self.receita = receita
+        self.custo_professores = custo_professores
+        self.custo_material = custo_material
+        self.custos_fixos = custos_fixos
+        self.resultado_por_turma = resultado_por_turma
+        self.resultado = [r - p - m - f for r, p, m, f in zip(receita, custo_professores, custo_material, custos_fixos)]
+
+        # ACR: saldo inicial, menos o investimento, mais o resultado acumulado
+        self.acr = []
+        saldo = acr_inicial - parametros.investimento_inicial
+        for resultado in self.resultado:
+            saldo += resultado
+            self.acr.append(saldo)
+
+    @property
+    def fluxos(self):
+        """Fluxo de caixa com o investimento no mês 0"""
+        return [-self.parametros.investimento_inicial] + self.resultado
+
+    @property
+    def payback_mes(self):
+        """Primeiro mês em que o resultado acumulado cobre o investimento (None se não cobrir)"""
+        acumulado = -self.parametros.investimento_inicial
+        for mes, resultado in enumerate(self.resultado, start=1):
+            acumulado += resultado
+            if acumulado >= 0:
+                return mes
+        return None
+
+    @property
+    def vpl(self):
+        taxa = (1 + self.parametros.taxa_desconto_anual) ** (1 / 12) - 1
+        return valor_presente(self.fluxos, taxa)
+
+    @property
+    def tir_mensal(self):
+        return taxa_interna_retorno(self.fluxos)
+
+    def para_dict(self):
+        tir = self.tir_mensal
+        return {
+            'meses': self.parametros.meses,
+            'meses_calendario': [mes + 1 for mes in self.parametros.meses_calendario()],
+            'receita': self.receita,
+            'custo_professores': self.custo_professores,
+            'custo_material': self.custo_material,
+            'custos_fixos': self.custos_fixos,
+            'resultado': self.resultado,
+            'acr': self.acr,
+            'acr_inicial': self.acr_inicial,
+            'acr_final': self.acr[-1] if self.acr else self.acr_inicial,
+            'payback_mes': self.payback_mes,
+            'vpl': self.vpl,
+            'tir_mensal': tir,
+            'tir_anual': (1 + tir) ** 12 - 1 if tir is not None else None,
+            'resultado_por_turma': self.resultado_por_turma
+        }
+
+
+def valor_presente(fluxos, taxa_mensal):
+    """VPL de fluxos mensais (fluxos[0] no mês 0)"""
+    return sum(fluxo / (1 + taxa_mensal) ** mes for mes, fluxo in enumerate(fluxos))
+
+
+def taxa_interna_retorno(fluxos, iteracoes=200, tolerancia=1e-9):
+    """TIR mensal por bisseção; None se os fluxos não trocam de sinal"""
+    if not any(f < 0 for f in fluxos) or not any(f > 0 for f in fluxos):
+        return None
+    baixo, alto = -0.99, 1.0
+    vpl_baixo = valor_presente(fluxos, baixo)
+    while valor_presente(fluxos, alto) * vpl_baixo > 0:
+        alto *= 2
+        if alto > 1e6:
+            return None
+    for _ in range(iteracoes):
+        meio = (baixo + alto) / 2
+        vpl_meio = valor_presente(fluxos, meio)
+        if abs(vpl_meio) < tolerancia:
+            break
+        if vpl_meio * vpl_baixo > 0:
+            baixo, vpl_baixo = meio, vpl_meio
+        else:
+            alto = meio
+    return (baixo + alto) / 2
+
+
+# ============================================
+# MATRIZ TEMPO × TURMA
+# ============================================
+
+def _colunas_turmas(turmas):
+    """Vetores por turma: alunos, capacidade, mensalidade, custo do professor, material, nível"""
+    alunos, capacidade, mensalidade, professor, material, niveis = [], [], [], [], [], []
+    for turma in turmas:
+        alunos.append(_numero(turma, 'alunos_matriculados'))
+        capacidade.append(_numero(turma, 'capacidade'))
+        mensalidade.append(_numero(turma, 'mensalidade_aluno'))
+        professor.append(custo_professor_mensal(turma))
+        material.append(_numero(turma, 'custo_material_mensal', 'custo_material_mes'))
+        niveis.append(turma.get('nivel', turma.get('nivel_id')))
+    return alunos, capacidade, mensalidade, professor, material, niveis
+
+
+def _matriz_numpy(colunas, curvas_por_mes, reajuste, inflacao_professor, inflacao_custos):
+    alunos, capacidade, mensalidade, professor, material = (numpy.asarray(c, dtype=float) for c in colunas[:5])
+    niveis = colunas[5]
+
+    # Fator de matrícula (mês × turma): uma coluna por nível, indexada pelo código do nível da turma
+    codigos = {}
+    indices = numpy.fromiter((codigos.setdefault(n, len(codigos)) for n in niveis), dtype=numpy.intp, count=len(niveis))
+    ordem = sorted(codigos, key=codigos.get)
+    fatores = numpy.array([curvas_por_mes(nivel) for nivel in ordem], dtype=float).T[:, indices]
+
+    # Turma sem capacidade informada não tem teto de alunos
+    teto = numpy.where(capacidade > 0, capacidade, numpy.inf)
+    matriculas = numpy.minimum(teto, alunos * fatores)
+    receita = matriculas * mensalidade * numpy.asarray(reajuste)[:, None]
+    custo_professor = numpy.outer(inflacao_professor, professor)
+    custo_material = numpy.outer(inflacao_custos, material)
+    resultado = receita - custo_professor - custo_material
+    return (receita.sum(axis=1).tolist(), custo_professor.sum(axis=1).tolist(),
+            custo_material.sum(axis=1).tolist(), resultado.sum(axis=0).tolist())
+
+
+def _matriz_python(colunas, curvas_por_mes, reajuste, inflacao_professor, inflacao_custos):
+    alunos, capacidade, mensalidade, professor, material, niveis = colunas
+    meses = len(reajuste)
+    receita_mes = [0.0] * meses
+    resultado_turma = []
+    fatores_nivel = {}
+    for k, nivel in enumerate(niveis):
+        fatores = fatores_nivel.get(nivel)
+        if fatores is None:
+            fatores = fatores_nivel[nivel] = curvas_por_mes(nivel)
+        base, teto, preco = alunos[k], capacidade[k], mensalidade[k]
+        total = 0.0
+        for m in range(meses):
+            matriculas = base * fatores[m]
+            if teto > 0 and matriculas > teto:
+                matriculas = teto
+            receita = matriculas * preco * reajuste[m]
+            receita_mes[m] += receita
+            total += receita
+        resultado_turma.append(total)
+
+    # Custos não dependem da curva: soma das turmas × fator do mês
+    total_professor, total_material = sum(professor), sum(material)
+    custo_professor = [total_professor * fator for fator in inflacao_professor]
+    custo_material = [total_material * fator for fator in inflacao_custos]
+    soma_professor, soma_material = sum(inflacao_professor), sum(inflacao_custos)
+    resultado_turma = [receita - professor[k] * soma_professor - material[k] * soma_material
+                       for k, receita in enumerate(resultado_turma)]
+    return receita_mes, custo_professor, custo_material, resultado_turma
+
+
+def projetar_fluxo_caixa(turmas, custos_fixos, acr_inicial=0.0, parametros=None, outras_receitas=0.0):
+    """Projeta o fluxo de caixa mês a mês
+
+    turmas: dicts no formato do app web ou de models.Turma
+    custos_fixos: custos fixos mensais de hoje (total ou dict, ver total_custos_fixos)
+    outras_receitas: receita mensal fora das turmas (alunos individuais), só com reajuste
+    """
+    parametros = parametros or ParametrosProjecao()
+    meses_calendario = parametros.meses_calendario()
+    reajuste = parametros.fatores_reajuste()
+    inflacao_professor = parametros.fatores_inflacao(parametros.inflacao_professor_anual)
+    inflacao_custos = parametros.fatores_inflacao(parametros.inflacao_custos_anual)
+
+    def curvas_por_mes(nivel):
+        curva = parametros.curva(nivel)
+        return [curva[mes] for mes in meses_calendario]
+
+    colunas = _colunas_turmas(turmas)
+    calcular = _matriz_numpy if numpy is not None and turmas else _matriz_python
+    receita, custo_professores, custo_material, resultado_por_turma = calcular(
+        colunas, curvas_por_mes, reajuste, inflacao_professor, inflacao_custos
+    )
+    if outras_receitas:
+        receita = [valor + outras_receitas * fator for valor, fator in zip(receita, reajuste)]
+    custos_fixos = total_custos_fixos(custos_fixos)
+    custos_fixos_mes = [custos_fixos * fator for fator in inflacao_custos]
+    return ProjecaoCaixa(parametros, acr_inicial, receita, custo_professores, custo_material,
+                         custos_fixos_mes, resultado_por_turma)
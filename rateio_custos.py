@@ -0,0 +1,115 @@
+# rateio_custos.py - Rateio dos custos fixos entre as turmas (custeio por atividade)
+"""
+Rateio dos custos fixos das categorias de `custos` entre as turmas.
+
+Cada categoria é distribuída por um direcionador:
+
+- horas:  horas de aula no mês (horas_semanais × dias_semana × 4)
+- alunos: alunos matriculados
+- sala:   tempo de sala ponderado pelo tamanho (horas no mês × lugares ocupados
+          ou reservados, o maior entre capacidade e alunos)
+
+A parte de uma turma em um direcionador é o seu peso dividido pelo total de
+todas as turmas. Se nenhuma turma tem peso no direcionador de uma categoria
+(por exemplo, turmas sem horas lançadas), o custo vai para o primeiro
+direcionador de reserva com peso, em vez de sumir do rateio.
+
+Os totais podem ser passados prontos, o que permite ratear apenas uma
+página de turmas com as proporções da simulação inteira. Com numpy
+instalado (opcional) o rateio de todas as turmas é uma única operação
+matricial; sem ele, um laço em Python puro.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DIRECIONADORES = ('horas', 'alunos', 'sala')
+
+DIRECIONADOR_POR_CATEGORIA = {
+    'infraestrutura': 'sala',
+    'manutencao': 'sala',
+    'equipamentos': 'horas',
+    'marketing': 'alunos',
+    'administrativo': 'alunos'
+}
+DIRECIONADOR_PADRAO = 'alunos'
+
+# Para onde vai o custo de um direcionador sem peso em nenhuma turma
+RESERVAS_DIRECIONADOR = {
+    'sala': ('horas', 'alunos'),
+    'horas': ('alunos', 'sala'),
+    'alunos': ('horas', 'sala')
+}
+
+
+def pesos_turma(turma):
+    """Pesos (horas, alunos, sala) de uma turma"""
+    horas = (turma.get('horas_semanais', 0) or 0) * (turma.get('dias_semana', 0) or 0) * 4
+    alunos = turma.get('alunos_matriculados', 0) or 0
+    lugares = max(turma.get('capacidade', 0) or 0, alunos)
+    return horas, alunos, horas * lugares
+
+
+def custos_por_direcionador(custos, direcionador=None):
+    """Agrupa os custos fixos ({categoria: {item: valor}}) pelo direcionador de cada categoria
+
+    direcionador: força o mesmo direcionador para todas as categorias
+    """
+    if direcionador is not None and direcionador not in DIRECIONADORES:
+        raise ValueError(f'Direcionador inválido: {direcionador} (use {", ".join(DIRECIONADORES)})')
+
+    agrupados = dict.fromkeys(DIRECIONADORES, 0.0)
+    for categoria, itens in (custos or {}).items():
+        total = sum(valor for valor in itens.values() if valor > 0)
+        destino = direcionador or DIRECIONADOR_POR_CATEGORIA.get(categoria, DIRECIONADOR_PADRAO)
+        agrupados[destino] += total
+    return agrupados
+
+
+def ratear_custos_fixos(turmas, custos, direcionador=None, totais=None):
+    """Custo fixo rateado para cada turma
+
+    Returns:
+        lista (na ordem das turmas) de {'horas': ..., 'alunos': ..., 'sala': ..., 'total': ...}
+    """
+    agrupados = custos_por_direcionador(custos, direcionador)
+
+    if numpy is not None and turmas:
+        def coluna(campo):
+            return numpy.fromiter((turma.get(campo, 0) or 0 for turma in turmas), dtype=float, count=len(turmas))
+
+        horas = coluna('horas_semanais') * coluna('dias_semana') * 4
+        alunos = coluna('alunos_matriculados')
+        pesos = numpy.column_stack((horas, alunos, horas * numpy.maximum(coluna('capacidade'), alunos)))
+        totais = totais or dict(zip(DIRECIONADORES, pesos.sum(axis=0).tolist()))
+        valores = pesos * numpy.array(_taxas(agrupados, totais))
+        linhas = numpy.column_stack((valores, valores.sum(axis=1))).tolist()
+    else:
+        pesos = [pesos_turma(turma) for turma in turmas]
+        totais = totais or dict(zip(DIRECIONADORES, map(sum, zip(*pesos))))
+        taxas = _taxas(agrupados, totais)
+        linhas = []
+        for pesos_linha in pesos:
+            valores = [peso * taxa for peso, taxa in zip(pesos_linha, taxas)]
+            valores.append(sum(valores))
+            linhas.append(valores)
+
+    chaves = DIRECIONADORES + ('total',)
+    return [dict(zip(chaves, linha)) for linha in linhas]
+
+
+def _taxas(agrupados, totais):
+    """Custo por unidade de cada direcionador
+
+    O custo de um direcionador sem peso passa para a sua primeira reserva com
+    peso; só fica sem rateio se nenhuma turma tem peso algum.
+    """
+    custos = dict(agrupados)
+    for nome in DIRECIONADORES:
+        if custos[nome] and not totais.get(nome):
+            reserva = next((outro for outro in RESERVAS_DIRECIONADOR[nome] if totais.get(outro)), None)
+            if reserva is not None:
+                custos[reserva] += custos[nome]
+                custos[nome] = 0.0
+    return [custos[nome] / totais[nome] if totais.get(nome) else 0.0 for nome in DIRECIONADORES]
@@ -0,0 +1,159 @@
+# render_grade.py - Renderização da grade em formato calendário
+"""
+Agrupa as aulas em turma × dia × período numa única passada e gera o HTML
+de cada turma. O CSS é emitido uma só vez por página e o HTML de cada turma
+fica em cache até que as aulas daquela turma mudem.
+"""
+from html import escape
+
+from grade_aulas import normalizar_grade
+from calendario_escolar import CALENDARIO_PADRAO
+
+DIAS_CALENDARIO = ["segunda", "terca", "quarta", "quinta", "sexta"]
+DIAS_DISPLAY = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
+
+# Aceita também o formato abreviado dos dias
+DIAS_ABREVIADOS = {"seg": "segunda", "ter": "terca", "qua": "quarta", "qui": "quinta", "sex": "sexta"}
+
+CSS_CALENDARIO = """
+<style>
+.tabela-calendario {
+    width: 100%;
+    border-collapse: collapse;
+    margin: 20px 0;
+    font-family: Arial, sans-serif;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+.tabela-calendario th {
+    background-color: #4a6baf;
+    color: white;
+    padding: 12px;
+    text-align: center;
+    font-weight: bold;
+    border: 1px solid #ddd;
+}
+.tabela-calendario td {
+    padding: 10px;
+    border: 1px solid #ddd;
+    text-align: center;
+    vertical-align: middle;
+    min-height: 60px;
+}
+.celula-horario {
+    background-color: #f0f7ff;
+    font-weight: bold;
+    color: #2c5282;
+}
+.celula-aula {
+    background-color: #e8f5e9;
+    border-radius: 4px;
+    margin: 2px;
+}
+.celula-vazia {
+    background-color: #f9f9f9;
+    color: #999;
+    font-style: italic;
+}
+.disciplina-nome {
+    font-weight: bold;
+    font-size: 13px;
+    color: #2e7d32;
+}
+.professor-nome {
+    font-size: 11px;
+    color: #555;
+}
+</style>
+"""
+
+
+def pivotar_grade(aulas):
+    """Agrupa as aulas em {turma: {(dia, periodo): [aulas]}} numa única passada"""
+    pivo = {}
+    for aula in normalizar_grade(aulas):
+        if not aula.turma:
+            continue
+        dia = DIAS_ABREVIADOS.get(aula.dia, aula.dia)
+        pivo.setdefault(aula.turma, {}).setdefault((dia, aula.horario), []).append(aula)
+    return pivo
+
+
+def assinatura_turma(celulas):
+    """Impressão digital das aulas de uma turma (muda quando alguma aula muda)"""
+    itens = [
+        (str(dia), str(periodo), str(aula.disciplina or ''), str(aula.professor or ''))
+        for (dia, periodo), aulas in celulas.items()
+        for aula in aulas
+    ]
+    return hash(tuple(sorted(itens)))
+
+
+def renderizar_tabela_turma(celulas, horario_segmento):
+    """Gera o HTML da tabela de uma turma a partir das células já agrupadas"""
+    linhas = ['<table class="tabela-calendario"><thead><tr><th>Horário</th>']
+    linhas.extend(f'<th>{dia}</th>' for dia in DIAS_DISPLAY)
+    linhas.append('</tr></thead><tbody>')
+
+    for periodo in horario_segmento.periodos:
+        linhas.append(
+            f'<tr><td class="celula-horario">{periodo}º<br>'
+            f'<small>{horario_segmento.texto[periodo]}</small></td>'
+        )
+        for dia in DIAS_CALENDARIO:
+            aulas_celula = celulas.get((dia, periodo))
+            if not aulas_celula:
+                linhas.append('<td class="celula-vazia">Livre</td>')
+                continue
+            conteudo = ''.join(
+                f'<div class="disciplina-nome">{escape(str(aula.disciplina or ""))}</div>'
+                f'<div class="professor-nome">{escape(str(aula.professor or ""))}</div>'
+                for aula in aulas_celula
+            )
+            linhas.append(f'<td class="celula-aula">{conteudo}</td>')
+        linhas.append('</tr>')
+
+    linhas.append('</tbody></table>')
+    return ''.join(linhas)
+
+
+class CacheGradeTurma:
+    """Cache do HTML de cada turma, invalidado pela assinatura das suas aulas"""
+
+    def __init__(self):
+        self.entradas = {}
+
+    def obter(self, turma, celulas, horario_segmento):
+        """Retorna o HTML da turma, renderizando só se as aulas mudaram"""
+        assinatura = (assinatura_turma(celulas), tuple(horario_segmento.texto.items()))
+        entrada = self.entradas.get(turma)
+        if entrada is not None and entrada[0] == assinatura:
+            return entrada[1]
+        html = renderizar_tabela_turma(celulas, horario_segmento)
+        self.entradas[turma] = (assinatura, html)
+        return html
+
+    def limpar(self, turmas_existentes=None):
+        """Remove entradas de turmas que não existem mais"""
+        if turmas_existentes is None:
+            self.entradas.clear()
+            return
+        for turma in list(self.entradas):
+            if turma not in turmas_existentes:
+                del self.entradas[turma]
+
+
+def renderizar_grade(aulas, calendario=None, cache=None, turma_nome=None):
+    """Retorna [(turma, html)] ordenado por turma, usando o cache quando possível"""
+    calendario = calendario or CALENDARIO_PADRAO
+    cache = cache if cache is not None else CacheGradeTurma()
+
+    pivo = pivotar_grade(aulas)
+    if turma_nome:
+        pivo = {turma_nome: pivo[turma_nome]} if turma_nome in pivo else {}
+    else:
+        cache.limpar(pivo)
+
+    return [
+        (turma, cache.obter(turma, pivo[turma], calendario.horario_turma(turma)))
+        for turma in sorted(pivo)
+    ]
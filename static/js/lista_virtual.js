@@ -0,0 +1,133 @@
+// Lista virtual de turmas do relatório
+// A lista é dividida em páginas (blocos .pagina-turmas). Só as páginas perto
+// da área visível têm cards no DOM; as demais viram espaços vazios com a
+// altura medida (ou estimada), e o HTML de cada página vem do servidor em
+// /relatorio/<id>/turmas?pagina=N e fica em cache.
+(function() {
+    const lista = document.getElementById('lista_turmas');
+    if (!lista) {
+        return;
+    }
+
+    const total = parseInt(lista.dataset.total) || 0;
+    const porPagina = parseInt(lista.dataset.porPagina) || 50;
+    const url = lista.dataset.url;
+    const totalPaginas = Math.ceil(total / porPagina);
+    const MARGEM_PX = 1500; // carrega um pouco antes de entrar na tela
+
+    const AVISO_FALHA = `
+        <div class="col-12">
+            <div class="alert alert-warning d-flex justify-content-between align-items-center">
+                <span><i class="fas fa-exclamation-triangle"></i> Não foi possível carregar estas turmas.</span>
+                <button type="button" class="btn btn-sm btn-outline-secondary tentar-pagina">Tentar novamente</button>
+            </div>
+        </div>`;
+
+    const cache = new Map();      // pagina -> HTML
+    const carregando = new Map(); // pagina -> Promise
+    const primeira = lista.querySelector('.pagina-turmas');
+    cache.set(0, primeira.innerHTML);
+
+    // Altura estimada de uma página a partir da primeira (já renderizada)
+    const alturaPorCard = primeira.offsetHeight / Math.min(porPagina, total);
+
+    function alturaEstimada(pagina) {
+        const cards = Math.min(porPagina, total - pagina * porPagina);
+        return Math.ceil(cards * alturaPorCard);
+    }
+
+    function carregar(pagina) {
+        if (cache.has(pagina)) {
+            return Promise.resolve(cache.get(pagina));
+        }
+        if (!carregando.has(pagina)) {
+            // Em caso de erro nada vai para o cache: a página é pedida de novo
+            // na próxima vez que se aproximar da tela
+            carregando.set(pagina, fetch(`${url}?pagina=${pagina}`)
+                .then(resposta => {
+                    if (!resposta.ok) {
+                        throw new Error(`HTTP ${resposta.status}`);
+                    }
+                    return resposta.text();
+                })
+                .then(html => {
+                    cache.set(pagina, html);
+                    return html;
+                })
+                .finally(() => carregando.delete(pagina)));
+        }
+        return carregando.get(pagina);
+    }
+
+    function mostrar(bloco) {
+        const pagina = parseInt(bloco.dataset.pagina);
+        if (bloco.dataset.visivel === '1') {
+            return;
+        }
+        bloco.dataset.visivel = '1';
+        carregar(pagina).then(html => {
+            if (bloco.dataset.visivel !== '1') {
+                return; // saiu da tela antes de chegar
+            }
+            requestAnimationFrame(() => {
+                bloco.innerHTML = html;
+                bloco.style.minHeight = '';
+            });
+        }).catch(() => {
+            if (bloco.dataset.visivel !== '1') {
+                return;
+            }
+            // Volta a ficar "fora da tela" para a próxima entrada tentar de novo
+            bloco.dataset.visivel = '0';
+            requestAnimationFrame(() => {
+                bloco.innerHTML = AVISO_FALHA;
+            });
+        });
+    }
+
+    lista.addEventListener('click', evento => {
+        const botao = evento.target.closest('.tentar-pagina');
+        if (botao) {
+            mostrar(botao.closest('.pagina-turmas'));
+        }
+    });
+
+    function esconder(bloco) {
+        if (bloco.dataset.visivel !== '1') {
+            return;
+        }
+        bloco.dataset.visivel = '0';
+        // Mantém o espaço ocupado para a barra de rolagem não pular
+        bloco.style.minHeight = `${bloco.offsetHeight}px`;
+        requestAnimationFrame(() => {
+            if (bloco.dataset.visivel === '0') {
+                bloco.innerHTML = '';
+            }
+        });
+    }
+
+    const observador = new IntersectionObserver(entradas => {
+        entradas.forEach(entrada => {
+            if (entrada.isIntersecting) {
+                mostrar(entrada.target);
+            } else {
+                esconder(entrada.target);
+            }
+        });
+    }, {rootMargin: `${MARGEM_PX}px 0px`});
+
+    primeira.dataset.visivel = '1';
+    observador.observe(primeira);
+
+    const fragmento = document.createDocumentFragment();
+    for (let pagina = 1; pagina < totalPaginas; pagina++) {
+        const bloco = document.createElement('div');
+        bloco.className = 'row pagina-turmas';
+        bloco.dataset.pagina = pagina;
+        bloco.dataset.visivel = '0';
+        bloco.style.minHeight = `${alturaEstimada(pagina)}px`;
+        fragmento.appendChild(bloco);
+        observador.observe(bloco);
+    }
+    lista.appendChild(fragmento);
+})();
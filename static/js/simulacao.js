@@ -0,0 +1,803 @@
+// ============================================
+// ESTADO DO RESUMO
+// ============================================
+// Cada card guarda o último resultado de calcularTurma; os totais são
+// mantidos por diferença. Edições só marcam o card como pendente e as
+// escritas no DOM são feitas juntas em um requestAnimationFrame, após um
+// pequeno debounce.
+const ATRASO_RESUMO_MS = 60;
+
+const estadoResumo = {
+    turmas: new Map(),        // card -> {alunos, capacidade, custoTotal, receitaMensal, ocupacao}
+    custos: new Map(),        // campo de custo fixo -> valor
+    totais: {alunos: 0, capacidade: 0, receita: 0, custo: 0, custosFixos: 0,
+             alunosIndividuais: 0, receitaIndividual: 0},
+    pendentes: new Set(),     // cards a recalcular
+    custosPendentes: new Set(),
+    temporizador: null,
+    quadro: null,
+    refs: null,               // elementos do resumo já montado
+    exibido: {}               // último texto/estilo escrito em cada elemento
+};
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Um único listener (delegação) em vez de um por campo
+    document.addEventListener('input', function(evento) {
+        const alvo = evento.target;
+        const card = alvo.closest('.turma-card');
+        if (card) {
+            if (alvo.classList.contains('nome-turma-input')) {
+                card.querySelector('.nome-turma').textContent = alvo.value;
+            }
+            agendarTurma(card);
+        } else if (alvo.classList.contains('campo-custo')) {
+            estadoResumo.custosPendentes.add(alvo);
+            agendarResumo();
+        }
+    });
+
+    const simulacaoEdicao = document.getElementById('turmas_container').dataset.simulacaoId;
+    if (simulacaoEdicao) {
+        // Edição: turmas vêm da API em páginas
+        carregarTurmasEdicao(simulacaoEdicao);
+    } else {
+        // Adiciona uma turma inicial
+        adicionarTurma();
+    }
+
+    atualizarResumo();
+});
+
+function adicionarTurma() {
+    const bloco = blocoParaNovaTurma();
+    bloco.appendChild(document.getElementById('template-turma').content.cloneNode(true));
+    const card = bloco.lastElementChild.querySelector('.turma-card');
+    agendarTurma(card);
+    return card;
+}
+
+function removerTurma(elemento) {
+    const card = elemento.closest('.col-md-6').querySelector('.turma-card');
+    aplicarDiferencaTurma(estadoResumo.turmas.get(card), null);
+    estadoResumo.turmas.delete(card);
+    estadoResumo.pendentes.delete(card);
+    elemento.closest('.col-md-6').remove();
+    agendarResumo();
+}
+
+function adicionarAluno() {
+    const nome = document.getElementById('nome_aluno').value.trim();
+    const mensalidade = parseFloat(document.getElementById('mensalidade_aluno').value) || 0;
+
+    if (!nome) {
+        alert('Digite o nome do aluno');
+        return;
+    }
+
+    const container = document.getElementById('alunos_lista');
+    const template = document.getElementById('template-aluno').content.cloneNode(true);
+
+    template.querySelector('.nome-aluno').textContent = nome;
+    template.querySelector('.valor-mensalidade').textContent = mensalidade.toFixed(2);
+
+    container.appendChild(template);
+
+    // Limpa os campos
+    document.getElementById('nome_aluno').value = '';
+    document.getElementById('mensalidade_aluno').value = '';
+
+    estadoResumo.totais.alunosIndividuais += 1;
+    estadoResumo.totais.receitaIndividual += mensalidade;
+    agendarResumo();
+}
+
+function removerAluno(elemento) {
+    const item = elemento.closest('.aluno-item');
+    estadoResumo.totais.alunosIndividuais -= 1;
+    estadoResumo.totais.receitaIndividual -= parseFloat(item.querySelector('.valor-mensalidade').textContent) || 0;
+    item.remove();
+    agendarResumo();
+}
+
+function lerTurma(turmaCard) {
+    const alunos = parseInt(turmaCard.querySelector('.alunos-matriculados').value) || 0;
+    const capacidade = parseInt(turmaCard.querySelector('.capacidade-turma').value) || 0;
+    const horasSemanais = parseFloat(turmaCard.querySelector('.horas-semanais').value) || 0;
+    const diasSemana = parseInt(turmaCard.querySelector('.dias-semana').value) || 0;
+    const custoHora = parseFloat(turmaCard.querySelector('.custo-hora-professor').value) || 0;
+    const mensalidade = parseFloat(turmaCard.querySelector('.mensalidade-aluno').value) || 0;
+    const custoMaterial = parseFloat(turmaCard.querySelector('.custo-material').value) || 0;
+
+    // Cálculos
+    const horasMensais = horasSemanais * diasSemana * 4; // 4 semanas no mês
+    const custoProfessorMensal = custoHora * horasMensais;
+    const custoTotal = custoProfessorMensal + custoMaterial;
+    const receitaMensal = alunos * mensalidade;
+    const ocupacao = capacidade > 0 ? (alunos / capacidade) * 100 : 0;
+
+    return {
+        alunos: alunos,
+        capacidade: capacidade,
+        custoTotal: custoTotal,
+        receitaMensal: receitaMensal,
+        ocupacao: ocupacao
+    };
+}
+
+function exibirTurma(turmaCard, dados) {
+    // Atualiza display
+    turmaCard.querySelector('.custo-mensal-turma').textContent = 
+        `R$ ${dados.custoTotal.toLocaleString('pt-BR', {minimumFractionDigits: 2})}`;
+    turmaCard.querySelector('.receita-mensal-turma').textContent = 
+        `R$ ${dados.receitaMensal.toLocaleString('pt-BR', {minimumFractionDigits: 2})}`;
+
+    // Atualiza cor da borda baseada na ocupação
+    if (dados.ocupacao >= 80) {
+        turmaCard.style.borderLeftColor = '#28a745'; // Verde - boa ocupação
+    } else if (dados.ocupacao >= 50) {
+        turmaCard.style.borderLeftColor = '#ffc107'; // Amarelo - média ocupação
+    } else {
+        turmaCard.style.borderLeftColor = '#dc3545'; // Vermelho - baixa ocupação
+    }
+}
+
+function calcularTurma(turmaCard) {
+    const dados = lerTurma(turmaCard);
+    exibirTurma(turmaCard, dados);
+    return dados;
+}
+
+function atualizarCustoProfessor(select) {
+    const custoHora = select.options[select.selectedIndex].getAttribute('data-custo');
+    if (custoHora) {
+        const turmaCard = select.closest('.turma-card');
+        turmaCard.querySelector('.custo-hora-professor').value = custoHora;
+        agendarTurma(turmaCard);
+    }
+}
+
+// ============================================
+// LISTA VIRTUAL DOS CARDS DE TURMA
+// ============================================
+// Os cards ficam em blocos (.pagina-turmas) de TURMAS_POR_BLOCO. Um bloco
+// longe da área visível tem os cards tirados do DOM e guardados em um
+// elemento solto (com os valores digitados), mantendo a altura medida; ao
+// voltar para perto da tela os mesmos cards são devolvidos. O resumo e o
+// envio do formulário leem todos os cards por cardsTurmas().
+const TURMAS_POR_BLOCO = 50;
+const MARGEM_BLOCOS_PX = 1500;
+const blocosGuardados = new Map(); // bloco fora da tela -> .pagina-guardada com os cards
+
+const observadorBlocos = new IntersectionObserver(entradas => {
+    entradas.forEach(entrada => {
+        if (entrada.isIntersecting) {
+            restaurarBloco(entrada.target);
+        } else {
+            guardarBloco(entrada.target);
+        }
+    });
+}, {rootMargin: `${MARGEM_BLOCOS_PX}px 0px`});
+
+function guardarBloco(bloco) {
+    if (blocosGuardados.has(bloco) || !bloco.firstElementChild || !bloco.isConnected) {
+        return;
+    }
+    bloco.style.minHeight = `${bloco.offsetHeight}px`;
+    const guardado = document.createElement('div');
+    guardado.className = 'pagina-guardada';
+    guardado.append(...bloco.children);
+    blocosGuardados.set(bloco, guardado);
+}
+
+function restaurarBloco(bloco) {
+    const guardado = blocosGuardados.get(bloco);
+    if (!guardado) {
+        return;
+    }
+    blocosGuardados.delete(bloco);
+    bloco.append(...guardado.children);
+    bloco.style.minHeight = '';
+}
+
+function blocoParaNovaTurma() {
+    // Último bloco (devolvido ao DOM), ou um novo se ele já estiver cheio
+    const container = document.getElementById('turmas_container');
+    let bloco = container.lastElementChild;
+    if (bloco) {
+        restaurarBloco(bloco);
+    }
+    if (!bloco || bloco.children.length >= TURMAS_POR_BLOCO) {
+        bloco = document.createElement('div');
+        bloco.className = 'row pagina-turmas';
+        container.appendChild(bloco);
+        observadorBlocos.observe(bloco);
+    }
+    return bloco;
+}
+
+function cardsTurmas() {
+    // Todos os cards na ordem da lista, inclusive os guardados fora do DOM
+    const cards = [];
+    document.querySelectorAll('#turmas_container > .pagina-turmas').forEach(bloco => {
+        (blocosGuardados.get(bloco) || bloco).querySelectorAll('.turma-card').forEach(card => cards.push(card));
+    });
+    return cards;
+}
+
+function cardAtivo(card) {
+    return card.isConnected || card.closest('.pagina-guardada') !== null;
+}
+
+function limparTurmas() {
+    observadorBlocos.disconnect();
+    blocosGuardados.clear();
+    document.getElementById('turmas_container').innerHTML = '';
+}
+
+// ============================================
+// CARGA DAS TURMAS (MODO EDIÇÃO)
+// ============================================
+// As turmas são buscadas em páginas de /api/simulacao/<id>/turmas e cada
+// página é inserida nos blocos da lista virtual em um único quadro, para a
+// página responder enquanto simulações grandes carregam.
+const TURMAS_POR_REQUISICAO = 200;
+const CAMPOS_TURMA_EDICAO = 'nome,disciplina,nivel,capacidade,alunos_matriculados,horas_semanais,' +
+                            'dias_semana,custo_hora_professor,mensalidade_aluno,custo_material_mensal';
+
+function preencherTurma(turmaCard, turma) {
+    turmaCard.querySelector('.nome-turma-input').value = turma.nome || '';
+    turmaCard.querySelector('.nome-turma').textContent = turma.nome || 'Nova Turma';
+    turmaCard.querySelector('.select-disciplina').value = turma.disciplina || '';
+    turmaCard.querySelector('.select-nivel').value = turma.nivel || '';
+    turmaCard.querySelector('.capacidade-turma').value = turma.capacidade;
+    turmaCard.querySelector('.alunos-matriculados').value = turma.alunos_matriculados;
+    turmaCard.querySelector('.horas-semanais').value = turma.horas_semanais;
+    turmaCard.querySelector('.dias-semana').value = turma.dias_semana;
+    turmaCard.querySelector('.custo-hora-professor').value = turma.custo_hora_professor;
+    turmaCard.querySelector('.mensalidade-aluno').value = turma.mensalidade_aluno;
+    turmaCard.querySelector('.custo-material').value = turma.custo_material_mensal;
+}
+
+async function carregarTurmasEdicao(simulacaoId) {
+    const modelo = document.getElementById('template-turma').content;
+    let offset = 0;
+    let total = 1;
+
+    while (offset < total) {
+        const resposta = await fetch(`/api/simulacao/${simulacaoId}/turmas?offset=${offset}` +
+                                     `&limite=${TURMAS_POR_REQUISICAO}&campos=${CAMPOS_TURMA_EDICAO}`);
+        if (!resposta.ok) {
+            break;
+        }
+        const pagina = await resposta.json();
+        total = pagina.total;
+        if (!pagina.turmas.length) {
+            break;
+        }
+        offset += pagina.turmas.length;
+
+        await new Promise(resolve => requestAnimationFrame(() => {
+            pagina.turmas.forEach(turma => {
+                const clone = modelo.cloneNode(true);
+                const card = clone.querySelector('.turma-card');
+                preencherTurma(card, turma);
+                blocoParaNovaTurma().appendChild(clone);
+                estadoResumo.pendentes.add(card);
+            });
+            agendarResumo();
+            resolve();
+        }));
+    }
+
+    if (!cardsTurmas().length) {
+        adicionarTurma();
+    }
+}
+
+// ============================================
+// RECÁLCULO INCREMENTAL
+// ============================================
+
+function agendarTurma(turmaCard) {
+    estadoResumo.pendentes.add(turmaCard);
+    agendarResumo();
+}
+
+function agendarResumo() {
+    clearTimeout(estadoResumo.temporizador);
+    estadoResumo.temporizador = setTimeout(() => {
+        if (estadoResumo.quadro === null) {
+            estadoResumo.quadro = requestAnimationFrame(aplicarPendentes);
+        }
+    }, ATRASO_RESUMO_MS);
+}
+
+function aplicarDiferencaTurma(anterior, novo) {
+    const totais = estadoResumo.totais;
+    if (anterior) {
+        totais.alunos -= anterior.alunos;
+        totais.capacidade -= anterior.capacidade;
+        totais.receita -= anterior.receitaMensal;
+        totais.custo -= anterior.custoTotal;
+    }
+    if (novo) {
+        totais.alunos += novo.alunos;
+        totais.capacidade += novo.capacidade;
+        totais.receita += novo.receitaMensal;
+        totais.custo += novo.custoTotal;
+    }
+}
+
+function aplicarPendentes() {
+    performance.mark('resumo-inicio');
+    estadoResumo.quadro = null;
+
+    estadoResumo.pendentes.forEach(card => {
+        if (!cardAtivo(card)) {
+            return;
+        }
+        const novo = calcularTurma(card);
+        aplicarDiferencaTurma(estadoResumo.turmas.get(card), novo);
+        estadoResumo.turmas.set(card, novo);
+    });
+    estadoResumo.pendentes.clear();
+
+    estadoResumo.custosPendentes.forEach(campo => {
+        const valor = parseFloat(campo.value) || 0;
+        estadoResumo.totais.custosFixos += valor - (estadoResumo.custos.get(campo) || 0);
+        estadoResumo.custos.set(campo, valor);
+    });
+    estadoResumo.custosPendentes.clear();
+
+    renderizarResumo();
+    performance.mark('resumo-fim');
+    performance.measure('resumo', 'resumo-inicio', 'resumo-fim');
+}
+
+function atualizarResumo() {
+    // Recontagem completa a partir do DOM (usada após trocas em massa)
+    clearTimeout(estadoResumo.temporizador);
+    if (estadoResumo.quadro !== null) {
+        cancelAnimationFrame(estadoResumo.quadro);
+        estadoResumo.quadro = null;
+    }
+    estadoResumo.turmas.clear();
+    estadoResumo.custos.clear();
+    estadoResumo.pendentes.clear();
+    estadoResumo.custosPendentes.clear();
+    Object.keys(estadoResumo.totais).forEach(chave => estadoResumo.totais[chave] = 0);
+
+    cardsTurmas().forEach(card => estadoResumo.pendentes.add(card));
+    document.querySelectorAll('.campo-custo').forEach(campo => estadoResumo.custosPendentes.add(campo));
+    document.querySelectorAll('.aluno-item').forEach(item => {
+        estadoResumo.totais.alunosIndividuais += 1;
+        estadoResumo.totais.receitaIndividual += parseFloat(item.querySelector('.valor-mensalidade').textContent) || 0;
+    });
+
+    aplicarPendentes();
+}
+
+// ============================================
+// RESUMO FINANCEIRO
+// ============================================
+
+function montarResumo() {
+    const resumo = document.getElementById('resumo_financeiro');
+    resumo.innerHTML = `
+        <div class="d-flex flex-column gap-3">
+            <div class="indicador-horizontal">
+                <div class="d-flex justify-content-between align-items-center">
+                    <div>
+                        <div class="label-horizontal">ALUNOS</div>
+                        <div class="small text-muted mt-1">Ocupação: <span data-resumo="ocupacao"></span>%</div>
+                    </div>
+                    <div class="valor-horizontal" style="color: #4361ee;" data-resumo="alunos"></div>
+                </div>
+            </div>
+
+            <div class="indicador-horizontal">
+                <div class="d-flex justify-content-between align-items-center">
+                    <div>
+                        <div class="label-horizontal">RECEITA/MÊS</div>
+                        <div class="small text-muted mt-1">Ticket: R$ <span data-resumo="ticket"></span></div>
+                    </div>
+                    <div class="valor-horizontal" style="color: #28a745;" data-resumo="receita"></div>
+                </div>
+            </div>
+
+            <div class="indicador-horizontal">
+                <div class="d-flex justify-content-between align-items-center">
+                    <div>
+                        <div class="label-horizontal">CUSTO/MÊS</div>
+                        <div class="small text-muted mt-1">Fixos: <span data-resumo="fixos"></span></div>
+                    </div>
+                    <div class="valor-horizontal" style="color: #dc3545;" data-resumo="custo"></div>
+                </div>
+            </div>
+
+            <div class="indicador-horizontal">
+                <div class="d-flex justify-content-between align-items-center">
+                    <div>
+                        <div class="label-horizontal">LUCRO/MÊS</div>
+                        <div class="small text-muted mt-1">Margem: <span data-resumo="margem"></span>%</div>
+                    </div>
+                    <div class="valor-horizontal" data-resumo="lucro"></div>
+                </div>
+            </div>
+        </div>
+
+        <div class="alert alert-custom mt-3" data-resumo="alerta">
+            <i data-resumo="icone"></i>
+            <strong data-resumo="status"></strong> - 
+            <span data-resumo="mensagem"></span>
+        </div>
+    `;
+
+    estadoResumo.refs = {};
+    resumo.querySelectorAll('[data-resumo]').forEach(el => {
+        estadoResumo.refs[el.getAttribute('data-resumo')] = el;
+    });
+    estadoResumo.exibido = {};
+}
+
+function escreverResumo(chave, propriedade, valor) {
+    // Só toca no DOM quando o valor exibido muda
+    const id = chave + ':' + propriedade;
+    if (estadoResumo.exibido[id] === valor) {
+        return;
+    }
+    estadoResumo.exibido[id] = valor;
+    const el = estadoResumo.refs[chave];
+    if (propriedade === 'texto') {
+        el.textContent = valor;
+    } else if (propriedade === 'classe') {
+        el.className = valor;
+    } else {
+        el.style.color = valor;
+    }
+}
+
+function formatarMoeda(valor) {
+    return `R$ ${valor.toLocaleString('pt-BR', {minimumFractionDigits: 2, maximumFractionDigits: 2})}`;
+}
+
+function renderizarResumo() {
+    if (!estadoResumo.refs) {
+        montarResumo();
+    }
+    const t = estadoResumo.totais;
+
+    // Calcular ocupação total
+    const ocupacaoTotal = t.capacidade > 0 ? (t.alunos / t.capacidade) * 100 : 0;
+
+    // Totais gerais
+    const totalAlunosGeral = t.alunos + t.alunosIndividuais;
+    const receitaTotal = t.receita + t.receitaIndividual;
+    const custoTotal = t.custo + t.custosFixos;
+    const lucroMensal = receitaTotal - custoTotal;
+    const margemLucro = receitaTotal > 0 ? (lucroMensal / receitaTotal) * 100 : 0;
+
+    // Ticket médio
+    const ticketMedio = totalAlunosGeral > 0 ? receitaTotal / totalAlunosGeral : 0;
+    const viavel = lucroMensal >= 0;
+
+    escreverResumo('ocupacao', 'texto', ocupacaoTotal.toFixed(1));
+    escreverResumo('alunos', 'texto', String(totalAlunosGeral));
+    escreverResumo('ticket', 'texto', ticketMedio.toFixed(2));
+    escreverResumo('receita', 'texto', formatarMoeda(receitaTotal));
+    escreverResumo('fixos', 'texto', formatarMoeda(t.custosFixos));
+    escreverResumo('custo', 'texto', formatarMoeda(custoTotal));
+    escreverResumo('margem', 'texto', margemLucro.toFixed(1));
+    escreverResumo('lucro', 'texto', formatarMoeda(lucroMensal));
+    escreverResumo('lucro', 'cor', viavel ? '#17a2b8' : '#dc3545');
+    escreverResumo('alerta', 'classe', `alert ${viavel ? 'alert-success' : 'alert-danger'} alert-custom mt-3`);
+    escreverResumo('icone', 'classe', `fas ${viavel ? 'fa-check-circle' : 'fa-exclamation-triangle'}`);
+    escreverResumo('status', 'texto', viavel ? 'VIÁVEL' : 'INVIÁVEL');
+    escreverResumo('mensagem', 'texto', viavel ? 'O projeto é financeiramente viável.' : 'O projeto precisa de ajustes para ser viável.');
+}
+
+// ============================================
+// TAREFAS EM SEGUNDO PLANO
+// ============================================
+// Acima deste número de turmas o cálculo vira uma tarefa (/api/tarefas) e o
+// progresso chega por Server-Sent Events, sem prender a requisição.
+const LIMITE_TURMAS_SINCRONO = 300;
+
+async function executarTarefa(tipo, parametros, aoProgredir) {
+    const response = await fetch('/api/tarefas', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({tipo: tipo, parametros: parametros})
+    });
+    if (!response.ok) {
+        throw new Error(await response.text());
+    }
+    const tarefa = await response.json();
+
+    return new Promise((resolve, reject) => {
+        const eventos = new EventSource(tarefa.eventos_url);
+        eventos.addEventListener('progresso', evento => aoProgredir(JSON.parse(evento.data)));
+        eventos.addEventListener('fim', evento => {
+            eventos.close();
+            const estado = JSON.parse(evento.data);
+            if (estado.status === 'concluida') {
+                resolve(estado.resultado);
+            } else {
+                reject(new Error(estado.erro || 'Falha na tarefa'));
+            }
+        });
+        eventos.addEventListener('erro', evento => {
+            eventos.close();
+            reject(new Error(JSON.parse(evento.data).error));
+        });
+    });
+}
+
+// ============================================
+// SALAS E GRADE PARA A ALOCAÇÃO
+// ============================================
+// O servidor aloca as salas às aulas (capacidade e choques de horário) e usa
+// essa ocupação no lugar da estimativa alunos/capacidade. Cada turma tem
+// aula em dias_semana dias, com horas_semanais períodos seguidos por dia; as
+// turmas começam em dias diferentes para espalhar a grade pela semana.
+const DIAS_GRADE = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta'];
+
+function montarSalas(quantidade, capacidade) {
+    const salas = [];
+    for (let i = 1; i <= quantidade; i++) {
+        salas.push({nome: `Sala ${i}`, capacidade: capacidade});
+    }
+    return salas;
+}
+
+function montarGrade(turmas) {
+    const aulas = [];
+    turmas.forEach((turma, indice) => {
+        const dias = Math.min(turma.dias_semana, DIAS_GRADE.length);
+        const periodos = Math.ceil(turma.horas_semanais);
+        for (let d = 0; d < dias; d++) {
+            const dia = DIAS_GRADE[(indice + d) % DIAS_GRADE.length];
+            for (let periodo = 1; periodo <= periodos; periodo++) {
+                aulas.push({turma: turma.nome, disciplina: turma.disciplina, dia: dia, horario: periodo});
+            }
+        }
+    });
+    return aulas;
+}
+
+async function calcularViabilidade(simulacaoId = null) {
+    const btn = document.querySelector('button[onclick*="calcularViabilidade"]');
+    const originalText = btn.innerHTML;
+    btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processando...';
+    btn.disabled = true;
+
+    try {
+        // Coletar dados do formulário
+        const dados = {
+            nome: document.getElementById('nome_analise').value,
+            salas_disponiveis: parseInt(document.getElementById('salas_disponiveis').value) || 0,
+            capacidade_sala: parseInt(document.getElementById('capacidade_sala').value) || 0
+        };
+
+        // Coletar turmas
+        dados.turmas = [];
+        cardsTurmas().forEach(card => {
+            dados.turmas.push({
+                nome: card.querySelector('.nome-turma-input').value,
+                disciplina: card.querySelector('.select-disciplina').value,
+                nivel: card.querySelector('.select-nivel').value,
+                capacidade: parseInt(card.querySelector('.capacidade-turma').value) || 0,
+                alunos_matriculados: parseInt(card.querySelector('.alunos-matriculados').value) || 0,
+                horas_semanais: parseFloat(card.querySelector('.horas-semanais').value) || 0,
+                dias_semana: parseInt(card.querySelector('.dias-semana').value) || 0,
+                custo_hora_professor: parseFloat(card.querySelector('.custo-hora-professor').value) || 0,
+                mensalidade_aluno: parseFloat(card.querySelector('.mensalidade-aluno').value) || 0,
+                custo_material_mensal: parseFloat(card.querySelector('.custo-material').value) || 0
+            });
+        });
+
+        dados.salas = montarSalas(dados.salas_disponiveis, dados.capacidade_sala);
+        dados.aulas = montarGrade(dados.turmas);
+
+        // Coletar custos fixos
+        dados.custos = {};
+        document.querySelectorAll('.campo-custo').forEach(campo => {
+            const categoria = campo.getAttribute('data-categoria');
+            const valor = parseFloat(campo.value) || 0;
+
+            if (!dados.custos[categoria]) {
+                dados.custos[categoria] = {};
+            }
+            // Extrai o nome do item do ID
+            const item = campo.id.split('_').slice(2).join(' ').replace(/_/g, ' ');
+            dados.custos[categoria][item] = valor;
+        });
+
+        // Coletar alunos individuais
+        dados.alunos = [];
+        document.querySelectorAll('.aluno-item').forEach(item => {
+            dados.alunos.push({
+                nome: item.querySelector('.nome-aluno').textContent,
+                mensalidade: parseFloat(item.querySelector('.valor-mensalidade').textContent) || 0
+            });
+        });
+
+        // Versão carregada na edição: o servidor recusa (409) se outra pessoa salvou antes
+        const versao = document.getElementById('turmas_container').dataset.versao;
+
+        let resultados;
+        if (dados.turmas.length > LIMITE_TURMAS_SINCRONO) {
+            // Simulação grande: roda em segundo plano e acompanha o progresso por SSE
+            const parametros = {dados: dados, simulacao_id: simulacaoId, versao_esperada: versao || null};
+            resultados = await executarTarefa('calcular_simulacao', parametros, estado => {
+                btn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${estado.mensagem || 'Processando'}... ` +
+                                `${Math.round((estado.progresso || 0) * 100)}%`;
+            });
+        } else {
+            // Enviar para API
+            const url = simulacaoId ? `/api/atualizar_simulacao/${simulacaoId}` : '/api/nova_simulacao';
+            const method = simulacaoId ? 'PUT' : 'POST';
+            const headers = { 'Content-Type': 'application/json' };
+            if (simulacaoId && versao) {
+                headers['If-Match'] = `"${versao}"`;
+            }
+
+            const response = await fetch(url, {
+                method: method,
+                headers: headers,
+                body: JSON.stringify(dados)
+            });
+
+            if (response.status === 409) {
+                throw new Error('Esta análise foi alterada em outra janela ou por outra pessoa. ' +
+                                'Recarregue a página para editar a versão mais recente.');
+            }
+            if (!response.ok) {
+                const error = await response.text();
+                throw new Error(error);
+            }
+
+            resultados = await response.json();
+        }
+
+        // Mostrar sucesso e redirecionar
+        alert('✅ Análise salva com sucesso! Redirecionando para relatório...');
+        window.location.href = `/relatorio/${resultados.id || simulacaoId}`;
+
+    } catch (error) {
+        alert('❌ Erro: ' + error.message);
+    } finally {
+        btn.innerHTML = originalText;
+        btn.disabled = false;
+    }
+}
+
+function carregarExemplo() {
+    if (confirm('Carregar dados de exemplo?')) {
+        // Limpar turmas existentes
+        limparTurmas();
+
+        // Dados de exemplo
+        const exemplos = [
+            {
+                nome: 'Matemática 1º EM',
+                disciplina: 'matematica',
+                nivel: 'medio',
+                capacidade: 30,
+                alunos: 25,
+                horas: 5,
+                dias: 2,
+                custo_hora: 65,
+                mensalidade: 280,
+                material: 150
+            },
+            {
+                nome: 'Português 9º Ano',
+                disciplina: 'portugues',
+                nivel: 'fundamental_ii',
+                capacidade: 30,
+                alunos: 22,
+                horas: 4,
+                dias: 2,
+                custo_hora: 60,
+                mensalidade: 250,
+                material: 120
+            },
+            {
+                nome: 'Inglês Intermediário',
+                disciplina: 'ingles',
+                nivel: 'medio',
+                capacidade: 25,
+                alunos: 20,
+                horas: 3,
+                dias: 2,
+                custo_hora: 75,
+                mensalidade: 320,
+                material: 200
+            }
+        ];
+
+        // Adicionar turmas de exemplo
+        exemplos.forEach((ex, index) => {
+            setTimeout(() => {
+                const ultimaTurma = adicionarTurma();
+
+                ultimaTurma.querySelector('.nome-turma-input').value = ex.nome;
+                ultimaTurma.querySelector('.nome-turma').textContent = ex.nome;
+                ultimaTurma.querySelector('.select-disciplina').value = ex.disciplina;
+                ultimaTurma.querySelector('.select-nivel').value = ex.nivel;
+                ultimaTurma.querySelector('.capacidade-turma').value = ex.capacidade;
+                ultimaTurma.querySelector('.alunos-matriculados').value = ex.alunos;
+                ultimaTurma.querySelector('.horas-semanais').value = ex.horas;
+                ultimaTurma.querySelector('.dias-semana').value = ex.dias;
+                ultimaTurma.querySelector('.custo-hora-professor').value = ex.custo_hora;
+                ultimaTurma.querySelector('.mensalidade-aluno').value = ex.mensalidade;
+                ultimaTurma.querySelector('.custo-material').value = ex.material;
+
+                calcularTurma(ultimaTurma);
+            }, index * 100);
+        });
+
+        // Preencher alguns custos fixos
+        setTimeout(() => {
+            document.getElementById('nome_analise').value = 'Escola Exemplo';
+            document.getElementById('salas_disponiveis').value = 8;
+
+            // Selecionar alguns checkboxes
+            ['matematica', 'portugues', 'ingles', 'ciencias'].forEach(id => {
+                const cb = document.getElementById('disc_' + id);
+                if (cb) cb.checked = true;
+            });
+
+            // Selecionar nível
+            document.getElementById('nivel_medio').checked = true;
+
+            // Preencher custos fixos de exemplo
+            const custosExemplo = {
+                'custo_infraestrutura_aluguel': 3500,
+                'custo_infraestrutura_energia': 800,
+                'custo_manutencao_material_de_limpeza': 300,
+                'custo_administrativo_secretária': 2200
+            };
+
+            Object.entries(custosExemplo).forEach(([id, valor]) => {
+                const campo = document.getElementById(id);
+                if (campo) campo.value = valor;
+            });
+
+            atualizarResumo();
+        }, 400);
+    }
+}
+
+function limparFormulario() {
+    if (confirm('Tem certeza que deseja limpar todos os dados?')) {
+        // Limpa todas as turmas
+        limparTurmas();
+
+        // Limpa alunos
+        document.getElementById('alunos_lista').innerHTML = '';
+
+        // Limpa campos básicos
+        document.getElementById('nome_analise').value = 'Minha Escola';
+        document.getElementById('salas_disponiveis').value = 5;
+        document.getElementById('capacidade_sala').value = 30;
+
+        // Desmarca checkboxes e radios
+        document.querySelectorAll('.disciplina-check').forEach(cb => cb.checked = false);
+        document.querySelectorAll('[name="nivel"]').forEach(radio => radio.checked = false);
+
+        // Limpa custos fixos
+        document.querySelectorAll('.campo-custo').forEach(campo => campo.value = 0);
+
+        // Limpa campos de aluno
+        document.getElementById('nome_aluno').value = '';
+        document.getElementById('mensalidade_aluno').value = '';
+
+        // Adiciona uma turma vazia
+        setTimeout(() => {
+            adicionarTurma();
+            atualizarResumo();
+        }, 100);
+    }
+}
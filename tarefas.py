@@ -0,0 +1,303 @@
+# tarefas.py - Execução de tarefas longas em segundo plano com progresso
+"""
+Executor de tarefas em segundo plano para os apps Flask.
+
+Cada tarefa é uma linha na tabela `tarefas` (status, progresso, resultado
+parcial e final) e roda em um pool de threads, fora do worker que recebeu a
+requisição. A tabela fica no banco do repositório (SQLite ou o PostgreSQL de
+SALAS_BANCO_URL). O progresso é gravado no banco, então qualquer processo —
+ou nó, com PostgreSQL — consegue acompanhá-lo; o stream SSE
+(text/event-stream) relê a linha quando a tarefa avisa que mudou (mesmo
+processo) ou a cada segundo (outro processo).
+
+O stream contínuo só é servido pelo app ASGI (app_asgi.py). No WSGI cada
+requisição devolve o estado atual e um `retry` e termina: o EventSource do
+navegador reconecta sozinho (com Last-Event-ID, sem repetir o que já tem),
+então nenhuma thread de worker fica presa durante a tarefa.
+
+Cada tarefa guarda o processo dono (host:pid) e um batimento que o dono
+renova enquanto ela está na fila ou rodando. Ao criar a tabela — o que todo
+processo faz ao subir — só são marcadas como interrompidas as tarefas cujo
+dono morreu (mesmo host, pid inexistente) ou parou de bater há mais de
+TEMPO_ABANDONO segundos; as dos outros workers vivos seguem intactas.
+
+Uso:
+    EXECUTOR = ExecutorTarefas(REPOSITORIO.conexao, REPOSITORIO.marcador)
+
+    @EXECUTOR.tarefa('recalcular')
+    def recalcular(parametros, progresso):
+        for i, item in enumerate(itens):
+            ...
+            progresso((i + 1) / len(itens), f'{i + 1} de {len(itens)}', parcial={...})
+        return resultado
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import json_rapido
+
+MAX_THREADS_TAREFAS = int(os.environ.get('SALAS_MAX_THREADS_TAREFAS', 2))
+INTERVALO_GRAVACAO = 0.25   # segundos entre gravações de progresso no banco
+INTERVALO_RELEITURA = 1.0   # segundos entre releituras do banco no stream
+INTERVALO_PING = 15.0       # comentário SSE para manter a conexão viva
+INTERVALO_BATIMENTO = 10.0  # segundos entre renovações do batimento das tarefas do processo
+TEMPO_ABANDONO = 60.0       # sem batimento há mais que isso, a tarefa é dada como interrompida
+
+STATUS_FINAIS = ('concluida', 'erro')
+
+SQL_CRIAR_TABELA = '''
+CREATE TABLE IF NOT EXISTS tarefas (
+    id TEXT PRIMARY KEY,
+    tipo TEXT,
+    status TEXT,
+    progresso REAL DEFAULT 0,
+    mensagem TEXT,
+    parametros TEXT,
+    parcial TEXT,
+    resultado TEXT,
+    erro TEXT,
+    versao INTEGER DEFAULT 0,
+    criada_em TEXT,
+    atualizada_em TEXT,
+    dono TEXT,
+    batimento REAL
+)
+'''
+
+
+def agora():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def processo_atual():
+    """Identificação do processo dono das tarefas (host:pid; muda a cada fork)"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _processo_vivo(dono):
+    """False só se o dono é deste host e o pid não existe mais"""
+    host, _, pid = (dono or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def criar_tabela_tarefas(cursor):
+    """Cria a tabela de tarefas (SQLite) e marca como erro as que ficaram pela metade"""
+    cursor.execute(SQL_CRIAR_TABELA)
+    cursor.execute('PRAGMA table_info(tarefas)')
+    colunas = {linha[1] for linha in cursor.fetchall()}
+    for coluna, tipo in (('dono', 'TEXT'), ('batimento', 'REAL')):
+        if coluna not in colunas:
+            cursor.execute(f'ALTER TABLE tarefas ADD COLUMN {coluna} {tipo}')
+    marcar_tarefas_interrompidas(cursor)
+
+
+def marcar_tarefas_interrompidas(cursor, marcador='?'):
+    """Marca como erro as tarefas abandonadas
+
+    Abandonadas: sem dono (bancos antigos), com o processo dono morto ou sem
+    batimento há mais de TEMPO_ABANDONO. As de processos vivos continuam.
+    """
+    cursor.execute("SELECT id, dono, batimento FROM tarefas WHERE status IN ('pendente', 'executando')")
+    limite = time.time() - TEMPO_ABANDONO
+    abandonadas = [(agora(), tarefa_id) for tarefa_id, dono, batimento in cursor.fetchall()
+                   if dono is None or (batimento or 0) < limite or not _processo_vivo(dono)]
+    cursor.executemany(f'''
+    UPDATE tarefas SET status = 'erro', erro = 'Interrompida (servidor reiniciado)', atualizada_em = {marcador},
+                       versao = versao + 1
+    WHERE id = {marcador} AND status IN ('pendente', 'executando')
+    ''', abandonadas)
+
+
+class Progresso:
+    """Callable passado à tarefa para reportar progresso e resultados parciais"""
+
+    def __init__(self, executor, tarefa_id):
+        self.executor = executor
+        self.tarefa_id = tarefa_id
+        self.ultima_gravacao = 0.0
+
+    def __call__(self, fracao, mensagem=None, parcial=None, forcar=False):
+        instante = time.monotonic()
+        if not forcar and parcial is None and instante - self.ultima_gravacao < INTERVALO_GRAVACAO:
+            return
+        self.ultima_gravacao = instante
+        campos = {'progresso': max(0.0, min(1.0, fracao))}
+        if mensagem is not None:
+            campos['mensagem'] = mensagem
+        if parcial is not None:
+            campos['parcial'] = json_rapido.dumps(parcial).decode('utf-8')
+        self.executor.atualizar(self.tarefa_id, **campos)
+
+
+class ExecutorTarefas:
+    """Pool de threads + tabela `tarefas` para trabalhos longos"""
+
+    def __init__(self, conexao, marcador='?', max_workers=MAX_THREADS_TAREFAS):
+        """
+        conexao: () -> context manager com uma conexão do banco (commit na saída)
+        marcador: marcador de parâmetro do driver ('?' no sqlite3, '%s' no psycopg)
+        """
+        self.conexao = conexao
+        self.marcador = marcador
+        self.max_workers = max_workers
+        self.tipos = {}
+        self.pool = None
+        self.batimentos = None
+        self.trava = threading.Lock()
+        self.condicao = threading.Condition()
+
+    def tarefa(self, tipo):
+        """Decorador que registra a função de um tipo de tarefa"""
+        def registrar(funcao):
+            self.tipos[tipo] = funcao
+            return funcao
+        return registrar
+
+    def _obter_pool(self):
+        # Criado sob demanda: com preload_app do gunicorn o import acontece
+        # no master, e threads não sobrevivem ao fork dos workers
+        with self.trava:
+            if self.pool is None:
+                self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='salas-tarefa')
+                self.batimentos = threading.Thread(target=self._bater, name='salas-tarefa-batimento', daemon=True)
+                self.batimentos.start()
+            return self.pool
+
+    def _sql(self, sql, parametros=(), ler=False):
+        """Executa um comando (escrito com '?') no banco das tarefas; ler=True devolve a primeira linha"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql.replace('?', self.marcador), parametros)
+            return cursor.fetchone() if ler else None
+
+    def _bater(self):
+        """Renova o batimento das tarefas deste processo que ainda não terminaram"""
+        dono = processo_atual()
+        while True:
+            time.sleep(INTERVALO_BATIMENTO)
+            try:
+                self._sql('''
+                UPDATE tarefas SET batimento = ? WHERE dono = ? AND status IN ('pendente', 'executando')
+                ''', (time.time(), dono))
+            except Exception as e:
+                print(f"⚠️ Erro ao renovar o batimento das tarefas: {e}")
+
+    def enviar(self, tipo, parametros):
+        """Enfileira uma tarefa e retorna o id"""
+        if tipo not in self.tipos:
+            raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+
+        tarefa_id = uuid.uuid4().hex
+        self._sql('''
+        INSERT INTO tarefas (id, tipo, status, progresso, mensagem, parametros, criada_em, atualizada_em,
+                             dono, batimento)
+        VALUES (?, ?, 'pendente', 0, 'Na fila', ?, ?, ?, ?, ?)
+        ''', (tarefa_id, tipo, json_rapido.dumps(parametros).decode('utf-8'), agora(), agora(),
+              processo_atual(), time.time()))
+
+        self._obter_pool().submit(self._executar, tarefa_id, tipo, parametros)
+        return tarefa_id
+
+    def _executar(self, tarefa_id, tipo, parametros):
+        progresso = Progresso(self, tarefa_id)
+        self.atualizar(tarefa_id, status='executando', mensagem='Iniciando')
+        try:
+            resultado = self.tipos[tipo](parametros, progresso)
+            self.atualizar(tarefa_id, status='concluida', progresso=1.0, mensagem='Concluída',
+                           resultado=json_rapido.dumps(resultado).decode('utf-8'))
+        except Exception as e:
+            print(f"❌ Erro na tarefa {tipo} ({tarefa_id}): {e}")
+            self.atualizar(tarefa_id, status='erro', mensagem='Falhou', erro=str(e))
+
+    def atualizar(self, tarefa_id, **campos):
+        campos['atualizada_em'] = agora()
+        campos['batimento'] = time.time()
+        atribuicoes = ', '.join(f'{campo} = ?' for campo in campos)
+        self._sql(f'UPDATE tarefas SET {atribuicoes}, versao = versao + 1 WHERE id = ?',
+                  (*campos.values(), tarefa_id))
+        with self.condicao:
+            self.condicao.notify_all()
+
+    def obter(self, tarefa_id):
+        """Estado da tarefa como dict (None se não existir)"""
+        linha = self._sql('''
+        SELECT id, tipo, status, progresso, mensagem, parcial, resultado, erro, versao,
+               criada_em, atualizada_em
+        FROM tarefas WHERE id = ?
+        ''', (tarefa_id,), ler=True)
+        if linha is None:
+            return None
+
+        colunas = ('id', 'tipo', 'status', 'progresso', 'mensagem', 'parcial', 'resultado', 'erro',
+                   'versao', 'criada_em', 'atualizada_em')
+        tarefa = dict(zip(colunas, linha))
+        for campo in ('parcial', 'resultado'):
+            if tarefa[campo] is not None:
+                tarefa[campo] = json_rapido.loads(tarefa[campo])
+        return tarefa
+
+    def proximo_evento(self, tarefa_id, estado):
+        """Lê a tarefa e devolve (texto SSE ou None, terminou)
+
+        `estado` é um dict do chamador com a última versão enviada e o
+        instante do último envio (para o ping).
+        """
+        tarefa = self.obter(tarefa_id)
+        if tarefa is None:
+            return _evento('erro', {'error': 'Tarefa não encontrada'}), True
+        if tarefa['status'] in STATUS_FINAIS:
+            return _evento('fim', tarefa), True
+
+        instante = time.monotonic()
+        if tarefa['versao'] != estado.get('versao'):
+            estado['versao'] = tarefa['versao']
+            estado['envio'] = instante
+            tarefa.pop('resultado')
+            return _evento('progresso', tarefa, tarefa['versao']), False
+        if instante - estado.setdefault('envio', instante) >= INTERVALO_PING:
+            estado['envio'] = instante
+            return ': ping\n\n', False
+        return None, False
+
+    def eventos(self, tarefa_id, ultimo_id=None, continuo=True):
+        """Gerador de eventos SSE com o progresso da tarefa até ela terminar
+
+        ultimo_id: Last-Event-ID da reconexão (a versão que o cliente já tem)
+        continuo=False: só o estado atual e um `retry` para o navegador
+        reconectar (WSGI, sem prender a thread do worker)
+        """
+        estado = estado_eventos(ultimo_id)
+        while True:
+            texto, terminou = self.proximo_evento(tarefa_id, estado)
+            if texto:
+                yield texto
+            if terminou:
+                return
+            if not continuo:
+                yield f'retry: {int(INTERVALO_RELEITURA * 1000)}\n\n'
+                return
+            with self.condicao:
+                self.condicao.wait(INTERVALO_RELEITURA)
+
+
+def estado_eventos(ultimo_id=None):
+    """Estado inicial de proximo_evento; ultimo_id é o Last-Event-ID de uma reconexão"""
+    return {'versao': int(ultimo_id)} if str(ultimo_id or '').isdigit() else {}
+
+
+def _evento(nome, dados, evento_id=None):
+    identificacao = f'id: {evento_id}\n' if evento_id is not None else ''
+    return f'{identificacao}event: {nome}\ndata: {json_rapido.dumps(dados).decode("utf-8")}\n\n'
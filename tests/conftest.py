@@ -0,0 +1,71 @@
+# conftest.py - Fixtures compartilhadas dos testes
+"""
+Os testes usam um banco SQLite temporário (app.DATABASE e o cache de
+resultados apontados para tmp_path). Os do PostgreSQL só rodam com
+SALAS_TESTE_BANCO_URL=postgresql://... — um banco descartável: as tabelas
+das simulações são esvaziadas antes de cada teste.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_salas  # noqa: E402
+from memo_resultados import NOME_ARQUIVO_MEMO, MemoResultados  # noqa: E402
+from repositorio import RepositorioPostgres, RepositorioSQLite, psycopg  # noqa: E402
+
+URL_TESTE_PG = os.environ.get('SALAS_TESTE_BANCO_URL', '')
+
+TABELAS_PG = ('simulacoes', 'conteudos', 'turmas', 'alunos', 'versoes_simulacao', 'busca_simulacoes',
+              'facetas_simulacao', 'tarefas')
+
+
+def turma(nome, nivel='fundamental1', disciplina='matematica', alunos=20, mensalidade=500.0):
+    return {
+        'nome': nome, 'nivel': nivel, 'disciplina': disciplina, 'capacidade': 30,
+        'alunos_matriculados': alunos, 'horas_semanais': 4, 'dias_semana': 2,
+        'custo_hora_professor': 50.0, 'mensalidade_aluno': mensalidade, 'custo_material_mensal': 100.0
+    }
+
+
+def simulacao(nome, *turmas, versao=None):
+    dados = {'nome': nome, 'salas_disponiveis': 5, 'turmas': list(turmas), 'custos': {'infraestrutura': {'aluguel': 1000}}}
+    if versao is not None:
+        dados['versao'] = versao
+    return dados
+
+
+@pytest.fixture
+def app_salas_temporario(tmp_path, monkeypatch):
+    """Módulo app com banco e cache de resultados em tmp_path"""
+    monkeypatch.setattr(app_salas, 'DATABASE', str(tmp_path / 'database_salas.db'))
+    monkeypatch.setattr(app_salas, '_banco_inicializado', False)
+    monkeypatch.setattr(app_salas, 'MEMO_RESULTADOS', MemoResultados(str(tmp_path / NOME_ARQUIVO_MEMO)))
+    assert app_salas.init_db()
+    if isinstance(app_salas.REPOSITORIO, RepositorioPostgres):
+        _esvaziar_postgres(app_salas.REPOSITORIO)
+    return app_salas
+
+
+def _esvaziar_postgres(repositorio):
+    with repositorio.conexao() as conn:
+        conn.execute(f"TRUNCATE {', '.join(TABELAS_PG)} RESTART IDENTITY CASCADE")
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def repositorio(request, app_salas_temporario):
+    """O mesmo contrato roda nos dois backends"""
+    if request.param == 'sqlite':
+        yield RepositorioSQLite(app_salas_temporario.conectar_db, app_salas_temporario.ROTULOS_BUSCA)
+        return
+
+    if not URL_TESTE_PG:
+        pytest.skip('SALAS_TESTE_BANCO_URL não definida')
+    if psycopg is None:
+        pytest.skip('psycopg não instalado')
+    repositorio_pg = RepositorioPostgres(URL_TESTE_PG, rotulos=app_salas_temporario.ROTULOS_BUSCA)
+    _esvaziar_postgres(repositorio_pg)
+    yield repositorio_pg
+    repositorio_pg.fechar()
@@ -0,0 +1,76 @@
+# test_alocacao_salas.py - Alocação de salas às aulas da grade
+from alocacao_salas import alocar_salas
+from conftest import simulacao, turma
+
+
+def aula(turma, dia='Segunda', horario=1):
+    return {'turma': turma, 'disciplina': 'Matemática', 'professor': 'Ana', 'dia': dia, 'horario': horario}
+
+
+def salas_das_aulas(resultado):
+    return {(a['turma'], a['dia'], a['horario']): sala for a, sala in resultado.alocacoes}
+
+
+def test_respeita_capacidade_e_escolhe_a_menor_sala():
+    salas = [{'nome': 'Grande', 'capacidade': 40}, {'nome': 'Pequena', 'capacidade': 20}]
+    resultado = alocar_salas([aula('1º EM'), aula('2º EM')], salas, {'1º EM': 35, '2º EM': 15})
+
+    assert salas_das_aulas(resultado) == {('1º EM', 'Segunda', 1): 'Grande', ('2º EM', 'Segunda', 1): 'Pequena'}
+    assert resultado.ocupacao_assentos == 50 / 60 * 100
+
+
+def test_turma_maior_que_todas_as_salas_fica_sem_sala():
+    resultado = alocar_salas([aula('1º EM')], [{'nome': 'S1', 'capacidade': 20}], {'1º EM': 21})
+
+    assert resultado.alocacoes == []
+    assert [motivo for _, motivo in resultado.sem_sala] == ['nenhuma sala comporta a turma']
+
+
+def test_sem_dupla_reserva_no_mesmo_horario():
+    salas = [{'nome': 'S1', 'capacidade': 30}]
+    resultado = alocar_salas([aula('1º EM'), aula('2º EM'), aula('2º EM', horario=2)], salas,
+                             {'1º EM': 25, '2º EM': 20})
+
+    assert salas_das_aulas(resultado) == {('1º EM', 'Segunda', 1): 'S1', ('2º EM', 'Segunda', 2): 'S1'}
+    assert [motivo for _, motivo in resultado.sem_sala] == ['todas as salas ocupadas']
+
+
+def test_segmentos_que_se_sobrepoem_no_relogio():
+    # 2º período do EM e 1º do EF II são ambos 07:50-08:40; o 3º do EM começa às 08:40
+    salas = [{'nome': 'S1', 'capacidade': 30}]
+    resultado = alocar_salas([aula('1º EM', horario=2), aula('7º ano', horario=1), aula('2º EM', horario=3)],
+                             salas, {'1º EM': 25, '7º ano': 20, '2º EM': 10})
+
+    assert salas_das_aulas(resultado) == {('1º EM', 'Segunda', 2): 'S1', ('2º EM', 'Segunda', 3): 'S1'}
+    assert [a['turma'] for a, _ in resultado.sem_sala] == ['7º ano']
+
+
+def test_periodo_desconhecido_nao_reserva_sala():
+    salas = [{'nome': 'S1', 'capacidade': 30}]
+    resultado = alocar_salas([aula('1º EM', horario=99), aula('2º EM', horario=99)], salas,
+                             {'1º EM': 25, '2º EM': 20})
+
+    assert resultado.alocacoes == []
+    assert [motivo for _, motivo in resultado.sem_sala] == ['período desconhecido'] * 2
+
+
+def test_alunos_informados_como_texto():
+    salas = [{'nome': 'S1', 'capacidade': 30}, {'nome': 'S2', 'capacidade': 30}]
+    resultado = alocar_salas([aula('1º EM'), aula('2º EM')], salas, {'1º EM': '25', '2º EM': None})
+
+    assert len(resultado.alocacoes) == 2
+    assert resultado.alunos_alocados == 25
+
+
+def test_ocupacao_da_simulacao_vem_da_alocacao(app_salas_temporario):
+    cliente = app_salas_temporario.app.test_client()
+    dados = simulacao('Salas', turma('1º EM', alunos=24), turma('2º EM', alunos=12))
+    estimativa = cliente.post('/api/nova_simulacao', json=dados).get_json()
+
+    dados['salas'] = [{'nome': 'S1', 'capacidade': 40}]
+    dados['aulas'] = [aula('1º EM'), aula('2º EM'), aula('2º EM', horario=2)]
+    alocada = cliente.post('/api/nova_simulacao', json=dados).get_json()
+
+    assert estimativa['ocupacao_salas'] == 36 / 60 * 100
+    assert alocada['ocupacao_salas'] == 36 / 80 * 100
+    assert alocada['aulas_alocadas'] == 2 and alocada['aulas_sem_sala'] == 1
@@ -0,0 +1,62 @@
+# test_app_asgi.py - Entrada ASGI: repasse ao Flask e stream SSE das tarefas
+import asyncio
+
+import pytest
+
+import app_asgi
+import json_rapido
+from conftest import simulacao, turma
+
+
+def chamar(metodo, caminho, corpo=b'', headers=()):
+    """Roda uma requisição no app ASGI e devolve as mensagens enviadas"""
+    mensagens = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': corpo, 'more_body': False}
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    scope = {'type': 'http', 'method': metodo, 'path': caminho, 'query_string': b'',
+             'headers': [(nome.lower().encode(), valor.encode()) for nome, valor in headers]}
+    asyncio.run(app_asgi.app(scope, receive, send))
+    return mensagens
+
+
+def resposta(mensagens):
+    inicio, *corpo = mensagens
+    return inicio['status'], dict(inicio['headers']), b''.join(m.get('body', b'') for m in corpo)
+
+
+@pytest.mark.parametrize('caminho, metodo', [('/api/nova_simulacao', 'POST'),
+                                             ('/api/atualizar_simulacao/1', 'PUT')])
+def test_json_malformado_responde_400(app_salas_temporario, caminho, metodo):
+    status, _, _ = resposta(chamar(metodo, caminho, b'{"nome": ', [('Content-Type', 'application/json')]))
+    assert status == 400
+
+
+def test_apis_json_passam_pelo_middleware_do_flask(app_salas_temporario):
+    corpo = json_rapido.dumps(simulacao('ASGI', turma('1A')))
+    status, headers, _ = resposta(chamar('POST', '/api/nova_simulacao', corpo,
+                                         [('Content-Type', 'application/json')]))
+    assert status == 200
+    assert b'server-timing' in headers
+    assert headers[b'vary'] == b'Accept-Encoding'
+
+    status, headers, _ = resposta(chamar('PUT', '/api/atualizar_simulacao/1', corpo,
+                                         [('Content-Type', 'application/json'), ('If-Match', '"1"')]))
+    assert status == 200
+    assert headers[b'etag'] == b'"1"'
+
+
+def test_falha_no_stream_sse_nao_reenvia_headers(app_salas_temporario, monkeypatch):
+    def falhar(tarefa_id, estado):
+        raise RuntimeError('banco fora do ar')
+
+    monkeypatch.setattr(app_asgi.EXECUTOR_TAREFAS, 'proximo_evento', falhar)
+    mensagens = chamar('GET', '/api/tarefas/abc123/eventos')
+
+    assert [m['type'] for m in mensagens] == ['http.response.start', 'http.response.body']
+    assert mensagens[-1]['body'].startswith(b'event: erro')
+    assert not mensagens[-1].get('more_body')
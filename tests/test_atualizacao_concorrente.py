@@ -0,0 +1,62 @@
+# test_atualizacao_concorrente.py - PUT /api/atualizar_simulacao com If-Match sob concorrência
+import json
+import threading
+
+from conftest import simulacao, turma
+
+THREADS = 8
+RODADAS = 5
+
+
+def test_put_concorrente_com_if_match(app_salas_temporario):
+    cliente = app_salas_temporario.app.test_client()
+    resposta = cliente.post('/api/nova_simulacao', json=simulacao('Concorrente', turma('inicial')))
+    simulacao_id = resposta.get_json()['id']
+    repositorio = app_salas_temporario.REPOSITORIO
+
+    largada = threading.Barrier(THREADS)
+    respostas = []
+    trava = threading.Lock()
+
+    def editar(numero):
+        cliente_thread = app_salas_temporario.app.test_client()
+        largada.wait()
+        for rodada in range(RODADAS):
+            # Primeira rodada: todos editaram a versão 1 (só um pode vencer)
+            versao = 1 if rodada == 0 else repositorio.carregar(simulacao_id, completos=False)['versao_atual']
+            nome = f'turma-{numero}-{rodada}'
+            resposta = cliente_thread.put(f'/api/atualizar_simulacao/{simulacao_id}',
+                                          json=simulacao('Concorrente', turma(nome)),
+                                          headers={'If-Match': f'"{versao}"'})
+            with trava:
+                respostas.append((resposta.status_code, resposta.get_json(), nome, versao))
+
+    threads = [threading.Thread(target=editar, args=(numero,)) for numero in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(respostas) == THREADS * RODADAS
+    assert {status for status, *_ in respostas} <= {200, 409}
+    aceitas = sorted((corpo['versao'], nome, versao) for status, corpo, nome, versao in respostas if status == 200)
+    recusadas = [corpo for status, corpo, *_ in respostas if status == 409]
+
+    # Uma versão nova por escrita aceita, cada uma sobre a anterior
+    assert [versao for versao, _, _ in aceitas] == list(range(2, len(aceitas) + 2))
+    assert all(versao == esperada + 1 for versao, _, esperada in aceitas)
+    # Na primeira rodada só uma das THREADS escritas sobre a versão 1 passa
+    assert sum(1 for _, _, esperada in aceitas if esperada == 1) == 1
+    assert len(recusadas) == THREADS * RODADAS - len(aceitas)
+    assert all(corpo['versao_atual'] != corpo['versao_esperada'] for corpo in recusadas)
+
+    atual, versoes = repositorio.listar_versoes(simulacao_id)
+    assert atual == len(aceitas) + 1
+    assert [versao['numero'] for versao in versoes] == list(range(atual, 0, -1))
+
+    # As turmas vigentes são as da última escrita aceita
+    ultima = aceitas[-1][1]
+    total, turmas = repositorio.pagina_turmas(simulacao_id, 0, 10)
+    assert (total, [t['nome'] for t in turmas]) == (1, [ultima])
+    dados_completos = json.loads(repositorio.carregar(simulacao_id)['dados_completos'])
+    assert [t['nome'] for t in dados_completos['turmas']] == [ultima]
@@ -0,0 +1,26 @@
+# test_busca.py - Filtros da busca de simulações
+import pytest
+
+from conftest import simulacao, turma
+
+
+@pytest.fixture
+def cliente(app_salas_temporario):
+    cliente = app_salas_temporario.app.test_client()
+    cliente.post('/api/nova_simulacao', json=simulacao('Lucrativa', turma('1A', alunos=30, mensalidade=900.0)))
+    cliente.post('/api/nova_simulacao', json=simulacao('Deficitária', turma('1B', alunos=2, mensalidade=100.0)))
+    return cliente
+
+
+def test_filtro_de_margem(cliente):
+    resposta = cliente.get('/api/buscar?margem_max=0')
+
+    assert resposta.status_code == 200
+    assert [s['nome'] for s in resposta.get_json()['simulacoes']] == ['Deficitária']
+    assert cliente.get('/api/buscar?margem_min=').get_json()['total'] == 2
+
+
+@pytest.mark.parametrize('consulta', ['margem_max=abc', 'margem_min=nan', 'margem_max=inf'])
+def test_margem_invalida(cliente, consulta):
+    assert cliente.get(f'/api/buscar?{consulta}').status_code == 400
+    assert cliente.get(f'/historico?{consulta}').status_code == 400
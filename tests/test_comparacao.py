@@ -0,0 +1,49 @@
+# test_comparacao.py - Diferenças entre simulações
+from comparacao import comparar_resultados, comparar_turmas, impressao_turma
+from conftest import turma
+from conteudos import hash_turma
+
+
+def test_impressao_ignora_nome_e_id():
+    assert impressao_turma(turma('A')) == impressao_turma(dict(turma('B'), id=7))
+    assert impressao_turma(turma('A')) != impressao_turma(turma('A', alunos=21))
+    assert hash_turma(turma('A')) != hash_turma(turma('B'))  # o hash da simulação continua com o nome
+
+
+def test_turma_renomeada():
+    diferenca = comparar_turmas([turma('A'), turma('B', alunos=10)], [turma('C'), turma('B', alunos=10)])
+
+    assert diferenca['renomeadas'] == [{'de': 'A', 'para': 'C'}]
+    assert diferenca['incluidas'] == [] and diferenca['removidas'] == []
+    assert diferenca['iguais'] == 1
+
+
+def test_turmas_incluidas_removidas_e_alteradas():
+    diferenca = comparar_turmas([turma('A'), turma('B')], [turma('A', alunos=25), turma('C', alunos=5)])
+
+    assert diferenca['incluidas'] == [turma('C', alunos=5)]
+    assert diferenca['removidas'] == [turma('B')]
+    assert diferenca['alteradas'] == [
+        {'nome': 'A', 'campos': {'alunos_matriculados': {'antes': 20, 'depois': 25, 'delta': 5}}}
+    ]
+    assert diferenca['renomeadas'] == [] and diferenca['iguais'] == 0
+
+
+def test_nomes_repetidos_pareados_na_ordem():
+    diferenca = comparar_turmas([turma('T', alunos=10), turma('T', alunos=20)],
+                                [turma('T', alunos=10), turma('T', alunos=25), turma('T', alunos=30)])
+
+    assert diferenca['iguais'] == 1
+    assert diferenca['alteradas'] == [
+        {'nome': 'T', 'campos': {'alunos_matriculados': {'antes': 20, 'depois': 25, 'delta': 5}}}
+    ]
+    assert diferenca['incluidas'] == [turma('T', alunos=30)] and diferenca['removidas'] == []
+
+
+def test_delta_percentual():
+    deltas = comparar_resultados({'lucro': 0, 'receita': -200.0, 'nome': 'x', 'ok': True},
+                                 {'lucro': 50, 'receita': -100.0, 'nome': 'y', 'ok': False})
+
+    assert deltas['lucro'] == {'base': 0, 'valor': 50, 'delta': 50, 'delta_percentual': None}
+    assert deltas['receita']['delta_percentual'] == 50.0
+    assert set(deltas) == {'lucro', 'receita'}
@@ -0,0 +1,28 @@
+# test_exclusao_lote.py - Exclusão de várias simulações por requisição
+import pytest
+
+from conftest import simulacao, turma
+
+
+@pytest.fixture
+def cliente_com_simulacoes(app_salas_temporario):
+    cliente = app_salas_temporario.app.test_client()
+    for i in range(3):
+        cliente.post('/api/nova_simulacao', json=simulacao(f'Escola {i}', turma(f'T{i}', alunos=10 + i)))
+    return cliente
+
+
+def test_exclui_ids_inteiros(cliente_com_simulacoes):
+    resposta = cliente_com_simulacoes.post('/api/excluir_simulacoes', json={'ids': [1, 3.0, 99]})
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['excluidas'] == [1, 3]
+    assert resposta.get_json()['nao_encontradas'] == [99]
+
+
+@pytest.mark.parametrize('ids', [[2.9], [True], ['2'], [None], [[2]]])
+def test_recusa_ids_que_nao_sao_inteiros(cliente_com_simulacoes, ids):
+    resposta = cliente_com_simulacoes.post('/api/excluir_simulacoes', json={'ids': [1] + ids})
+
+    assert resposta.status_code == 400
+    assert cliente_com_simulacoes.get('/api/simulacao/1').status_code == 200
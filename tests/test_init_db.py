@@ -0,0 +1,36 @@
+# test_init_db.py - Falhas ao criar o schema interrompem a partida
+import asyncio
+
+import pytest
+
+import app_asgi
+
+
+@pytest.fixture
+def banco_invalido(app_salas_temporario, tmp_path, monkeypatch):
+    # Um diretório no lugar do arquivo: o sqlite não consegue abrir o banco
+    monkeypatch.setattr(app_salas_temporario, 'DATABASE', str(tmp_path))
+    monkeypatch.setattr(app_salas_temporario, '_banco_inicializado', False)
+    return app_salas_temporario
+
+
+def test_init_db_propaga_o_erro(banco_invalido):
+    with pytest.raises(Exception):
+        banco_invalido.init_db()
+    assert not banco_invalido._banco_inicializado
+    with pytest.raises(Exception):
+        banco_invalido.conectar_db()
+
+
+def test_lifespan_asgi_falha_sem_schema(banco_invalido):
+    mensagens = []
+    recebidas = iter([{'type': 'lifespan.startup'}])
+
+    async def receive():
+        return next(recebidas)
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    asyncio.run(app_asgi.app({'type': 'lifespan'}, receive, send))
+    assert [m['type'] for m in mensagens] == ['lifespan.startup.failed']
@@ -0,0 +1,114 @@
+# test_memo_resultados.py - Cache de resultados (LRU em memória + disco)
+import itertools
+
+import pytest
+
+import json_rapido
+import memo_resultados
+from memo_resultados import MemoResultados
+
+
+def valor(indice, tamanho=100):
+    """Valor cuja serialização tem exatamente `tamanho` bytes"""
+    return {'i': indice, 'x': 'a' * (tamanho - len(json_rapido.dumps({'i': indice, 'x': ''})))}
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """time.time() do módulo avançando 1 s por chamada (usado_em sem empates)"""
+    contador = itertools.count(1)
+    monkeypatch.setattr(memo_resultados.time, 'time', lambda: float(next(contador)))
+
+
+def test_lru_por_quantidade_de_itens():
+    memo = MemoResultados('', max_itens=2)
+    memo.guardar('a', valor(1))
+    memo.guardar('b', valor(2))
+    assert memo.obter('a') == valor(1)  # 'a' passa a ser a mais recente
+
+    memo.guardar('c', valor(3))
+
+    assert memo.obter('b') is None
+    assert memo.obter('a') == valor(1) and memo.obter('c') == valor(3)
+    assert memo.estatisticas()['evicoes_memoria'] == 1
+
+
+def test_lru_por_bytes():
+    memo = MemoResultados('', max_itens=100, max_bytes=250)
+    for i in range(3):
+        memo.guardar(str(i), valor(i))
+
+    assert memo.obter('0') is None
+    assert memo.estatisticas()['bytes_memoria'] == 200
+
+    memo.guardar('grande', valor(9, tamanho=251))
+    assert memo.obter('grande') is None
+    assert memo.obter('1') == valor(1)
+
+
+def test_disco_remove_as_menos_usadas(tmp_path, relogio):
+    arquivo = str(tmp_path / 'memo.db')
+    memo = MemoResultados(arquivo, max_bytes_disco=250)
+    memo.guardar('a', valor(1))
+    memo.guardar('b', valor(2))
+    assert MemoResultados(arquivo).obter('a') == valor(1)  # leitura no disco renova usado_em de 'a'
+
+    memo.guardar('c', valor(3))
+
+    outro = MemoResultados(arquivo)
+    assert outro.obter('b') is None
+    assert outro.obter('a') == valor(1) and outro.obter('c') == valor(3)
+    assert memo.estatisticas()['evicoes_disco'] == 1
+
+
+def test_acerto_no_disco_promove_para_a_memoria(tmp_path):
+    arquivo = str(tmp_path / 'memo.db')
+    MemoResultados(arquivo).guardar('a', valor(1))
+    memo = MemoResultados(arquivo)
+
+    assert memo.obter('a') == valor(1)
+    assert memo.obter('a') == valor(1)
+    assert memo.obter('z') is None
+
+    stats = memo.estatisticas()
+    assert (stats['acertos_disco'], stats['acertos_memoria'], stats['faltas']) == (1, 1, 1)
+    assert stats['itens_memoria'] == 1
+    assert stats['taxa_acerto'] == pytest.approx(2 / 3)
+
+
+def test_valor_devolvido_e_uma_copia():
+    memo = MemoResultados('')
+    memo.guardar('a', {'lista': [1]})
+    memo.obter('a')['lista'].append(2)
+
+    assert memo.obter('a') == {'lista': [1]}
+    assert MemoResultados('').estatisticas()['taxa_acerto'] == 0.0
+
+
+class ConexaoQuebrada:
+    """Conexão cujas consultas falham, registrando se foi fechada"""
+    abertas = 0
+
+    def __init__(self, *args, **kwargs):
+        ConexaoQuebrada.abertas += 1
+
+    def execute(self, *args):
+        raise memo_resultados.sqlite3.OperationalError('disk I/O error')
+
+    def close(self):
+        ConexaoQuebrada.abertas -= 1
+
+
+def test_erro_no_disco_fecha_a_conexao(tmp_path, monkeypatch):
+    monkeypatch.setattr(memo_resultados.sqlite3, 'connect', ConexaoQuebrada)
+    memo = MemoResultados(str(tmp_path / 'memo.db'))
+
+    memo.guardar('a', valor(1))
+    memo.disco_pronto = True  # falha também depois da criação da tabela
+    memo.guardar('b', valor(2))
+    memo.itens.clear()
+    assert memo.obter('a') is None
+    memo.limpar()
+
+    assert ConexaoQuebrada.abertas == 0
+    assert memo.estatisticas()['erros_disco'] == 4
@@ -0,0 +1,28 @@
+# test_metricas.py - Acesso a /metrics, /metrics/perfis e ao profiler X-Perfil
+import metricas
+
+
+def test_metricas_desligadas_sem_token(app_salas_temporario, monkeypatch):
+    monkeypatch.setattr(metricas, 'TOKEN_METRICAS', '')
+    cliente = app_salas_temporario.app.test_client()
+
+    assert cliente.get('/metrics').status_code == 404
+    assert cliente.get('/metrics/perfis').status_code == 404
+    resposta = cliente.get('/historico', headers={'X-Perfil': '1', 'Authorization': 'Bearer '})
+    assert 'X-Perfil-Amostras' not in resposta.headers
+
+
+def test_metricas_exigem_o_token(app_salas_temporario, monkeypatch):
+    monkeypatch.setattr(metricas, 'TOKEN_METRICAS', 'segredo')
+    cliente = app_salas_temporario.app.test_client()
+    autorizado = {'Authorization': 'Bearer segredo'}
+
+    assert cliente.get('/metrics').status_code == 401
+    assert cliente.get('/metrics', headers={'Authorization': 'Bearer outro'}).status_code == 401
+    assert cliente.get('/historico', headers={'X-Perfil': '1'}).headers.get('X-Perfil-Amostras') is None
+
+    assert cliente.get('/historico', headers={'X-Perfil': '1', **autorizado}).headers.get('X-Perfil-Amostras')
+    resposta = cliente.get('/metrics', headers=autorizado)
+    assert resposta.status_code == 200
+    assert b'# TYPE' in resposta.data
+    assert cliente.get('/metrics/perfis', headers=autorizado).get_json()[-1]['rota'] == '/historico'
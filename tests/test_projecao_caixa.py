@@ -0,0 +1,82 @@
+# test_projecao_caixa.py - Projeção de fluxo de caixa mês a mês
+import pytest
+
+from conftest import simulacao, turma
+from projecao_caixa import ParametrosProjecao, projetar_fluxo_caixa, valor_presente
+
+CURVA_PLANA = [1.0] * 12
+
+
+def turma_simples(alunos=20, capacidade=30, mensalidade=100.0, nivel='medio'):
+    """Turma sem custos: receita de alunos × mensalidade por mês"""
+    return {'nome': 'T', 'nivel': nivel, 'capacidade': capacidade, 'alunos_matriculados': alunos,
+            'horas_semanais': 0, 'dias_semana': 0, 'custo_hora_professor': 0,
+            'mensalidade_aluno': mensalidade, 'custo_material_mensal': 0}
+
+
+def projetar(turmas, custos_fixos=0, **parametros):
+    parametros.setdefault('curva_matriculas', CURVA_PLANA)
+    return projetar_fluxo_caixa(turmas, custos_fixos, parametros=ParametrosProjecao(**parametros))
+
+
+def test_payback_no_mes_em_que_o_acumulado_cobre_o_investimento():
+    projecao = projetar([turma_simples()], investimento_inicial=5000)
+
+    assert projecao.resultado == [2000.0] * 12
+    assert projecao.payback_mes == 3
+    assert projetar([turma_simples()], custos_fixos=2000, investimento_inicial=1).payback_mes is None
+
+
+def test_vpl_desconta_os_fluxos_mensais():
+    projecao = projetar([turma_simples()], investimento_inicial=5000, taxa_desconto_anual=0.12)
+    taxa_mensal = 1.12 ** (1 / 12) - 1
+
+    assert projetar([turma_simples()], investimento_inicial=5000).vpl == pytest.approx(-5000 + 24000)
+    assert projecao.vpl == pytest.approx(-5000 + sum(2000 / (1 + taxa_mensal) ** m for m in range(1, 13)))
+
+
+def test_tir_zera_o_vpl():
+    projecao = projetar([turma_simples()], investimento_inicial=20000)
+
+    assert projecao.tir_mensal is not None
+    assert valor_presente(projecao.fluxos, projecao.tir_mensal) == pytest.approx(0, abs=1e-4)
+    assert projetar([turma_simples()]).tir_mensal is None  # sem investimento não há troca de sinal
+
+
+def test_curva_sazonal_por_nivel_e_teto_da_capacidade():
+    curva_medio = [0.5] + [1.0] * 10 + [2.0]
+    projecao = projetar([turma_simples(nivel='medio'), turma_simples(nivel='infantil')],
+                        curva_matriculas={'medio': curva_medio, 'padrao': CURVA_PLANA}, mes_inicial=12,
+                        meses=13)
+
+    # Dezembro: 20 × 2 passa da capacidade (30); janeiro: metade das matrículas
+    assert projecao.receita[0] == 3000 + 2000
+    assert projecao.receita[1] == 1000 + 2000
+    assert projecao.receita[2] == 2000 + 2000
+
+
+def test_reajuste_anual_da_mensalidade():
+    projecao = projetar([turma_simples()], meses=24, mes_inicial=1, mes_reajuste=1,
+                        reajuste_mensalidade_anual=0.10)
+
+    assert projecao.receita[11] == pytest.approx(2000)
+    assert projecao.receita[12] == pytest.approx(2200)
+    assert projecao.receita[23] == pytest.approx(2200)
+
+
+@pytest.mark.parametrize('parametros', [
+    {'meses': 1}, {'meses': 61}, {'curva_matriculas': [1.0] * 11}, {'curva_matriculas': 5},
+    {'curva_matriculas': ['x'] * 12}, {'curva_matriculas': {'medio': None, 'infantil': [None] * 12}},
+])
+def test_premissas_invalidas(parametros):
+    with pytest.raises(ValueError):
+        ParametrosProjecao.de_dict(parametros)
+
+
+@pytest.mark.parametrize('corpo', [[1, 2], {'meses': 1}, {'curva_matriculas': 'abc'}, {'meses': [12]}])
+def test_api_recusa_premissas_invalidas(app_salas_temporario, corpo):
+    cliente = app_salas_temporario.app.test_client()
+    simulacao_id = cliente.post('/api/nova_simulacao', json=simulacao('Projeção', turma('T1'))).get_json()['id']
+
+    assert cliente.post(f'/api/simulacao/{simulacao_id}/projecao', json=corpo).status_code == 400
+    assert cliente.post(f'/api/simulacao/{simulacao_id}/projecao', json={'meses': 24}).status_code == 200
@@ -0,0 +1,43 @@
+# test_rateio_custos.py - Rateio dos custos fixos entre as turmas
+import pytest
+
+import rateio_custos
+from conftest import turma
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def ratear(request, monkeypatch):
+    if request.param == 'numpy':
+        if rateio_custos.numpy is None:
+            pytest.skip('numpy não instalado')
+    else:
+        monkeypatch.setattr(rateio_custos, 'numpy', None)
+    return rateio_custos.ratear_custos_fixos
+
+
+def test_rateio_distribui_todo_o_custo(ratear):
+    turmas = [turma('1A', alunos=10), turma('1B', alunos=30)]
+    custos = {'infraestrutura': {'aluguel': 1000.0}, 'marketing': {'anuncios': 400.0}}
+
+    rateios = ratear(turmas, custos)
+
+    assert sum(r['total'] for r in rateios) == pytest.approx(1400.0)
+    assert rateios[1]['alunos'] == pytest.approx(300.0)
+
+
+def test_direcionador_sem_peso_usa_a_reserva(ratear):
+    # Sem horas lançadas: 'sala' e 'horas' não têm peso, o aluguel vai por alunos
+    turmas = [{**turma('1A', alunos=10), 'horas_semanais': 0}, {**turma('1B', alunos=30), 'horas_semanais': 0}]
+    custos = {'infraestrutura': {'aluguel': 1000.0}, 'equipamentos': {'projetor': 200.0}}
+
+    rateios = ratear(turmas, custos)
+
+    assert sum(r['total'] for r in rateios) == pytest.approx(1200.0)
+    assert [r['total'] for r in rateios] == pytest.approx([300.0, 900.0])
+
+
+def test_reserva_usa_os_totais_da_simulacao(ratear):
+    # Uma página de turmas com os totais da simulação inteira
+    totais = {'horas': 0.0, 'alunos': 100.0, 'sala': 0.0}
+    rateios = ratear([turma('1A', alunos=25)], {'infraestrutura': {'aluguel': 1000.0}}, totais=totais)
+    assert rateios[0]['total'] == pytest.approx(250.0)
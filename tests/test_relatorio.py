@@ -0,0 +1,17 @@
+# test_relatorio.py - Página de relatório e lista virtual de turmas
+from conftest import simulacao, turma
+
+
+def test_primeira_pagina_igual_a_da_lista_virtual(app_salas_temporario):
+    cliente = app_salas_temporario.app.test_client()
+    turmas = [turma(f'T{i:03d}', alunos=5 + i % 30) for i in range(app_salas_temporario.TURMAS_POR_PAGINA + 10)]
+    simulacao_id = cliente.post('/api/nova_simulacao', json=simulacao('Relatório', *turmas)).get_json()['id']
+
+    pagina = cliente.get(f'/relatorio/{simulacao_id}').get_data(as_text=True)
+    pagina_zero = cliente.get(f'/relatorio/{simulacao_id}/turmas?pagina=0').get_data(as_text=True)
+    pagina_um = cliente.get(f'/relatorio/{simulacao_id}/turmas?pagina=1').get_data(as_text=True)
+
+    assert pagina_zero and pagina_zero in pagina
+    assert 'T000' in pagina_zero and 'T050' not in pagina_zero
+    assert 'T050' in pagina_um and 'T050' not in pagina
+    assert f'data-total="{len(turmas)}"' in pagina
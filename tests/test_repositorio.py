@@ -0,0 +1,129 @@
+# test_repositorio.py - Contrato dos repositórios (SQLite e PostgreSQL)
+import json
+
+import pytest
+
+from conftest import simulacao, turma
+from repositorio import ConflitoVersao, SimulacaoNaoEncontrada
+
+
+@pytest.fixture
+def salvar(repositorio, app_salas_temporario):
+    """Salva uma simulação pelo repositório e retorna o id"""
+    def salvar_simulacao(dados):
+        return repositorio.salvar(dados, app_salas_temporario.calcular_resultados_salas(dados))
+    return salvar_simulacao
+
+
+@pytest.fixture
+def atualizar(repositorio, app_salas_temporario):
+    def atualizar_simulacao(simulacao_id, dados, versao_esperada=None):
+        resultados = app_salas_temporario.calcular_resultados_salas(dados)
+        return repositorio.atualizar(simulacao_id, dados, resultados, versao_esperada=versao_esperada)
+    return atualizar_simulacao
+
+
+def nomes_turmas(linha):
+    return [t['nome'] for t in json.loads(linha['dados_completos'])['turmas']]
+
+
+def test_salvar_e_carregar(repositorio, salvar):
+    simulacao_id = salvar(simulacao('Escola A', turma('1A'), turma('1B', alunos=25)))
+
+    linha = repositorio.carregar(simulacao_id)
+    assert linha['nome'] == 'Escola A'
+    assert linha['versao_atual'] == 1
+    assert linha['total_turmas'] == 2
+    assert linha['total_alunos'] == 45
+    assert nomes_turmas(linha) == ['1A', '1B']
+    assert 'dados_completos' not in repositorio.carregar(simulacao_id, completos=False)
+    assert repositorio.carregar(simulacao_id + 1000) is None
+
+
+def test_atualizar_grava_nova_versao(repositorio, salvar, atualizar):
+    simulacao_id = salvar(simulacao('Escola A', turma('1A')))
+
+    versao = atualizar(simulacao_id, simulacao('Escola A', turma('1A'), turma('2A')), versao_esperada=1)
+
+    assert versao == 2
+    linha = repositorio.carregar(simulacao_id)
+    assert linha['versao_atual'] == 2
+    assert nomes_turmas(linha) == ['1A', '2A']
+
+
+def test_atualizar_com_versao_antiga_gera_conflito(repositorio, salvar, atualizar):
+    simulacao_id = salvar(simulacao('Escola A', turma('1A')))
+    atualizar(simulacao_id, simulacao('Escola A', turma('1B')), versao_esperada=1)
+
+    with pytest.raises(ConflitoVersao) as conflito:
+        atualizar(simulacao_id, simulacao('Escola A', turma('1C')), versao_esperada=1)
+
+    assert (conflito.value.versao_esperada, conflito.value.versao_atual) == (1, 2)
+    assert nomes_turmas(repositorio.carregar(simulacao_id)) == ['1B']
+
+
+def test_atualizar_simulacao_inexistente(repositorio, atualizar):
+    with pytest.raises(SimulacaoNaoEncontrada):
+        atualizar(999, simulacao('Nenhuma', turma('1A')))
+
+
+def test_versoes(repositorio, salvar, atualizar):
+    simulacao_id = salvar(simulacao('Escola A', turma('1A')))
+    atualizar(simulacao_id, simulacao('Escola A', turma('1A'), turma('2A')))
+    atualizar(simulacao_id, simulacao('Escola B', turma('3A')))
+
+    atual, versoes = repositorio.listar_versoes(simulacao_id)
+    assert atual == 3
+    assert [versao['numero'] for versao in versoes] == [3, 2, 1]
+
+    segunda = repositorio.carregar_versao(simulacao_id, 2)
+    assert [t['nome'] for t in segunda['dados_completos']['turmas']] == ['1A', '2A']
+    assert repositorio.carregar_versao(simulacao_id, 4) is None
+    assert repositorio.listar_versoes(simulacao_id + 1000) is None
+
+
+def test_versao_antiga_guarda_a_turma_inteira(repositorio, salvar, atualizar):
+    original = {**turma('1A'), 'id': 7, 'sala_preferida': 'Lab 1'}
+    simulacao_id = salvar(simulacao('Escola A', original, turma('2A')))
+    atualizar(simulacao_id, simulacao('Escola A', {**original, 'sala_preferida': 'Lab 2'}, turma('2A')))
+
+    primeira = repositorio.carregar_versao(simulacao_id, 1)['dados_completos']['turmas']
+    segunda = repositorio.carregar_versao(simulacao_id, 2)['dados_completos']['turmas']
+    assert primeira == [original, turma('2A')]
+    assert segunda[0]['sala_preferida'] == 'Lab 2' and segunda[1] == turma('2A')
+
+
+def test_excluir(repositorio, salvar):
+    mantida = salvar(simulacao('Mantida', turma('1A')))
+    excluidas = [salvar(simulacao(f'Excluída {i}', turma(f'{i}A'))) for i in range(3)]
+
+    assert sorted(repositorio.excluir(excluidas)) == sorted(excluidas)
+
+    assert repositorio.carregar(excluidas[0]) is None
+    assert [linha['id'] for linha in repositorio.listar()] == [mantida]
+    assert repositorio.listar_versoes(excluidas[0]) is None
+    assert repositorio.buscar({'texto': 'excluída'}, 10)['total'] == 0
+
+
+def test_buscar(repositorio, salvar, atualizar):
+    fisica = salvar(simulacao('Colégio Norte', turma('Física 1', disciplina='fisica', nivel='ensino_medio')))
+    salvar(simulacao('Colégio Sul', turma('Matemática 1')))
+    salvar(simulacao('Escola Leste', turma('Matemática 2', alunos=5, mensalidade=100.0)))
+
+    encontrada = repositorio.buscar({'texto': 'fisica'}, 10)
+    assert encontrada['total'] == 1
+    assert [linha['id'] for linha in encontrada['simulacoes']] == [fisica]
+
+    assert repositorio.buscar({'texto': 'colegio'}, 10)['total'] == 2
+    assert repositorio.buscar({'disciplina': 'matematica'}, 10)['total'] == 2
+    assert repositorio.buscar({'nivel': 'ensino_medio', 'disciplina': 'fisica'}, 10)['total'] == 1
+
+    todas = repositorio.buscar({}, 2)
+    assert todas['total'] == 3
+    assert len(todas['simulacoes']) == 2
+    assert todas['facetas']['disciplina'] == {'fisica': 1, 'matematica': 2}
+
+    # O índice acompanha a atualização
+    atualizar(fisica, simulacao('Colégio Norte', turma('Química 1', disciplina='quimica', nivel='ensino_medio')))
+    assert repositorio.buscar({'texto': 'fisica'}, 10)['total'] == 0
+    assert repositorio.buscar({'texto': 'quimica'}, 10)['total'] == 1
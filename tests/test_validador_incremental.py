@@ -0,0 +1,107 @@
+# test_validador_incremental.py - ValidadorIncremental × verificação completa da grade
+"""
+As verificações completas ficam no app Streamlit (ultimo=incompleto.py), que
+não é importável fora do `streamlit run`. As funções usadas aqui são lidas
+do código-fonte e executadas com um session_state montado pelo teste.
+"""
+import ast
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from calendario_escolar import CALENDARIO_PADRAO, CalendarioEscolar
+from grade_aulas import normalizar_grade
+from validador_incremental import ValidadorIncremental
+
+ARQUIVO_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ultimo=incompleto.py')
+FUNCOES_APP = ('obter_calendario', 'obter_segmento_turma', 'obter_segmento_professor',
+               'obter_limite_horas_professor', 'calcular_horas_professor', 'verificar_conflitos_horarios',
+               'verificar_professor_superposto', 'verificar_limites_professores', 'criar_validador_grade')
+
+DIAS = ['Segunda', 'Terça', 'Quarta']
+TURMAS = ['1º EM', '2º EM', '7º ano', '8º ano']
+DISCIPLINAS = ['Matemática', 'Português', 'História']
+PROFESSORES = ['Ana', 'Bruno', 'Carla']
+
+
+class SessionState(SimpleNamespace):
+    def get(self, chave, padrao=None):
+        return getattr(self, chave, padrao)
+
+
+def carregar_funcoes_app(session_state):
+    with open(ARQUIVO_APP, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read())
+    modulo = ast.Module(
+        body=[no for no in arvore.body if isinstance(no, ast.FunctionDef) and no.name in FUNCOES_APP], type_ignores=[]
+    )
+    # Limites baixos para a grade pequena do teste exceder alguns
+    namespace = {
+        'st': SimpleNamespace(session_state=session_state), 'normalizar_grade': normalizar_grade,
+        'CalendarioEscolar': CalendarioEscolar, 'CALENDARIO_PADRAO': CALENDARIO_PADRAO,
+        'ValidadorIncremental': ValidadorIncremental, 'LIMITE_HORAS_EFII': 6, 'LIMITE_HORAS_EM': 8
+    }
+    exec(compile(modulo, ARQUIVO_APP, 'exec'), namespace)
+    return SimpleNamespace(**{nome: namespace[nome] for nome in FUNCOES_APP})
+
+
+@pytest.fixture
+def app_grade():
+    disciplinas = [SimpleNamespace(nome=nome, turmas=TURMAS, carga_semanal=2) for nome in DISCIPLINAS]
+    professores = [SimpleNamespace(nome=nome, disciplinas=[DISCIPLINAS[i]]) for i, nome in enumerate(PROFESSORES)]
+    return carregar_funcoes_app(SessionState(disciplinas=disciplinas, professores=professores))
+
+
+def grade_aleatoria(sorteio, quantidade):
+    return [{'turma': sorteio.choice(TURMAS), 'disciplina': sorteio.choice(DISCIPLINAS),
+             'professor': sorteio.choice(PROFESSORES), 'dia': sorteio.choice(DIAS),
+             'horario': sorteio.randint(1, 5)} for _ in range(quantidade)]
+
+
+def conflitos_completos(app_grade, aulas):
+    """Chaves em conflito segundo as verificações completas do app"""
+    conflitos = app_grade.verificar_conflitos_horarios(aulas)
+    return {
+        'turma': {(c['turma'], c['dia'], c['horario_real']) for c in conflitos if c['tipo'] != 'excesso_aulas'},
+        'carga': {(c['turma'], c['disciplina']) for c in conflitos if c['tipo'] == 'excesso_aulas'},
+        'professor': {(s['professor'], s['dia'], s['horario_real'])
+                      for s in app_grade.verificar_professor_superposto(aulas)},
+        'limite': {p['professor'] for p in app_grade.verificar_limites_professores(aulas)}
+    }
+
+
+def conflitos_validador(validador):
+    return {
+        'turma': set(validador.conflitos_turma),
+        'carga': set(validador.excessos_carga),
+        'professor': set(validador.conflitos_professor),
+        'limite': set(validador.professores_excedidos)
+    }
+
+
+def test_grade_inicial_igual_a_verificacao_completa(app_grade):
+    aulas = grade_aleatoria(random.Random(1), 60)
+
+    validador = app_grade.criar_validador_grade(aulas)
+
+    esperado = conflitos_completos(app_grade, aulas)
+    assert all(esperado.values())  # a grade exercita todos os tipos de conflito
+    assert conflitos_validador(validador) == esperado
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_mover_igual_a_verificacao_completa(app_grade, semente):
+    sorteio = random.Random(semente)
+    aulas = grade_aleatoria(sorteio, 60)
+    validador = app_grade.criar_validador_grade(aulas)
+
+    for _ in range(40):
+        antes = conflitos_completos(app_grade, aulas)
+        delta = validador.mover(sorteio.choice(list(validador.aulas)), sorteio.choice(DIAS), sorteio.randint(1, 5))
+        depois = conflitos_completos(app_grade, aulas)
+
+        assert conflitos_validador(validador) == depois
+        assert set(delta.novos) == {(tipo, chave) for tipo in depois for chave in depois[tipo] - antes[tipo]}
+        assert set(delta.resolvidos) == {(tipo, chave) for tipo in depois for chave in antes[tipo] - depois[tipo]}
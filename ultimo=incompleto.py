@@ -1,14 +1,15 @@
 # app_corrigido_v4_COMPLETO.py - VERSÃO FINAL COM TODAS AS CORREÇÕES
 import streamlit as st
-import pandas as pd
-import database
 from session_state import init_session_state
 from auto_save import salvar_tudo
 from models import Turma, Professor, Disciplina, Sala, DIAS_SEMANA, Aula
-import io
+from grade_aulas import AulaGrade, normalizar_grade
+from calendario_escolar import CalendarioEscolar, CALENDARIO_PADRAO
+from validador_incremental import ValidadorIncremental
+from render_grade import CSS_CALENDARIO, CacheGradeTurma, renderizar_grade
+from alocacao_salas import alocar_salas
 import traceback
 from datetime import datetime, time
-import random
 
 # ============================================
 # CONFIGURAÇÃO DE PÁGINA
@@ -19,39 +20,51 @@ st.title("🕒 Gerador Inteligente de Grade Horária")
 # ============================================
 # VERIFICAÇÃO DE ALGORITMOS
 # ============================================
-ALGORITMOS_DISPONIVEIS = True
-try:
-    # Tentar importar algoritmo ULTRA primeiro
-    from simple_scheduler_ultra import SimpleGradeHoraria as SimpleGradeHorariaUltra
-    ALGORITMO_DISPONIVEL = "ULTRA-CORRIGIDO"
-    st.sidebar.success("✅ Algoritmo ULTRA-CORRIGIDO disponível")
-except ImportError:
+class SimpleGradeHorariaIndisponivel:
+    def __init__(self, *args, **kwargs):
+        self.turmas = []
+        self.professores = []
+        self.disciplinas = []
+        self.salas = []
+    
+    def gerar_grade(self):
+        st.error("❌ Nenhum algoritmo de geração disponível!")
+        return []
+
+@st.cache_resource
+def resolver_algoritmo():
+    """Resolve a cadeia de fallbacks do gerador uma única vez por processo
+    (import que falha não fica em sys.modules e seria tentado a cada rerun)"""
+    try:
+        # Tentar importar algoritmo ULTRA primeiro
+        from simple_scheduler_ultra import SimpleGradeHoraria
+        return "ULTRA-CORRIGIDO", SimpleGradeHoraria
+    except ImportError:
+        pass
     try:
         # Fallback para algoritmo corrigido
         from simple_scheduler_final import SimpleGradeHoraria
-        ALGORITMO_DISPONIVEL = "CORRIGIDO"
-        st.sidebar.warning("⚠️ Usando algoritmo CORRIGIDO")
+        return "CORRIGIDO", SimpleGradeHoraria
     except ImportError:
-        try:
-            # Fallback para algoritmo original
-            from simple_scheduler import SimpleGradeHoraria
-            ALGORITMO_DISPONIVEL = "ORIGINAL"
-            st.sidebar.error("⚠️ Usando algoritmo ORIGINAL (pode ter problemas)")
-        except ImportError:
-            ALGORITMOS_DISPONIVEIS = False
-            ALGORITMO_DISPONIVEL = "NENHUM"
-            st.sidebar.error("❌ Nenhum algoritmo disponível")
-            
-            class SimpleGradeHoraria:
-                def __init__(self, *args, **kwargs):
-                    self.turmas = []
-                    self.professores = []
-                    self.disciplinas = []
-                    self.salas = []
-                
-                def gerar_grade(self):
-                    st.error("❌ Nenhum algoritmo de geração disponível!")
-                    return []
+        pass
+    try:
+        # Fallback para algoritmo original
+        from simple_scheduler import SimpleGradeHoraria
+        return "ORIGINAL", SimpleGradeHoraria
+    except ImportError:
+        return "NENHUM", SimpleGradeHorariaIndisponivel
+
+ALGORITMO_DISPONIVEL, SimpleGradeHoraria = resolver_algoritmo()
+ALGORITMOS_DISPONIVEIS = ALGORITMO_DISPONIVEL != "NENHUM"
+if ALGORITMO_DISPONIVEL == "ULTRA-CORRIGIDO":
+    SimpleGradeHorariaUltra = SimpleGradeHoraria
+    st.sidebar.success("✅ Algoritmo ULTRA-CORRIGIDO disponível")
+elif ALGORITMO_DISPONIVEL == "CORRIGIDO":
+    st.sidebar.warning("⚠️ Usando algoritmo CORRIGIDO")
+elif ALGORITMO_DISPONIVEL == "ORIGINAL":
+    st.sidebar.error("⚠️ Usando algoritmo ORIGINAL (pode ter problemas)")
+else:
+    st.sidebar.error("❌ Nenhum algoritmo disponível")
 
 # ============================================
 # INICIALIZAÇÃO
@@ -63,6 +76,7 @@ except Exception as e:
     st.error(f"❌ Erro na inicialização: {str(e)}")
     st.code(traceback.format_exc())
     if st.button("🔄 Resetar Banco de Dados"):
+        import database  # só usado neste caminho de erro
         database.resetar_banco()
         st.rerun()
     st.stop()
@@ -88,27 +102,16 @@ def obter_grupo_seguro(objeto, opcoes=["A", "B", "AMBOS"]):
     except:
         return "A"
 
+def obter_calendario():
+    """Retorna o calendário (horários de sinal) da escola, ou o padrão EM/EF II"""
+    calendario = st.session_state.get('calendario_escolar')
+    if isinstance(calendario, CalendarioEscolar):
+        return calendario
+    return CALENDARIO_PADRAO
+
 def obter_segmento_turma(turma_nome):
     """Determina o segmento da turma baseado no nome"""
-    if not turma_nome:
-        return "EF_II"
-    
-    turma_nome_lower = turma_nome.lower()
-    
-    # Verificar se é EM
-    if 'em' in turma_nome_lower:
-        return "EM"
-    # Verificar se é EF II
-    elif any(x in turma_nome_lower for x in ['6', '7', '8', '9', 'ano', 'ef']):
-        return "EF_II"
-    else:
-        try:
-            if turma_nome_lower[0].isdigit():
-                return "EF_II"
-            else:
-                return "EM"
-        except:
-            return "EF_II"
+    return obter_calendario().segmento_turma(turma_nome)
 
 def obter_segmento_professor(professor):
     """Determina o segmento principal do professor baseado nas disciplinas que ministra"""
@@ -153,102 +156,30 @@ def obter_limite_horas_professor(professor):
         return LIMITE_HORAS_EM
 
 def calcular_horas_professor(professor, aulas):
-    """Calcula horas semanais do professor baseado nas aulas"""
-    total_horas = 0
-    
-    for aula in aulas:
-        if obter_professor_aula(aula) == professor.nome:
-            # Cada aula = 1 hora
-            total_horas += 1
+    """Calcula horas semanais do professor baseado nas aulas (cada aula = 1 hora)
     
-    return total_horas
+    Para vários professores, passe a GradeNormalizada: a contagem por
+    professor é feita uma única vez por grade, não uma vez por chamada.
+    """
+    grade = normalizar_grade(aulas)
+    id_professor = grade.professores.ids.get(professor.nome)
+    return grade.aulas_por_professor()[id_professor] if id_professor is not None else 0
 
 def obter_horarios_turma(turma_nome):
     """Retorna os períodos disponíveis para a turma"""
-    segmento = obter_segmento_turma(turma_nome)
-    if segmento == "EM":
-        return [1, 2, 3, 4, 5, 6, 7]  # 7 períodos para EM
-    else:
-        return [1, 2, 3, 4, 5]  # 5 períodos para EF II
+    return obter_calendario().periodos(turma_nome)
 
 def obter_horario_real(turma_nome, periodo):
     """Retorna o horário real formatado COM INTERVALO CORRETO"""
-    segmento = obter_segmento_turma(turma_nome)
-    
-    if segmento == "EM":
-        # Ensino Médio: 7 períodos com intervalo APÓS o 3º período
-        horarios_em = {
-            1: "07:00 - 07:50",
-            2: "07:50 - 08:40", 
-            3: "08:40 - 09:30",  # ÚLTIMO ANTES DO INTERVALO
-            4: "09:50 - 10:40",  # PRIMEIRO APÓS INTERVALO
-            5: "10:40 - 11:30",
-            6: "11:30 - 12:20",
-            7: "12:20 - 13:10"
-        }
-        return horarios_em.get(periodo, f"Período {periodo}")
-    else:
-        # EF II: 5 períodos com intervalo APÓS o 2º período
-        horarios_efii = {
-            1: "07:50 - 08:40",
-            2: "08:40 - 09:30",  # ÚLTIMO ANTES DO INTERVALO
-            3: "09:50 - 10:40",  # PRIMEIRO APÓS INTERVALO
-            4: "10:40 - 11:30",
-            5: "11:30 - 12:20"
-        }
-        return horarios_efii.get(periodo, f"Período {periodo}")
+    return obter_calendario().horario_real(turma_nome, periodo)
 
 def obter_horario_real_time(turma_nome, periodo):
     """Retorna horário real como objetos time (inicio, fim)"""
-    segmento = obter_segmento_turma(turma_nome)
-    
-    if segmento == "EM":
-        horarios = {
-            1: (time(7, 0), time(7, 50)),
-            2: (time(7, 50), time(8, 40)), 
-            3: (time(8, 40), time(9, 30)),
-            4: (time(9, 50), time(10, 40)),
-            5: (time(10, 40), time(11, 30)),
-            6: (time(11, 30), time(12, 20)),
-            7: (time(12, 20), time(13, 10))
-        }
-    else:  # EF_II
-        horarios = {
-            1: (time(7, 50), time(8, 40)),
-            2: (time(8, 40), time(9, 30)),
-            3: (time(9, 50), time(10, 40)),
-            4: (time(10, 40), time(11, 30)),
-            5: (time(11, 30), time(12, 20))
-        }
-    
-    return horarios.get(periodo, (time(0, 0), time(0, 0)))
+    return obter_calendario().horario_real_time(turma_nome, periodo)
 
 def obter_periodo_por_horario_real(turma_nome, horario_real):
     """Converte horário real para número do período baseado no segmento"""
-    segmento = obter_segmento_turma(turma_nome)
-    
-    if segmento == "EM":
-        # EM: 7 períodos
-        horarios_em = {
-            "07:00 - 07:50": 1,
-            "07:50 - 08:40": 2,
-            "08:40 - 09:30": 3,
-            "09:50 - 10:40": 4,
-            "10:40 - 11:30": 5,
-            "11:30 - 12:20": 6,
-            "12:20 - 13:10": 7
-        }
-        return horarios_em.get(horario_real, 0)
-    else:
-        # EF II: 5 períodos
-        horarios_efii = {
-            "07:50 - 08:40": 1,
-            "08:40 - 09:30": 2,
-            "09:50 - 10:40": 3,
-            "10:40 - 11:30": 4,
-            "11:30 - 12:20": 5
-        }
-        return horarios_efii.get(horario_real, 0)
+    return obter_calendario().periodo_por_horario_real(turma_nome, horario_real)
 
 def calcular_carga_maxima(serie):
     """Calcula a quantidade máxima de aulas semanais"""
@@ -301,7 +232,9 @@ def converter_disponibilidade_para_completo(disponibilidade):
 
 def obter_turma_aula(aula):
     """Obtém a turma de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.turma
+    elif isinstance(aula, Aula):
         return aula.turma
     elif isinstance(aula, dict) and 'turma' in aula:
         return aula['turma']
@@ -311,7 +244,9 @@ def obter_turma_aula(aula):
 
 def obter_disciplina_aula(aula):
     """Obtém a disciplina de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.disciplina
+    elif isinstance(aula, Aula):
         return aula.disciplina
     elif isinstance(aula, dict) and 'disciplina' in aula:
         return aula['disciplina']
@@ -321,7 +256,9 @@ def obter_disciplina_aula(aula):
 
 def obter_professor_aula(aula):
     """Obtém o professor de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.professor
+    elif isinstance(aula, Aula):
         return aula.professor
     elif isinstance(aula, dict) and 'professor' in aula:
         return aula['professor']
@@ -331,7 +268,9 @@ def obter_professor_aula(aula):
 
 def obter_dia_aula(aula):
     """Obtém o dia de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.dia
+    elif isinstance(aula, Aula):
         return aula.dia
     elif isinstance(aula, dict) and 'dia' in aula:
         return aula['dia']
@@ -341,7 +280,9 @@ def obter_dia_aula(aula):
 
 def obter_horario_aula(aula):
     """Obtém o número do horário de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.horario
+    elif isinstance(aula, Aula):
         return aula.horario
     elif isinstance(aula, dict) and 'horario' in aula:
         return aula['horario']
@@ -360,7 +301,9 @@ def obter_horario_real_aula(aula):
 
 def obter_segmento_aula(aula):
     """Obtém o segmento de uma aula de forma segura"""
-    if isinstance(aula, Aula):
+    if type(aula) is AulaGrade:
+        return aula.segmento
+    elif isinstance(aula, Aula):
         return aula.segmento if hasattr(aula, 'segmento') else None
     elif isinstance(aula, dict) and 'segmento' in aula:
         return aula['segmento']
@@ -430,22 +373,24 @@ def verificar_professor_comprometido(professor, disciplina_nome, grupo):
 
 def verificar_conflitos_horarios(aulas):
     """Verifica se há horários sobrepostos na mesma turma considerando horários REAIS"""
+    calendario = obter_calendario()
     conflitos = []
     horarios_por_turma = {}
     aulas_por_disciplina_turma = {}
     
-    for aula in aulas:
-        turma = obter_turma_aula(aula)
-        dia = obter_dia_aula(aula)
-        horario_num = obter_horario_aula(aula)
-        disciplina = obter_disciplina_aula(aula)
-        
-        if not turma or not dia or not horario_num or not disciplina:
+    for aula_grade in normalizar_grade(aulas):
+        if not aula_grade.completa():
             continue
         
+        aula = aula_grade.original
+        turma = aula_grade.turma
+        dia = aula_grade.dia
+        horario_num = aula_grade.horario
+        disciplina = aula_grade.disciplina
+        
         # Obter horário REAL
-        hora_real = obter_horario_real(turma, horario_num)
-        segmento = obter_segmento_turma(turma)
+        hora_real = calendario.horario_real(turma, horario_num)
+        segmento = calendario.segmento_turma(turma)
         
         # Chave baseada em horário REAL
         chave_horario = f"{turma}|{dia}|{hora_real}"
@@ -454,7 +399,7 @@ def verificar_conflitos_horarios(aulas):
             horarios_por_turma[chave_horario] = []
         
         # VERIFICAÇÃO 1: Conflito no mesmo horário REAL
-        disciplinas_no_horario = [obter_disciplina_aula(a) for a in horarios_por_turma[chave_horario]]
+        disciplinas_no_horario = [a.disciplina for a in horarios_por_turma[chave_horario]]
         if disciplina in disciplinas_no_horario:
             # AULA REPETIDA - mesma disciplina já alocada neste horário REAL
             conflitos.append({
@@ -468,7 +413,7 @@ def verificar_conflitos_horarios(aulas):
                 'segmento': segmento
             })
         else:
-            horarios_por_turma[chave_horario].append(aula)
+            horarios_por_turma[chave_horario].append(aula_grade)
             
             if len(horarios_por_turma[chave_horario]) > 1:
                 # CONFLITO DETECTADO! Horário sobreposto com disciplinas diferentes
@@ -478,8 +423,8 @@ def verificar_conflitos_horarios(aulas):
                     'dia': dia,
                     'horario_real': hora_real,
                     'horario_num': horario_num,
-                    'aulas': horarios_por_turma[chave_horario].copy(),
-                    'disciplinas': [obter_disciplina_aula(a) for a in horarios_por_turma[chave_horario]],
+                    'aulas': [a.original for a in horarios_por_turma[chave_horario]],
+                    'disciplinas': [a.disciplina for a in horarios_por_turma[chave_horario]],
                     'chave': chave_horario,
                     'segmento': segmento
                 })
@@ -514,25 +459,26 @@ def verificar_conflitos_horarios(aulas):
 
 def verificar_professor_superposto(aulas):
     """Verifica se o mesmo professor tem aulas em horários REAIS sobrepostos"""
+    calendario = obter_calendario()
     superposicoes = []
     
     # Usar dicionário para agrupar por professor-dia-horario_real
     grupos = {}
     
-    for aula in aulas:
-        professor = obter_professor_aula(aula)
-        dia = obter_dia_aula(aula)
-        horario_num = obter_horario_aula(aula)
-        turma = obter_turma_aula(aula)
+    for aula in normalizar_grade(aulas):
+        professor = aula.professor
+        dia = aula.dia
+        horario_num = aula.horario
+        turma = aula.turma
         
         if not professor or not dia or not horario_num or not turma:
             continue
         
         # Obter horário REAL
-        hora_real = obter_horario_real(turma, horario_num)
+        hora_real = calendario.horario_real(turma, horario_num)
         
         # Chave única: professor + dia + horário REAL
-        chave = f"{professor}|{dia}|{hora_real}"
+        chave = (aula.professor_id, dia, hora_real)
         
         if chave not in grupos:
             grupos[chave] = []
@@ -542,24 +488,25 @@ def verificar_professor_superposto(aulas):
     # Verificar grupos com mais de uma aula
     for chave, aulas_grupo in grupos.items():
         if len(aulas_grupo) > 1:
-            professor, dia, hora_real = chave.split('|')
+            professor = aulas_grupo[0].professor
+            _, dia, hora_real = chave
             
             # Obter informações das aulas
-            turmas = [obter_turma_aula(a) for a in aulas_grupo]
-            disciplinas = [obter_disciplina_aula(a) for a in aulas_grupo]
-            segmentos = [obter_segmento_turma(t) for t in turmas]
-            horarios_nums = [obter_horario_aula(a) for a in aulas_grupo]
+            turmas = [a.turma for a in aulas_grupo]
+            disciplinas = [a.disciplina for a in aulas_grupo]
+            segmentos = [calendario.segmento_turma(t) for t in turmas]
+            horarios_nums = [a.horario for a in aulas_grupo]
             
             superposicoes.append({
                 'professor': professor,
                 'dia': dia,
                 'horario_real': hora_real,
-                'aulas': aulas_grupo.copy(),
+                'aulas': [a.original for a in aulas_grupo],
                 'turmas': turmas,
                 'disciplinas': disciplinas,
                 'segmentos': segmentos,
                 'horarios_numericos': horarios_nums,
-                'chave': chave,
+                'chave': f"{professor}|{dia}|{hora_real}",
                 'quantidade': len(aulas_grupo)
             })
     
@@ -567,20 +514,22 @@ def verificar_professor_superposto(aulas):
 
 def analisar_superposicoes_por_horario_real(aulas):
     """Analisa superposições agrupando por horário REAL"""
+    calendario = obter_calendario()
     analise = {}
     
-    for aula in aulas:
-        professor = obter_professor_aula(aula)
-        dia = obter_dia_aula(aula)
-        horario_num = obter_horario_aula(aula)
-        turma = obter_turma_aula(aula)
+    for aula_grade in normalizar_grade(aulas):
+        aula = aula_grade.original
+        professor = aula_grade.professor
+        dia = aula_grade.dia
+        horario_num = aula_grade.horario
+        turma = aula_grade.turma
         
         if not all([professor, dia, horario_num, turma]):
             continue
         
         # Obter horário REAL
-        hora_real = obter_horario_real(turma, horario_num)
-        segmento = obter_segmento_turma(turma)
+        hora_real = calendario.horario_real(turma, horario_num)
+        segmento = calendario.segmento_turma(turma)
         
         chave = f"{professor}|{dia}|{hora_real}"
         
@@ -609,8 +558,11 @@ def verificar_limites_professores(aulas):
     """Verifica se algum professor excedeu o limite de horas"""
     problemas = []
     
+    # Normalizada uma vez: as aulas de cada professor são contadas em uma única passada
+    grade = normalizar_grade(aulas)
+    
     for professor in st.session_state.professores:
-        horas_atual = calcular_horas_professor(professor, aulas)
+        horas_atual = calcular_horas_professor(professor, grade)
         limite = obter_limite_horas_professor(professor)
         
         if horas_atual > limite:
@@ -623,6 +575,108 @@ def verificar_limites_professores(aulas):
     
     return problemas
 
+# ============================================
+# VALIDAÇÃO INCREMENTAL (EDIÇÃO DE UMA AULA)
+# ============================================
+
+def criar_validador_grade(aulas):
+    """Cria o validador incremental com as cargas e limites atuais"""
+    cargas = {}
+    for disc in st.session_state.disciplinas:
+        for turma in disc.turmas:
+            cargas.setdefault((turma, disc.nome), disc.carga_semanal)
+    
+    limites = {professor.nome: obter_limite_horas_professor(professor)
+               for professor in st.session_state.professores}
+    
+    return ValidadorIncremental(
+        aulas,
+        calendario=obter_calendario(),
+        carga_necessaria=lambda turma, disciplina: cargas.get((turma, disciplina), 0),
+        limite_horas=limites.get
+    )
+
+def marcar_grade_alterada():
+    """Avança a revisão da grade, invalidando o validador guardado na sessão.
+    Toda troca da grade fora de mover_aula_grade (geração, remoção de
+    repetidas, correção de superposições) precisa chamá-la."""
+    st.session_state.revisao_grade = st.session_state.get('revisao_grade', 0) + 1
+
+def obter_validador_grade(aulas):
+    """Retorna o validador guardado na sessão, recriando-o se a revisão da grade mudou"""
+    revisao = st.session_state.get('revisao_grade', 0)
+    validador = st.session_state.get('validador_grade')
+    if validador is None or st.session_state.get('validador_grade_revisao') != revisao:
+        validador = criar_validador_grade(aulas)
+        st.session_state.validador_grade = validador
+        st.session_state.validador_grade_revisao = revisao
+    return validador
+
+def mover_aula_grade(aulas, indice, novo_dia, novo_horario):
+    """Move uma aula da grade e revalida apenas as chaves afetadas"""
+    validador = obter_validador_grade(aulas)
+    delta = validador.mover(indice, novo_dia, novo_horario)
+    
+    if delta.novos:
+        st.warning(f"⚠️ {len(delta.novos)} novo(s) conflito(s) após mover a aula")
+    if delta.resolvidos:
+        st.success(f"✅ {len(delta.resolvidos)} conflito(s) resolvido(s)")
+    
+    return delta
+
+def editar_aula_grade(aulas, prefixo='grade'):
+    """Formulário para mover uma aula da grade (revalida só as chaves afetadas)
+    
+    prefixo distingue as chaves dos widgets quando o formulário aparece mais
+    de uma vez no mesmo rerun (uma vez por turma ou aba).
+    """
+    validador = obter_validador_grade(aulas)
+    if not validador.aulas:
+        return None
+    
+    with st.expander("✏️ Mover aula", expanded=False):
+        indice = st.selectbox(
+            "Aula", list(validador.aulas), key=f'{prefixo}_mover_aula_indice',
+            format_func=lambda i: (f"{validador.aulas[i].turma} · {validador.aulas[i].disciplina} · "
+                                   f"{validador.aulas[i].dia} {validador.aulas[i].horario}")
+        )
+        aula = validador.aulas[indice]
+        col1, col2 = st.columns(2)
+        novo_dia = col1.selectbox("Novo dia", DIAS_SEMANA, key=f'{prefixo}_mover_aula_dia')
+        novo_horario = col2.selectbox("Novo período", obter_horarios_turma(aula.turma),
+                                      key=f'{prefixo}_mover_aula_horario')
+        
+        delta = None
+        if st.button("Mover", key=f'{prefixo}_mover_aula_botao'):
+            delta = mover_aula_grade(aulas, indice, novo_dia, novo_horario)
+        
+        conflitos = validador.total_conflitos()
+        st.caption(" · ".join(f"{tipo.replace('_', ' ')}: {qtd}" for tipo, qtd in conflitos.items()))
+        return delta
+
+# ============================================
+# ALOCAÇÃO DE SALAS
+# ============================================
+
+def alocar_salas_grade(aulas):
+    """Aloca as salas cadastradas às aulas da grade e guarda a ocupação na sessão"""
+    alunos_por_turma = {}
+    for turma in st.session_state.turmas:
+        alunos = getattr(turma, 'alunos_matriculados', None)
+        if alunos is None:
+            alunos = getattr(turma, 'alunos', 0)
+        alunos_por_turma[turma.nome] = alunos or 0
+    
+    alocacao = alocar_salas(aulas, st.session_state.salas, alunos_por_turma,
+                            calendario=obter_calendario())
+    st.session_state.alocacao_salas = alocacao
+    st.session_state.ocupacao_salas = alocacao.resumo()
+    
+    if alocacao.sem_sala:
+        st.warning(f"⚠️ {len(alocacao.sem_sala)} aula(s) sem sala disponível")
+    
+    return alocacao
+
 # ============================================
 # FUNÇÃO: REMOVER AULAS REPETIDAS
 # ============================================
@@ -635,9 +689,10 @@ def remover_aulas_repetidas(aulas):
     aulas_filtradas = []
     contador = {}
     
-    for aula in aulas:
-        turma = obter_turma_aula(aula)
-        disciplina = obter_disciplina_aula(aula)
+    for aula_grade in normalizar_grade(aulas):
+        aula = aula_grade.original
+        turma = aula_grade.turma
+        disciplina = aula_grade.disciplina
         
         if not turma or not disciplina:
             aulas_filtradas.append(aula)  # Mantém se não puder identificar
@@ -664,6 +719,8 @@ def remover_aulas_repetidas(aulas):
             # Aula repetida - não adicionar
             continue
     
+    if len(aulas_filtradas) != len(aulas):
+        marcar_grade_alterada()
     return aulas_filtradas
 
 # ============================================
@@ -681,6 +738,7 @@ def corrigir_superposicoes_ultra(aulas, superposicoes):
     # Identificar todas as aulas em conflito
     aulas_para_remover = set()
     relatorio = []
+    grade = normalizar_grade(aulas)
     
     for superposicao in superposicoes:
         professor = superposicao['professor']
@@ -700,12 +758,14 @@ def corrigir_superposicoes_ultra(aulas, superposicoes):
                 aula_para_remover = aulas_conflito[i]
                 
                 # Encontrar índice da aula para remover na lista original
-                for idx, aula in enumerate(aulas):
-                    if (obter_professor_aula(aula) == professor and
-                        obter_dia_aula(aula) == dia and
-                        obter_horario_real_aula(aula) == horario_real and
-                        obter_disciplina_aula(aula) == obter_disciplina_aula(aula_para_remover) and
-                        obter_turma_aula(aula) == obter_turma_aula(aula_para_remover)):
+                disciplina_remover = obter_disciplina_aula(aula_para_remover)
+                turma_remover = obter_turma_aula(aula_para_remover)
+                for idx, aula in enumerate(grade.aulas):
+                    if (aula.professor == professor and
+                        aula.dia == dia and
+                        aula.disciplina == disciplina_remover and
+                        aula.turma == turma_remover and
+                        obter_horario_real_aula(aula) == horario_real):
                         
                         # Marcar para remoção
                         aulas_para_remover.add(idx)
@@ -716,7 +776,9 @@ def corrigir_superposicoes_ultra(aulas, superposicoes):
                         break
     
     # Remover aulas marcadas
-    aulas_corrigidas = [aula for idx, aula in enumerate(aulas) if idx not in aulas_para_remover]
+    aulas_corrigidas = [aula.original for idx, aula in enumerate(grade.aulas) if idx not in aulas_para_remover]
+    if aulas_para_remover:
+        marcar_grade_alterada()
     
     # Mostrar relatório
     if relatorio:
@@ -733,106 +795,44 @@ def corrigir_superposicoes_ultra(aulas, superposicoes):
 # FUNÇÃO: VISUALIZAR GRADE EM FORMATO CALENDÁRIO
 # ============================================
 
-def visualizar_grade_calendario(aulas, turma_nome=None):
-    """Visualiza grade em formato de calendário/tabela"""
+def visualizar_grade_calendario(aulas, turma_nome=None, chave=None):
+    """Visualiza grade em formato de calendário/tabela
+    
+    chave: prefixo dos widgets de edição; padrão é a turma (ou 'grade'). Informe
+    uma chave própria ao mostrar a mesma turma mais de uma vez na página.
+    """
     if not aulas:
         st.warning("Nenhuma aula para visualizar")
         return
     
-    # Filtrar por turma se especificado
-    if turma_nome:
-        aulas = [a for a in aulas if obter_turma_aula(a) == turma_nome]
-        if not aulas:
-            st.warning(f"Nenhuma aula para a turma {turma_nome}")
-            return
-    
-    # Determinar turmas únicas
-    turmas_unicas = set()
-    for aula in aulas:
-        turma = obter_turma_aula(aula)
-        if turma:
-            turmas_unicas.add(turma)
-    
-    # Para cada turma, criar tabela
-    for turma in sorted(turmas_unicas):
+    # Edição antes de desenhar: a aula movida já aparece na grade deste rerun
+    editar_aula_grade(aulas, prefixo=chave or turma_nome or 'grade')
+    
+    # Ocupação das salas recalculada sobre a grade já editada
+    if st.session_state.get('salas'):
+        ocupacao = alocar_salas_grade(aulas).resumo()
+        col1, col2 = st.columns(2)
+        col1.metric("Ocupação dos assentos", f"{ocupacao['ocupacao_salas']:.1f}%")
+        col2.metric("Ocupação dos horários", f"{ocupacao['ocupacao_salas_horario']:.1f}%")
+    
+    # Cache do HTML por turma (só re-renderiza turmas cujas aulas mudaram)
+    if 'cache_grade_turma' not in st.session_state:
+        st.session_state.cache_grade_turma = CacheGradeTurma()
+    
+    tabelas = renderizar_grade(
+        aulas,
+        calendario=obter_calendario(),
+        cache=st.session_state.cache_grade_turma,
+        turma_nome=turma_nome
+    )
+    
+    if not tabelas:
+        st.warning(f"Nenhuma aula para a turma {turma_nome}")
+        return
+    
+    # CSS emitido uma única vez para todas as turmas
+    st.markdown(CSS_CALENDARIO, unsafe_allow_html=True)
+    
+    for turma, html in tabelas:
         st.subheader(f"📅 Grade da Turma: {turma}")
-        
-        # Filtrar aulas desta turma
-        aulas_turma = [a for a in aulas if obter_turma_aula(a) == turma]
-        
-        # Determinar segmento
-        segmento = obter_segmento_turma(turma)
-        
-        # Horários disponíveis
-        if segmento == "EM":
-            periodos = list(range(1, 8))
-            horarios = {
-                1: "07:00 - 07:50",
-                2: "07:50 - 08:40",
-                3: "08:40 - 09:30",
-                4: "09:50 - 10:40",
-                5: "10:40 - 11:30",
-                6: "11:30 - 12:20",
-                7: "12:20 - 13:10"
-            }
-        else:
-            periodos = list(range(1, 6))
-            horarios = {
-                1: "07:50 - 08:40",
-                2: "08:40 - 09:30",
-                3: "09:50 - 10:40",
-                4: "10:40 - 11:30",
-                5: "11:30 - 12:20"
-            }
-        
-        # Dias da semana
-        dias = ["segunda", "terca", "quarta", "quinta", "sexta"]
-        dias_display = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"]
-        
-        # Criar tabela HTML
-        html = f"""
-        <style>
-        .tabela-calendario {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-            font-family: Arial, sans-serif;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        .tabela-calendario th {{
-            background-color: #4a6baf;
-            color: white;
-            padding: 12px;
-            text-align: center;
-            font-weight: bold;
-            border: 1px solid #ddd;
-        }}
-        .tabela-calendario td {{
-            padding: 10px;
-            border: 1px solid #ddd;
-            text-align: center;
-            vertical-align: middle;
-            min-height: 60px;
-        }}
-        .celula-horario {{
-            background-color: #f0f7ff;
-            font-weight: bold;
-            color: #2c5282;
-        }}
-        .celula-aula {{
-            background-color: #e8f5e9;
-            border-radius: 4px;
-            margin: 2px;
-        }}
-        .celula-vazia {{
-            background-color: #f9f9f9;
-            color: #999;
-            font-style: italic;
-        }}
-        .disciplina-nome {{
-            font-weight: bold;
-            font-size: 13px;
-            color: #2e7d32;
-        }}
-        .professor-nome {{
-            font
\ No newline at end of file
+        st.markdown(html, unsafe_allow_html=True)
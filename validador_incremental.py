@@ -0,0 +1,195 @@
+# validador_incremental.py - Revalidação incremental da grade horária
+"""
+Mantém índices de ocupação (turma/professor × dia × horário real) e de carga
+(turma × disciplina, horas por professor) para que mover uma aula atualize
+apenas as chaves que ela toca, em tempo constante.
+
+Os índices ficam guardados em st.session_state pelo app Streamlit, evitando
+revalidar a grade inteira a cada rerun.
+"""
+from grade_aulas import AulaGrade, normalizar_grade
+from calendario_escolar import CALENDARIO_PADRAO
+
+
+class DeltaConflitos:
+    """Conflitos criados e resolvidos por uma operação"""
+    __slots__ = ('novos', 'resolvidos')
+
+    def __init__(self):
+        self.novos = []
+        self.resolvidos = []
+
+    def registrar(self, tipo, chave, antes, depois):
+        """Registra a mudança de estado (em conflito ou não) de uma chave"""
+        if depois and not antes:
+            self.novos.append((tipo, chave))
+        elif antes and not depois:
+            self.resolvidos.append((tipo, chave))
+
+    def __bool__(self):
+        return bool(self.novos or self.resolvidos)
+
+
+class ValidadorIncremental:
+    """Índices de conflitos da grade, atualizados aula a aula"""
+
+    def __init__(self, aulas=None, calendario=None, carga_necessaria=None, limite_horas=None):
+        self.calendario = calendario or CALENDARIO_PADRAO
+        # carga_necessaria(turma, disciplina) -> int ; limite_horas(professor) -> int
+        self.carga_necessaria = carga_necessaria or (lambda turma, disciplina: 0)
+        self.limite_horas = limite_horas or (lambda professor: None)
+
+        self.aulas = {}
+        self.proximo_id = 0
+
+        # Índices de ocupação e carga
+        self.ocupacao_turma = {}       # (turma, dia, hora_real) -> {disciplina: qtd}
+        self.ocupacao_professor = {}   # (professor, dia, hora_real) -> qtd
+        self.carga_turma = {}          # (turma, disciplina) -> qtd
+        self.horas_professor = {}      # professor -> qtd
+
+        # Chaves atualmente em conflito
+        self.conflitos_turma = set()
+        self.conflitos_professor = set()
+        self.excessos_carga = set()
+        self.professores_excedidos = set()
+
+        for aula in normalizar_grade(aulas):
+            self.adicionar(aula)
+
+    # ----------------------------------------
+    # Estado de cada chave
+    # ----------------------------------------
+
+    def _turma_em_conflito(self, chave):
+        disciplinas = self.ocupacao_turma.get(chave)
+        return bool(disciplinas) and (len(disciplinas) > 1 or max(disciplinas.values()) > 1)
+
+    def _professor_em_conflito(self, chave):
+        return self.ocupacao_professor.get(chave, 0) > 1
+
+    def _carga_excedida(self, chave):
+        return self.carga_turma.get(chave, 0) > self.carga_necessaria(*chave)
+
+    def _professor_excedido(self, professor):
+        limite = self.limite_horas(professor)
+        return limite is not None and self.horas_professor.get(professor, 0) > limite
+
+    @staticmethod
+    def _atualizar_conjunto(conjunto, chave, em_conflito):
+        if em_conflito:
+            conjunto.add(chave)
+        else:
+            conjunto.discard(chave)
+
+    def _chaves(self, aula):
+        """Chaves dos índices tocadas por uma aula"""
+        hora_real = self.calendario.horario_real(aula.turma, aula.horario)
+        chave_turma = (aula.turma, aula.dia, hora_real) if aula.completa() else None
+        chave_professor = None
+        if aula.professor and aula.dia and aula.horario and aula.turma:
+            chave_professor = (aula.professor, aula.dia, hora_real)
+        chave_carga = (aula.turma, aula.disciplina) if aula.completa() else None
+        return chave_turma, chave_professor, chave_carga
+
+    def _aplicar(self, aula, sinal, delta):
+        """Soma (sinal=1) ou retira (sinal=-1) a aula dos índices"""
+        chave_turma, chave_professor, chave_carga = self._chaves(aula)
+
+        if chave_turma is not None:
+            antes = chave_turma in self.conflitos_turma
+            disciplinas = self.ocupacao_turma.setdefault(chave_turma, {})
+            qtd = disciplinas.get(aula.disciplina, 0) + sinal
+            if qtd > 0:
+                disciplinas[aula.disciplina] = qtd
+            else:
+                disciplinas.pop(aula.disciplina, None)
+                if not disciplinas:
+                    del self.ocupacao_turma[chave_turma]
+            depois = self._turma_em_conflito(chave_turma)
+            self._atualizar_conjunto(self.conflitos_turma, chave_turma, depois)
+            delta.registrar('turma', chave_turma, antes, depois)
+
+        if chave_professor is not None:
+            antes = chave_professor in self.conflitos_professor
+            qtd = self.ocupacao_professor.get(chave_professor, 0) + sinal
+            if qtd > 0:
+                self.ocupacao_professor[chave_professor] = qtd
+            else:
+                self.ocupacao_professor.pop(chave_professor, None)
+            depois = self._professor_em_conflito(chave_professor)
+            self._atualizar_conjunto(self.conflitos_professor, chave_professor, depois)
+            delta.registrar('professor', chave_professor, antes, depois)
+
+        if chave_carga is not None:
+            antes = chave_carga in self.excessos_carga
+            self.carga_turma[chave_carga] = self.carga_turma.get(chave_carga, 0) + sinal
+            depois = self._carga_excedida(chave_carga)
+            self._atualizar_conjunto(self.excessos_carga, chave_carga, depois)
+            delta.registrar('carga', chave_carga, antes, depois)
+
+        if aula.professor:
+            antes = aula.professor in self.professores_excedidos
+            self.horas_professor[aula.professor] = self.horas_professor.get(aula.professor, 0) + sinal
+            depois = self._professor_excedido(aula.professor)
+            self._atualizar_conjunto(self.professores_excedidos, aula.professor, depois)
+            delta.registrar('limite', aula.professor, antes, depois)
+
+    # ----------------------------------------
+    # Operações
+    # ----------------------------------------
+
+    def adicionar(self, aula):
+        """Adiciona uma aula e retorna (id_aula, delta)"""
+        if not isinstance(aula, AulaGrade):
+            aula = normalizar_grade([aula]).aulas[0]
+        id_aula = self.proximo_id
+        self.proximo_id += 1
+        self.aulas[id_aula] = aula
+        delta = DeltaConflitos()
+        self._aplicar(aula, 1, delta)
+        return id_aula, delta
+
+    def remover(self, id_aula):
+        """Remove uma aula pelo id e retorna o delta de conflitos"""
+        aula = self.aulas.pop(id_aula)
+        delta = DeltaConflitos()
+        self._aplicar(aula, -1, delta)
+        return delta
+
+    def mover(self, id_aula, dia, horario):
+        """Move uma aula para outro dia/horário, atualizando só as chaves tocadas"""
+        aula = self.aulas[id_aula]
+        delta = DeltaConflitos()
+        self._aplicar(aula, -1, delta)
+        aula.dia = dia
+        aula.horario = horario
+        # Manter a aula original (dict ou objeto) sincronizada
+        if isinstance(aula.original, dict):
+            aula.original['dia'] = dia
+            aula.original['horario'] = horario
+        elif aula.original is not None:
+            aula.original.dia = dia
+            aula.original.horario = horario
+        self._aplicar(aula, 1, delta)
+
+        # Uma chave que saiu e voltou ao mesmo estado não é mudança
+        comuns = set(delta.novos) & set(delta.resolvidos)
+        if comuns:
+            delta.novos = [c for c in delta.novos if c not in comuns]
+            delta.resolvidos = [c for c in delta.resolvidos if c not in comuns]
+        return delta
+
+    def total_conflitos(self):
+        """Quantidade de chaves em conflito, por tipo"""
+        return {
+            'sobreposicoes_turma': len(self.conflitos_turma),
+            'superposicoes_professor': len(self.conflitos_professor),
+            'excesso_aulas': len(self.excessos_carga),
+            'limite_professores': len(self.professores_excedidos)
+        }
+
+    def possui_conflitos(self):
+        """Indica se ainda há algum conflito na grade"""
+        return bool(self.conflitos_turma or self.conflitos_professor or
+                    self.excessos_carga or self.professores_excedidos)
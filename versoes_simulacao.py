@@ -0,0 +1,250 @@
+# versoes_simulacao.py - Histórico de versões das simulações (cópia na escrita)
+"""
+Versões das simulações salvas.
+
+Cada linha da tabela `turmas` vale para um intervalo de versões da sua
+simulação: de `versao_desde` (inclusive) até `versao_ate` (exclusive; NULL =
+ainda vale na versão atual). Ao atualizar uma simulação, só as turmas
+alteradas, incluídas ou removidas geram escrita: a linha antiga é encerrada
+e, se for o caso, uma nova é inserida. As turmas iguais continuam sendo a
+mesma linha, então o banco cresce na proporção das edições.
+
+A ordem das turmas é dada por `posicao` (REAL): turmas novas recebem uma
+posição entre as vizinhas que não mudaram, sem renumerar as demais.
+
+Além das colunas tipadas (usadas nas páginas de turmas e no rateio), cada
+linha guarda em `dados` o JSON completo da turma, com qualquer outra chave
+que o cliente tenha enviado (id...): uma versão antiga é remontada com as
+turmas exatamente como eram. Linhas gravadas antes dessa coluna têm `dados`
+NULL e são remontadas só com as colunas.
+
+O restante da simulação (custos, alunos, resultados), que é pequeno, vai
+inteiro para `versoes_simulacao` a cada versão. O JSON da versão atual fica
+na tabela `conteudos` (conteudos.py), de onde vêm as leituras do dia a dia;
+as versões antigas são remontadas com uma consulta por intervalo.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime
+
+import json_rapido
+
+# Colunas da tabela turmas e campos correspondentes do JSON da turma
+COLUNAS_TURMA = ('nome_turma', 'nivel', 'disciplina', 'capacidade', 'alunos_matriculados',
+                 'horas_semanais', 'dias_semana', 'custo_hora_professor', 'mensalidade_aluno',
+                 'custo_material_mensal')
+CAMPOS_TURMA = ('nome',) + COLUNAS_TURMA[1:]
+PADROES_TURMA = ('', '', '', 0, 0, 0, 0, 0, 0, 0)
+# Colunas gravadas por linha: as tipadas e o JSON completo da turma
+COLUNAS_LINHA_TURMA = COLUNAS_TURMA + ('dados',)
+
+SQL_CRIAR_TABELA = '''
+CREATE TABLE IF NOT EXISTS versoes_simulacao (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    simulacao_id INTEGER,
+    numero INTEGER,
+    nome TEXT,
+    criada_em TEXT,
+    turmas_gravadas INTEGER,
+    dados TEXT,
+    UNIQUE (simulacao_id, numero),
+    FOREIGN KEY (simulacao_id) REFERENCES simulacoes (id) ON DELETE CASCADE
+)
+'''
+
+
+def _colunas(cursor, tabela):
+    cursor.execute(f'PRAGMA table_info({tabela})')
+    return {linha[1] for linha in cursor.fetchall()}
+
+
+def criar_tabelas_versoes(cursor):
+    """Cria a tabela de versões e adiciona as colunas de versão em bancos antigos"""
+    cursor.execute(SQL_CRIAR_TABELA)
+
+    # Tabela criada antes da chave estrangeira: recria (SQLite não altera restrições)
+    cursor.execute('PRAGMA foreign_key_list(versoes_simulacao)')
+    if not cursor.fetchall():
+        cursor.execute('ALTER TABLE versoes_simulacao RENAME TO versoes_simulacao_antiga')
+        cursor.execute(SQL_CRIAR_TABELA)
+        cursor.execute('''
+        INSERT INTO versoes_simulacao
+        SELECT * FROM versoes_simulacao_antiga WHERE simulacao_id IN (SELECT id FROM simulacoes)
+        ''')
+        cursor.execute('DROP TABLE versoes_simulacao_antiga')
+
+    if 'versao_atual' not in _colunas(cursor, 'simulacoes'):
+        cursor.execute('ALTER TABLE simulacoes ADD COLUMN versao_atual INTEGER DEFAULT 1')
+
+    colunas_turmas = _colunas(cursor, 'turmas')
+    if 'versao_desde' not in colunas_turmas:
+        cursor.execute('ALTER TABLE turmas ADD COLUMN versao_desde INTEGER DEFAULT 1')
+        cursor.execute('ALTER TABLE turmas ADD COLUMN versao_ate INTEGER')
+        cursor.execute('ALTER TABLE turmas ADD COLUMN posicao REAL')
+        # Turmas já gravadas: a ordem era a do id
+        cursor.execute('UPDATE turmas SET posicao = id')
+    if 'dados' not in colunas_turmas:
+        cursor.execute('ALTER TABLE turmas ADD COLUMN dados TEXT')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_turmas_versao ON turmas (simulacao_id, versao_ate, posicao)')
+
+
+def valores_turma(turma):
+    """Valores da turma na ordem de COLUNAS_LINHA_TURMA"""
+    colunas = tuple(turma.get(campo, padrao) for campo, padrao in zip(CAMPOS_TURMA, PADROES_TURMA))
+    return colunas + (json_rapido.dumps(turma).decode('utf-8'),)
+
+
+def turma_de_linha(valores):
+    """Turma a partir dos valores de COLUNAS_LINHA_TURMA (só as colunas, se não há JSON)"""
+    if valores[-1] is not None:
+        return json_rapido.loads(valores[-1])
+    return dict(zip(CAMPOS_TURMA, valores))
+
+
+def inserir_turmas(cursor, simulacao_id, versao, turmas_posicionadas):
+    """Insere turmas [(posicao, valores)] válidas a partir de `versao`"""
+    cursor.executemany(f'''
+    INSERT INTO turmas (simulacao_id, versao_desde, posicao, {', '.join(COLUNAS_LINHA_TURMA)})
+    VALUES (?, ?, ?, {', '.join('?' * len(COLUNAS_LINHA_TURMA))})
+    ''', [(simulacao_id, versao, posicao, *valores) for posicao, valores in turmas_posicionadas])
+
+
+def dados_versao(dados_completos):
+    """JSON guardado em versoes_simulacao: tudo, menos as turmas (que ficam na tabela turmas)"""
+    dados = {chave: valor for chave, valor in dados_completos.items() if chave != 'turmas'}
+    if isinstance(dados.get('entrada'), dict):
+        dados['entrada'] = {chave: valor for chave, valor in dados['entrada'].items() if chave != 'turmas'}
+    return json.dumps(dados)
+
+
+def gravar_versao(cursor, simulacao_id, numero, nome, dados_completos, turmas_gravadas):
+    """Registra a versão (as turmas ficam na tabela turmas)"""
+    cursor.execute('''
+    INSERT OR REPLACE INTO versoes_simulacao (simulacao_id, numero, nome, criada_em, turmas_gravadas, dados)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', (simulacao_id, numero, nome, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), turmas_gravadas,
+          dados_versao(dados_completos)))
+
+
+def salvar_turmas_simulacao(cursor, simulacao_id, turmas):
+    """Turmas da primeira versão de uma simulação nova"""
+    inserir_turmas(cursor, simulacao_id, 1, [(float(i), valores_turma(turma)) for i, turma in enumerate(turmas)])
+    return len(turmas)
+
+
+def _posicoes_novas(mantidas, total):
+    """Posição de cada turma nova, entre as posições das vizinhas mantidas
+
+    mantidas: {índice na lista nova: posição antiga}
+    """
+    posicoes = {}
+    esquerda, inicio = None, 0
+    for indice in sorted(mantidas) + [total]:
+        direita = mantidas.get(indice)
+        lacuna = indice - inicio
+        for j in range(lacuna):
+            if esquerda is None and direita is None:
+                posicoes[inicio + j] = float(inicio + j)
+            elif direita is None:
+                posicoes[inicio + j] = esquerda + j + 1
+            elif esquerda is None:
+                posicoes[inicio + j] = direita - lacuna + j
+            else:
+                posicoes[inicio + j] = esquerda + (direita - esquerda) * (j + 1) / (lacuna + 1)
+        esquerda, inicio = direita, indice + 1
+    return posicoes
+
+
+def planejar_turmas(linhas_atuais, turmas):
+    """O que gravar para passar das turmas vigentes para `turmas`
+
+    linhas_atuais: (id, posicao, *COLUNAS_LINHA_TURMA) das turmas vigentes, na ordem
+
+    Returns:
+        (ids das linhas a encerrar, [(posicao, valores)] das linhas a inserir)
+    """
+    # Pareamento por (nome, ocorrência do nome), como na comparação de simulações
+    atuais, ocorrencias = {}, defaultdict(int)
+    for linha in linhas_atuais:
+        nome = linha[2]
+        atuais[(nome, ocorrencias[nome])] = (linha[0], linha[1], tuple(linha[2:]))
+        ocorrencias[nome] += 1
+
+    novas = [valores_turma(turma) for turma in turmas]
+    mantidas, ocorrencias = {}, defaultdict(int)
+    ultima_posicao = None
+    for indice, valores in enumerate(novas):
+        nome = valores[0]
+        chave = (nome, ocorrencias[nome])
+        ocorrencias[nome] += 1
+        atual = atuais.get(chave)
+        # Mantém a linha se o conteúdo é igual e a ordem relativa se preserva
+        if (atual is not None and atual[2] == valores and atual[1] is not None
+                and (ultima_posicao is None or atual[1] > ultima_posicao)):
+            mantidas[indice] = atual[1]
+            ultima_posicao = atual[1]
+            del atuais[chave]
+
+    posicoes = _posicoes_novas(mantidas, len(novas))
+    return [linha_id for linha_id, _, _ in atuais.values()], [(posicoes[i], novas[i]) for i in sorted(posicoes)]
+
+
+def atualizar_turmas_simulacao(cursor, simulacao_id, versao, turmas):
+    """Grava as turmas da nova `versao` copiando só o que mudou
+
+    Returns:
+        número de linhas de turma escritas (encerradas + inseridas)
+    """
+    cursor.execute(f'''
+    SELECT id, posicao, {', '.join(COLUNAS_LINHA_TURMA)}
+    FROM turmas
+    WHERE simulacao_id = ? AND versao_ate IS NULL
+    ORDER BY posicao, id
+    ''', (simulacao_id,))
+    encerradas, inseridas = planejar_turmas(cursor.fetchall(), turmas)
+
+    cursor.executemany('UPDATE turmas SET versao_ate = ? WHERE id = ?', [(versao, linha_id) for linha_id in encerradas])
+    inserir_turmas(cursor, simulacao_id, versao, inseridas)
+    return len(encerradas) + len(inseridas)
+
+
+def listar_versoes(cursor, simulacao_id):
+    cursor.execute('''
+    SELECT numero, nome, criada_em, turmas_gravadas
+    FROM versoes_simulacao
+    WHERE simulacao_id = ?
+    ORDER BY numero DESC
+    ''', (simulacao_id,))
+    return [dict(zip(('numero', 'nome', 'criada_em', 'turmas_gravadas'), linha)) for linha in cursor.fetchall()]
+
+
+def ler_turmas_versao(cursor, simulacao_id, numero):
+    """Turmas válidas na versão `numero`, na ordem original"""
+    cursor.execute(f'''
+    SELECT {', '.join(COLUNAS_LINHA_TURMA)}
+    FROM turmas
+    WHERE simulacao_id = ? AND versao_desde <= ? AND (versao_ate IS NULL OR versao_ate > ?)
+    ORDER BY posicao, id
+    ''', (simulacao_id, numero, numero))
+    return [turma_de_linha(linha) for linha in cursor.fetchall()]
+
+
+def ler_versao(cursor, simulacao_id, numero):
+    """Remonta o dados_completos da versão `numero` (None se não existir)"""
+    cursor.execute('SELECT nome, criada_em, dados FROM versoes_simulacao WHERE simulacao_id = ? AND numero = ?',
+                   (simulacao_id, numero))
+    linha = cursor.fetchone()
+    if linha is None:
+        return None
+
+    return montar_versao(numero, *linha, ler_turmas_versao(cursor, simulacao_id, numero))
+
+
+def montar_versao(numero, nome, criada_em, dados, turmas):
+    """Junta o JSON guardado da versão com as suas turmas"""
+    dados_completos = json.loads(dados)
+    dados_completos['turmas'] = turmas
+    if isinstance(dados_completos.get('entrada'), dict):
+        dados_completos['entrada']['turmas'] = turmas
+    return {'numero': numero, 'nome': nome, 'criada_em': criada_em, 'dados_completos': dados_completos}